@@ -0,0 +1,92 @@
+const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:8000';
+
+// The chat only talks to the recommender backend when one is configured
+export const BACKEND_CONFIGURED = Boolean(import.meta.env.VITE_BACKEND_URL);
+
+export interface RetrievedCandidate {
+  index: number;
+  movie_id: number;
+  title: string;
+  year: number | null;
+  score: number;
+}
+
+export interface StreamHandlers {
+  // Fired once, as soon as the backend finishes retrieval
+  onCandidates?: (candidates: RetrievedCandidate[]) => void;
+  // Fired for every LLM text delta of the ranked explanation
+  onToken?: (text: string) => void;
+  onDone?: () => void;
+  onError?: (message: string) => void;
+}
+
+// Stream recommendations from the backend's /recommend/stream (Server-Sent Events).
+// EventSource only supports GET, so we read the POST response body manually.
+export async function streamRecommendations(
+  userInput: string,
+  userId: string | null,
+  handlers: StreamHandlers,
+  signal?: AbortSignal
+): Promise<string> {
+  const response = await fetch(`${BACKEND_URL}/recommend/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify({ user_input: userInput, user_id: userId }),
+    signal,
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error('Failed to get recommendations from backend');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let fullText = '';
+
+  const dispatch = (rawEvent: string) => {
+    let event = 'message';
+    const dataLines: string[] = [];
+    for (const line of rawEvent.split('\n')) {
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+    }
+    if (dataLines.length === 0) return;
+    const data = JSON.parse(dataLines.join('\n'));
+
+    switch (event) {
+      case 'candidates':
+        handlers.onCandidates?.(data.candidates);
+        break;
+      case 'token':
+        fullText += data.text;
+        handlers.onToken?.(data.text);
+        break;
+      case 'done':
+        handlers.onDone?.();
+        break;
+      case 'error':
+        handlers.onError?.(data.detail);
+        break;
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let sep = buffer.indexOf('\n\n');
+    while (sep !== -1) {
+      dispatch(buffer.slice(0, sep));
+      buffer = buffer.slice(sep + 2);
+      sep = buffer.indexOf('\n\n');
+    }
+  }
+
+  return fullText;
+}
@@ -3,6 +3,7 @@ import { X, Sparkles } from 'lucide-react';
 import { ChatMessage, type Message } from './ChatMessage';
 import { ChatInput } from './ChatInput';
 import { getChatResponse } from '../../api/openai';
+import { BACKEND_CONFIGURED, streamRecommendations } from '../../api/backend';
 import { type RecommendedMovie } from '../../types/movie';
 
 interface ChatWindowProps {
@@ -15,6 +16,10 @@ export function ChatWindow({ onClose, movieContext }: ChatWindowProps) {
   const [isTyping, setIsTyping] = useState(false);
   const [contextLoaded, setContextLoaded] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const streamRef = useRef<AbortController | null>(null);
+
+  // Closing the chat drops an in-flight stream
+  useEffect(() => () => streamRef.current?.abort(), []);
 
   // Initialize messages based on whether we have movie context
   useEffect(() => {
@@ -49,6 +54,53 @@ export function ChatWindow({ onClose, movieContext }: ChatWindowProps) {
     scrollToBottom();
   }, [messages]);
 
+  // Ask the backend's /recommend/stream: the retrieved candidates show up as
+  // soon as retrieval finishes, then the ranked explanation is appended token by token
+  const streamFromBackend = async (content: string) => {
+    const controller = new AbortController();
+    streamRef.current = controller;
+    const replyId = (Date.now() + 1).toString();
+    const user = JSON.parse(localStorage.getItem('user') || '{}');
+    let gotCandidates = false;
+
+    const appendToReply = (text: string) =>
+      setMessages((prev) =>
+        prev.map((m) => (m.id === replyId ? { ...m, content: m.content + text } : m))
+      );
+
+    await streamRecommendations(
+      content,
+      user.id ?? null,
+      {
+        onCandidates: (candidates) => {
+          gotCandidates = true;
+          const list = candidates
+            .slice(0, 5)
+            .map((c) => `• ${c.title}${c.year ? ` (${c.year})` : ''}`)
+            .join('\n');
+          setMessages((prev) => [
+            ...prev,
+            {
+              id: replyId,
+              role: 'assistant',
+              content: `Top matches:\n${list}\n\n`,
+              timestamp: new Date(),
+            },
+          ]);
+          setIsTyping(false);
+        },
+        onToken: appendToReply,
+        onError: (detail) => {
+          // Nothing shown yet: fall through to the generic error message
+          if (!gotCandidates) throw new Error(detail);
+          console.error('Stream error:', detail);
+          appendToReply('\n\n(The explanation was cut off, please try again.)');
+        },
+      },
+      controller.signal
+    );
+  };
+
   const handleSend = async (content: string) => {
     // Add user message
     const userMessage: Message = {
@@ -61,6 +113,11 @@ export function ChatWindow({ onClose, movieContext }: ChatWindowProps) {
     setIsTyping(true);
 
     try {
+      if (!movieContext && BACKEND_CONFIGURED) {
+        await streamFromBackend(content);
+        return;
+      }
+
       // Build conversation history
       const history = messages
         .slice(1)
@@ -87,6 +144,7 @@ export function ChatWindow({ onClose, movieContext }: ChatWindowProps) {
       };
       setMessages((prev) => [...prev, assistantMessage]);
     } catch (error) {
+      if (streamRef.current?.signal.aborted) return;
       console.error('Chat error:', error);
       const errorMessage: Message = {
         id: (Date.now() + 1).toString(),
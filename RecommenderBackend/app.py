@@ -1,24 +1,168 @@
-from fastapi import FastAPI
+import asyncio
+import gc
+import json
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from recommender import recommend
+from event_log import get_event_log
+from recommender import RecommenderService, set_service
+from config import BATCH_MAX_ITEMS, CORS_ORIGINS, RECOMMENDER_PRELOAD
+from llm import breaker, get_completion_cache
+from metrics import register_service_collector, render_metrics
+
+
+# Preload mode (gunicorn_conf.py): this module is imported once by the
+# gunicorn master, which loads the model, catalog (into shared memory) and
+# index before forking. Workers inherit them and only build per-process
+# state in the lifespan below.
+_preloaded = None
+if RECOMMENDER_PRELOAD:
+    _preloaded = RecommenderService().load_shared(use_shared_memory=True)
+    # Keep the GC from writing to (and un-sharing) the inherited objects
+    gc.freeze()
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the recommender in the background so /healthz answers right away;
+    /readyz (and the recommend endpoints) wait for service.ready.
+    """
+    service = _preloaded or RecommenderService()
+    app.state.service = service
+    set_service(service)
+    register_service_collector(lambda: app.state.service, get_completion_cache)
+    startup = asyncio.create_task(asyncio.to_thread(service.start))
+    try:
+        yield
+    finally:
+        if not startup.done():
+            # Model/catalog loading can't be interrupted; let it finish first
+            await asyncio.wait([startup])
+        await asyncio.to_thread(service.close)
+        set_service(None)
 
-from typing import Optional
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+from typing import List, Optional
 
 class TasteRequest(BaseModel):
     user_input: str
     user_id: Optional[str] = None
 
 
+class BatchRequest(BaseModel):
+    items: List[TasteRequest]
+
+
+def _ready_service(request: Request) -> RecommenderService:
+    service: RecommenderService = request.app.state.service
+    if not service.ready:
+        raise HTTPException(status_code=503, detail="Recommender is still starting up.")
+    return service
+
+
 @app.post("/recommend")
-def recommend_api(req: TasteRequest):
-    return {
-        "recommendation": recommend(
-            user_input=req.user_input,
-            user_id=req.user_id
+async def recommend_api(req: TasteRequest, request: Request):
+    service = _ready_service(request)
+    return await service.arecommend_response(
+        user_input=req.user_input,
+        user_id=req.user_id
+    )
+
+
+@app.post("/recommend/batch")
+async def recommend_batch_api(req: BatchRequest, request: Request):
+    """
+    Many (user_id, user_input) pairs in one call, e.g. the nightly email job.
+    Results come back in request order; a failed rerank only affects its item.
+    """
+    service = _ready_service(request)
+    if len(req.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BATCH_MAX_ITEMS} items per batch (got {len(req.items)}).",
         )
+    results = await service.arecommend_batch(
+        [(item.user_input, item.user_id) for item in req.items]
+    )
+    return {"results": results}
+
+
+@app.post("/recommend/stream")
+async def recommend_stream_api(req: TasteRequest, request: Request):
+    """
+    Server-Sent Events version of /recommend.
+
+    Emits a `candidates` event as soon as retrieval finishes, then one
+    `token` event per LLM delta, then `done` (or `error`).
+    """
+    service = _ready_service(request)
+
+    async def event_source():
+        try:
+            async for event, payload in service.arecommend_stream(
+                user_input=req.user_input,
+                user_id=req.user_id,
+            ):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz(request: Request):
+    """Readiness: model, catalog, index and users are loaded and warmed up."""
+    service: RecommenderService = request.app.state.service
+    body = {
+        "ready": service.ready,
+        "startup_seconds": service.startup_timings,
     }
+    if service.startup_error:
+        body["error"] = service.startup_error
+    return JSONResponse(body, status_code=200 if service.ready else 503)
+
+
+@app.get("/stats")
+def stats(request: Request):
+    return {
+        "embedding_cache": request.app.state.service.embedding_cache_stats(),
+        "llm_cache": get_completion_cache().stats(),
+        "llm_breaker": breaker.stats(),
+        "singleflight": request.app.state.service.singleflight.stats(),
+        "user_store": request.app.state.service.user_vectors.store.stats(),
+        "event_log": get_event_log().stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus exposition: per-stage latency, cache hits, LLM errors."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 
 @app.get("/")
 def root():
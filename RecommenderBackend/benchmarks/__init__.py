@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Load tests and micro-benchmarks. Run from RecommenderBackend/ with
+#   python -m benchmarks.<name> --help
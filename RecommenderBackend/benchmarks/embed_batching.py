@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/embed_batching.py
+
+"""
+Throughput / latency of query embedding across concurrency levels.
+
+For each concurrency level N, N client threads each encode
+`--per-client` texts back-to-back, either
+
+  - direct:   backend.embed_texts([text])  (one forward pass per request)
+  - batched:  MicroBatcher.embed(text)     (dynamic micro-batching)
+
+and we report texts/s, p50/p95 latency and the mean flushed batch size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+
+from TasteEmbeddingGenerator.embeddings_backend import SentenceTransformerBackend
+from embed_batcher import MicroBatcher
+
+TEXTS = [
+    "I like slow atmospheric sci-fi",
+    "feel-good comedy for a rainy evening",
+    "sad movies with great acting",
+    "mind-bending thrillers like Inception",
+    "animated films the whole family can enjoy",
+    "gritty crime dramas set in the 70s",
+    "romantic movies that are not too cheesy",
+    "epic fantasy adventures with big battles",
+]
+
+
+def _run(embed_one, concurrency: int, per_client: int):
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def client(cid: int) -> None:
+        local = []
+        for j in range(per_client):
+            text = f"{TEXTS[(cid + j) % len(TEXTS)]} #{cid}-{j}"
+            t0 = time.perf_counter()
+            embed_one(text)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(concurrency)]
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t_start
+
+    lat = np.asarray(latencies)
+    return {
+        "texts_per_s": len(lat) / wall,
+        "p50_ms": float(np.percentile(lat, 50) * 1000),
+        "p95_ms": float(np.percentile(lat, 95) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark query-embedding micro-batching.")
+    parser.add_argument("--model", default="BAAI/bge-base-en-v1.5")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--per-client", type=int, default=16)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    backend = SentenceTransformerBackend(
+        model_name=args.model, device=args.device, show_progress_bar=False
+    )
+    backend.embed_texts(["warm-up"])  # load weights before timing
+
+    rows = []
+    for c in args.concurrency:
+        direct = _run(lambda t: backend.embed_texts([t]), c, args.per_client)
+        rows.append({"mode": "direct", "concurrency": c, **direct, "mean_batch": 1.0})
+
+        batcher = MicroBatcher(
+            backend, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms
+        )
+        batched = _run(batcher.embed, c, args.per_client)
+        rows.append(
+            {"mode": "batched", "concurrency": c, **batched, "mean_batch": batcher.mean_batch_size}
+        )
+        batcher.close()
+
+        print(
+            f"[embed_batching] concurrency={c:>3}  direct={direct['texts_per_s']:.1f}/s  "
+            f"batched={batched['texts_per_s']:.1f}/s"
+        )
+
+    print()
+    df = pd.DataFrame(rows).sort_values(["concurrency", "mode"])
+    print(df.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
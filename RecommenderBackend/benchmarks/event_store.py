@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/event_store.py
+
+"""
+Analytics reads on the event log: JSON segments vs the compacted,
+partitioned parquet store (event_store.py, compact_event_log.py).
+
+Writes --events synthetic events (--users users over --days days, 768-dim
+vectors) as event-log segments, times the analytics reads, compacts the
+segments and times the same reads on the store:
+
+  - one user's history (visualizations.utils.load_log_records)
+  - one user, a msg_index range (event_store.read_table)
+  - every event, the columns eval_embedding_alignment.py uses
+
+    python -m benchmarks.event_store --events 50000 --users 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import event_store
+from compact_event_log import compact
+from event_log import EventLogWriter, read_events
+from recommender import _log_record
+
+
+def _write(directory: Path, n: int, users: int, days: int, dim: int) -> None:
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((256, dim), dtype=np.float32)
+    counts: dict = {}
+    writer = EventLogWriter(directory, flush_interval_s=0)
+    batch = []
+    for i, uid in enumerate(rng.integers(0, users, size=n)):
+        user_id = f"user-{uid}"
+        counts[user_id] = counts.get(user_id, 0) + 1
+        rec = _log_record(
+            user_id=user_id,
+            msg_index=counts[user_id],
+            user_input=f"{user_id} message {counts[user_id]}",
+            history_text=f"- {user_id} message {counts[user_id]}",
+            user_vec=vecs[i % len(vecs)],
+            candidate_indices=np.arange(20),
+            candidate_scores=np.linspace(1.0, 0.5, 20),
+            final_k=5,
+        )
+        rec["timestamp"] = f"2026-10-{1 + i * days // n:02d}T12:00:00.000000Z"
+        batch.append(rec)
+        if len(batch) == 1000:
+            writer.append(batch)
+            batch = []
+    writer.append(batch)
+    writer.close()
+
+
+def _time(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event-log analytics reads.")
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        segments, store, legacy = Path(tmp) / "segments", Path(tmp) / "store", Path(tmp) / "none.jsonl"
+        _write(segments, args.events, args.users, args.days, args.dim)
+        seg_mb = sum(p.stat().st_size for p in segments.iterdir()) / 1e6
+
+        def read(**kw):
+            return sum(1 for _ in read_events(directory=segments, legacy_path=legacy, store_dir=store, **kw))
+
+        user_id = "user-7"
+        queries = {
+            "one user": lambda: read(user_id=user_id),
+            "one user, msg_index 3-5": lambda: sum(
+                1 for rec in read_events(user_id, directory=segments, legacy_path=legacy, store_dir=store)
+                if 3 <= rec["msg_index"] <= 5
+            ),
+            "all events, 3 columns": lambda: read(columns=("user_vec", "candidate_indices", "final_k")),
+        }
+        before = {name: _time(fn) for name, fn in queries.items()}
+
+        t0 = time.perf_counter()
+        stats = compact(segments, store)
+        compact_s = time.perf_counter() - t0
+        store_mb = sum(p.stat().st_size for p in store.rglob("*.parquet")) / 1e6
+
+        queries["one user, msg_index 3-5"] = lambda: event_store.read_table(
+            user_id, msg_index=(3, 5), directory=store
+        ).num_rows
+        after = {name: _time(fn) for name, fn in queries.items()}
+        plan = event_store.scan_plan(user_id, directory=store)
+        files = len(event_store.committed_files(store))
+
+    rows = []
+    for name in queries:
+        (t_seg, n_seg), (t_store, n_store) = before[name], after[name]
+        assert n_seg == n_store, (name, n_seg, n_store)
+        rows.append({
+            "query": name,
+            "rows": n_store,
+            "segments_ms": t_seg * 1000,
+            "parquet_ms": t_store * 1000,
+            "speedup": t_seg / t_store,
+        })
+
+    print(
+        f"[event_store] {args.events:,} events, {args.users:,} users, {args.days} days, dim={args.dim}: "
+        f"segments {seg_mb:.0f} MB -> parquet {store_mb:.0f} MB in {files} files "
+        f"(compaction {compact_s:.1f}s, {stats['sources']} segments)"
+    )
+    print(f"[event_store] {user_id}: {len(plan)} files, {sum(len(g) for _, g in plan)} row groups read")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/llm_stub.py
+
+"""
+Local stand-in for the OpenAI chat completions API with injected latency
+and errors, for measuring /recommend tail latency when the LLM misbehaves.
+
+  # 1) stub: 300 ms normally, 20% of calls hang for 60 s, 5% return 503
+  python -m benchmarks.llm_stub --port 9000 --latency-ms 300 \
+      --slow-fraction 0.2 --slow-ms 60000 --error-rate 0.05
+
+  # 2) API pointed at the stub (the openai client reads OPENAI_BASE_URL)
+  OPENAI_BASE_URL=http://localhost:9000/v1 LLM_CACHE_BYPASS=1 \
+      RECOMMEND_DEADLINE_S=3 uvicorn app:app --port 8000
+
+  # 3) load + p99, with the number of degraded answers per level
+  python -m benchmarks.load_test --concurrency 1 8 32
+
+Run step 2 with a very large RECOMMEND_DEADLINE_S to see the behaviour
+without deadlines (p99 follows --slow-ms). Streaming is not emulated.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def build_app(args) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(args.seed)
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        roll = rng.random()
+        if roll < args.error_rate:
+            await asyncio.sleep(args.latency_ms / 1000)
+            return JSONResponse(
+                {"error": {"message": "stub: injected failure", "type": "server_error"}},
+                status_code=503,
+            )
+        slow = roll < args.error_rate + args.slow_fraction
+        await asyncio.sleep((args.slow_ms if slow else args.latency_ms) / 1000)
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "1. Stub Movie - stub explanation."},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI server with injected latency.")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="normal response time")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="share of slow calls")
+    parser.add_argument("--slow-ms", type=float, default=30_000.0, help="response time of slow calls")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    uvicorn.run(build_app(args), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/load_test.py
+
+"""
+Concurrent-request load test for the /recommend endpoint.
+
+Fires `--requests` POSTs at a running server with a fixed number of
+in-flight requests and reports throughput and latency percentiles per
+concurrency level.
+
+Before/after comparison:
+  1. Start the server on the old sync build:  uvicorn app:app --port 8000
+  2. python -m benchmarks.load_test --url http://localhost:8000
+  3. Repeat against the async build and compare the req/s column.
+
+With a sync `def` endpoint, throughput flattens once the threadpool
+(40 slots by default) is saturated by LLM round-trips; with the async
+endpoint it keeps scaling until OpenAI rate limits kick in.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+import numpy as np
+import pandas as pd
+
+SAMPLE_INPUTS = [
+    "I like slow atmospheric sci-fi",
+    "feel-good comedy for a rainy evening",
+    "sad movies with great acting",
+    "mind-bending thrillers like Inception",
+    "animated films the whole family can enjoy",
+]
+
+
+async def _run_level(
+    client: httpx.AsyncClient,
+    url: str,
+    concurrency: int,
+    n_requests: int,
+    with_user_id: bool,
+) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+    degraded = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors, degraded
+        payload = {"user_input": SAMPLE_INPUTS[i % len(SAMPLE_INPUTS)]}
+        if with_user_id:
+            payload["user_id"] = f"loadtest-{uuid.uuid4()}"
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post(url, json=payload)
+                resp.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - t0)
+            if resp.headers.get("content-type", "").startswith("application/json"):
+                degraded += bool(resp.json().get("degraded"))
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    wall = time.perf_counter() - t_start
+
+    lat = np.asarray(latencies) if latencies else np.asarray([np.nan])
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "degraded": degraded,
+        "req_per_s": len(latencies) / wall if wall > 0 else float("nan"),
+        "p50_ms": float(np.percentile(lat, 50) * 1000),
+        "p95_ms": float(np.percentile(lat, 95) * 1000),
+        "p99_ms": float(np.percentile(lat, 99) * 1000),
+    }
+
+
+async def main_async(args) -> None:
+    url = args.url.rstrip("/") + args.endpoint
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 10)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        rows = []
+        for c in args.concurrency:
+            row = await _run_level(client, url, c, args.requests, args.with_user_id)
+            print(
+                f"[load_test] concurrency={c:>3}  {row['req_per_s']:.2f} req/s  "
+                f"p50={row['p50_ms']:.0f}ms  p99={row['p99_ms']:.0f}ms  "
+                f"errors={row['errors']}  degraded={row['degraded']}"
+            )
+            rows.append(row)
+
+    print()
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the recommender API.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/recommend")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=64, help="requests per level")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--with-user-id",
+        action="store_true",
+        help="send a fresh user_id per request (exercises persistence too)",
+    )
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/onnx_encoder.py
+
+"""
+Query-encoder throughput on CPU: PyTorch (sentence-transformers) vs the
+int8 ONNX Runtime backend, for batch sizes 1..64.
+
+    python -m benchmarks.onnx_encoder --threads 4
+
+Use the per-worker thread count (cores // WEB_CONCURRENCY) for --threads
+to match what each gunicorn worker gets. The first run exports and
+quantizes the model (see OnnxEmbeddingBackend).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+
+from TasteEmbeddingGenerator.embeddings_backend import (
+    OnnxEmbeddingBackend,
+    SentenceTransformerBackend,
+)
+
+from benchmarks.embed_batching import TEXTS
+
+
+def _bench(backend, batch_size: int, min_seconds: float) -> dict:
+    batch = [f"{TEXTS[i % len(TEXTS)]} #{i}" for i in range(batch_size)]
+    backend.embed_texts(batch)  # warm-up at this shape
+    latencies = []
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < min_seconds or len(latencies) < 3:
+        t0 = time.perf_counter()
+        backend.embed_texts(batch)
+        latencies.append(time.perf_counter() - t0)
+    lat = np.asarray(latencies)
+    return {
+        "texts_per_s": batch_size * len(lat) / lat.sum(),
+        "p50_ms": float(np.percentile(lat, 50) * 1000),
+        "p95_ms": float(np.percentile(lat, 95) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PyTorch vs ONNX int8 query encoding.")
+    parser.add_argument("--model", default="BAAI/bge-base-en-v1.5")
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--min-seconds", type=float, default=2.0, help="time per cell")
+    args = parser.parse_args()
+
+    import torch
+
+    torch.set_num_threads(args.threads)
+    backends = {
+        "torch": SentenceTransformerBackend(
+            model_name=args.model, device="cpu", show_progress_bar=False
+        ),
+        "onnx-int8": OnnxEmbeddingBackend(
+            model_name=args.model, onnx_dir=args.onnx_dir, intra_op_threads=args.threads
+        ),
+    }
+
+    rows = []
+    for bs in args.batch_sizes:
+        for name, backend in backends.items():
+            rows.append({"backend": name, "batch": bs, **_bench(backend, bs, args.min_seconds)})
+        torch_tps, onnx_tps = rows[-2]["texts_per_s"], rows[-1]["texts_per_s"]
+        print(
+            f"[onnx_encoder] batch={bs:>3}  torch={torch_tps:.1f}/s  "
+            f"onnx-int8={onnx_tps:.1f}/s  ({onnx_tps / torch_tps:.2f}x)"
+        )
+
+    print()
+    df = pd.DataFrame(rows).sort_values(["batch", "backend"])
+    print(df.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
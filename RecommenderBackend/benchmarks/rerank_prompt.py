@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/rerank_prompt.py
+
+"""
+Rerank prompt size (and optionally LLM latency): full metadata dicts vs
+compact candidate cards.
+
+Replays the queries in the event log (event_log.py): for each logged event the prompt is
+rebuilt from the logged history, message and retrieved candidate indices,
+once in the old format (Python repr of the metadata dicts) and once with
+the card table used by recommender._build_rerank_prompt.
+
+  python -m benchmarks.rerank_prompt                 # token counts only
+  python -m benchmarks.rerank_prompt --latency 5     # + 5 live rerank calls per format
+
+Token counts use tiktoken (o200k_base, the gpt-4o tokenizer) if installed,
+otherwise a chars/4 estimate.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import EVENT_LOG_DIR, FINAL_K, MOVIE_EMBED_PATH
+from embedding_loader import load_movie_embeddings
+from event_log import read_events
+from llm import chat
+from recommender import _build_rerank_prompt
+
+
+def _legacy_prompt(history_text: str, user_input: str, candidates: list) -> str:
+    """The rerank prompt as it was built before compact cards."""
+    candidates = [{k: v for k, v in c.items() if k != "card"} for c in candidates]
+    return f"""
+You are a movie recommender system.
+
+User's long-term preferences so far:
+{history_text}
+
+User's latest message:
+{user_input}
+
+Candidate movies (as a Python-like list of dicts):
+{candidates}
+
+From these candidates, choose the best {FINAL_K} movies
+that match BOTH the user's long-term tastes and their latest message.
+Explain briefly why each one fits.
+Return a clear, human-readable list.
+"""
+
+
+def _token_counter():
+    try:
+        import tiktoken
+
+        enc = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(enc.encode(text)), "tiktoken o200k_base"
+    except Exception:
+        return lambda text: len(text) // 4, "chars/4 estimate"
+
+
+def _load_events(directory, limit: int) -> list:
+    return list(itertools.islice(read_events(directory=directory), limit or None))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log", default=str(EVENT_LOG_DIR), help="event log directory")
+    parser.add_argument("--limit", type=int, default=0, help="max events to replay (0 = all)")
+    parser.add_argument(
+        "--latency",
+        type=int,
+        default=0,
+        help="also time N uncached rerank calls per prompt format (costs API calls)",
+    )
+    args = parser.parse_args()
+
+    _, movie_metadata = load_movie_embeddings(MOVIE_EMBED_PATH)
+    count_tokens, tokenizer = _token_counter()
+
+    rows = []
+    for ev in _load_events(args.log, args.limit):
+        candidates = [
+            movie_metadata[i] for i in ev["candidate_indices"] if 0 <= i < len(movie_metadata)
+        ]
+        if not candidates:
+            continue
+        legacy = _legacy_prompt(ev["history_text"], ev["user_input"], candidates)
+        compact = _build_rerank_prompt(ev["history_text"], ev["user_input"], candidates)
+        rows.append({
+            "user_input": ev["user_input"][:40],
+            "candidates": len(candidates),
+            "legacy_tokens": count_tokens(legacy),
+            "card_tokens": count_tokens(compact),
+            "_prompts": (legacy, compact),
+        })
+
+    if not rows:
+        print(f"[rerank_prompt] No replayable events in {args.log}")
+        return
+
+    df = pd.DataFrame(rows)
+    df["ratio"] = df["legacy_tokens"] / df["card_tokens"]
+    print(f"Token counts ({tokenizer}), {len(df)} replayed queries:\n")
+    print(df.drop(columns="_prompts").to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    print(
+        f"\nmean prompt tokens: legacy={df['legacy_tokens'].mean():.0f}  "
+        f"cards={df['card_tokens'].mean():.0f}  "
+        f"({df['legacy_tokens'].sum() / df['card_tokens'].sum():.1f}x smaller)"
+    )
+
+    if args.latency <= 0:
+        return
+
+    timings = {"legacy": [], "cards": []}
+    for legacy, compact in df["_prompts"].head(args.latency):
+        for name, prompt in (("legacy", legacy), ("cards", compact)):
+            t0 = time.perf_counter()
+            chat([{"role": "user", "content": prompt}], temperature=0.4, use_cache=False)
+            timings[name].append(time.perf_counter() - t0)
+
+    print("\nEnd-to-end rerank latency (uncached):")
+    for name, values in timings.items():
+        v = np.asarray(values)
+        print(f"  {name:>6}: p50={np.percentile(v, 50):.2f}s  mean={v.mean():.2f}s  n={len(v)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/user_cache.py
+
+"""
+LRU user cache (user_cache.CachedUserStore) under a Zipfian access pattern.
+
+Simulates --users distinct users (default 1M) of which a few are very
+active: each request picks a user with P(rank k) ~ 1 / k^s and does what
+RecommenderService._update_user does (versioned read, EMA fusion,
+history append, compare-and-set). Compared configurations:
+
+  - store:          SQLiteUserStore directly (no cache)
+  - lru-N:          write-through cache of N users
+  - lru-N-wb:       write-back cache of N users (flush every 200 ms)
+
+Reports per-request p50/p99, cache hit rate and how many store reads /
+writes the requests caused.
+
+    python -m benchmarks.user_cache --users 1000000 --requests 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from user_cache import CachedUserStore
+from user_store import SQLiteUserStore, UserRecord, append_history
+
+ALPHA = 0.8
+
+
+def _zipf_ids(n_users: int, n_requests: int, s: float, rng) -> np.ndarray:
+    p = 1.0 / np.arange(1, n_users + 1) ** s
+    return rng.choice(n_users, size=n_requests, p=p / p.sum())
+
+
+def _run(store, ids: np.ndarray, taste: np.ndarray, row_of: np.ndarray) -> dict:
+    lat = np.empty(len(ids))
+    for n, uid in enumerate(ids):
+        user_id = f"user-{uid}"
+        new_vec = taste[row_of[n]]
+        t0 = time.perf_counter()
+        while True:
+            prev = store.get_many_versioned([user_id])[user_id]
+            vec = new_vec if prev.vec is None else ALPHA * prev.vec + (1 - ALPHA) * new_vec
+            vec = vec / np.linalg.norm(vec)
+            rec = UserRecord(vec, prev.version + 1, append_history(prev.history, f"message {n}"))
+            if not store.compare_and_set_many({user_id: (rec, prev.version)}):
+                break
+        lat[n] = time.perf_counter() - t0
+    lat *= 1000
+    return {"p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LRU user cache.")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent s")
+    parser.add_argument("--capacity", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    ids = _zipf_ids(args.users, args.requests, args.zipf, rng)
+    distinct, row_of = np.unique(ids, return_inverse=True)
+    taste = rng.standard_normal((len(distinct), args.dim), dtype=np.float32)  # one per user
+    print(
+        f"[user_cache] {args.requests:,} requests over {args.users:,} users "
+        f"(zipf s={args.zipf}): {len(distinct):,} distinct, "
+        f"top 1% of users = {np.isin(ids, np.arange(args.users // 100)).mean():.0%} of requests"
+    )
+
+    configs = [("store", None, 0.0)]
+    for cap in args.capacity:
+        configs += [(f"lru-{cap}", cap, 0.0), (f"lru-{cap}-wb", cap, 0.2)]
+
+    rows = []
+    for name, capacity, flush_s in configs:
+        with tempfile.TemporaryDirectory() as tmp:
+            inner = SQLiteUserStore(Path(tmp) / "users.sqlite", import_legacy=False)
+            store = inner if capacity is None else CachedUserStore(inner, capacity, flush_s).start()
+            t0 = time.perf_counter()
+            row = {"config": name, **_run(store, ids, taste, row_of)}
+            row["req_per_s"] = len(ids) / (time.perf_counter() - t0)
+            if capacity is not None:
+                cache = store.stats()["cache"]
+                row.update(hit_rate=cache["hit_rate"], evictions=cache["evictions"])
+                store.close()
+            row.update(store_reads=inner.reads, store_writes=inner.writes)
+            inner.close()
+        rows.append(row)
+        print(f"[user_cache] {name:>14}: p50={row['p50_ms']:.3f} ms  hit_rate={row.get('hit_rate', 0):.1%}")
+
+    print()
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
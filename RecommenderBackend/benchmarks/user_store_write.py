@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/user_store_write.py
+
+"""
+Per-request cost of persisting one user's updated vector.
+
+  - rewrite:  the old save_user_state(): DataFrame of every user ->
+              runtime_users.parquet (O(total users) per request)
+  - wal:      WalUserStore.upsert_many({user: vec}) with the group-fsync
+              thread running (O(1) per request)
+  - sqlite:   SQLiteUserStore.upsert_many({user: vec}), the default
+              backend (one row per user, WAL-mode SQLite)
+
+Also times one compaction (snapshot of all users + WAL -> new snapshot)
+and a cold load (snapshot + WAL replay).
+
+    python -m benchmarks.user_store_write --users 10000 1000000
+
+1M users x 768 floats is ~3 GB of float32; use --dim 128 on small
+machines. The rewrite is skipped above --rewrite-max-users (it takes
+minutes per call there).
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from user_store import SQLiteUserStore, WalUserStore, write_snapshot
+
+
+def _legacy_save(path: Path, state) -> None:
+    # The pre-WAL save_user_state(), verbatim
+    data = {"user_id": [], "embedding": []}
+    for user_id, vec in state.items():
+        data["user_id"].append(str(user_id))
+        data["embedding"].append(vec.tolist())
+    pd.DataFrame(data).to_parquet(path, index=False)
+
+
+def _percentiles(lat) -> dict:
+    lat = np.asarray(lat) * 1000
+    return {"p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99))}
+
+
+def _random_state(n: int, dim: int, rng) -> dict:
+    mat = rng.standard_normal((n, dim), dtype=np.float32)
+    mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+    return {f"user-{i}": mat[i] for i in range(n)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark user-state persistence.")
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--appends", type=int, default=2000, help="WAL upserts to time")
+    parser.add_argument("--rewrites", type=int, default=3, help="full rewrites to time")
+    parser.add_argument("--rewrite-max-users", type=int, default=100_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    rows = []
+    for n in args.users:
+        state = _random_state(n, args.dim, rng)
+        hot = list(state.keys())[:1000]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = Path(tmp) / "runtime_users.parquet"
+
+            if n <= args.rewrite_max_users:
+                lat = []
+                for i in range(args.rewrites):
+                    state[hot[i % len(hot)]] = state[hot[i % len(hot)]] * 1.0
+                    t0 = time.perf_counter()
+                    _legacy_save(snapshot, state)
+                    lat.append(time.perf_counter() - t0)
+                rows.append({"users": n, "mode": "rewrite", **_percentiles(lat)})
+            else:
+                rows.append({"users": n, "mode": "rewrite", "p50_ms": float("nan"), "p99_ms": float("nan")})
+
+            write_snapshot(snapshot, state)
+            store = WalUserStore(snapshot, compact_bytes=1 << 62, compact_interval_s=1e9).start()
+            lat = []
+            for i in range(args.appends):
+                uid = hot[int(rng.integers(len(hot)))]
+                t0 = time.perf_counter()
+                store.upsert_many({uid: state[uid]})
+                lat.append(time.perf_counter() - t0)
+            store.sync()
+            rows.append({"users": n, "mode": "wal", **_percentiles(lat), "fsyncs": store.fsyncs})
+
+            t0 = time.perf_counter()
+            store.compact()
+            compact_s = time.perf_counter() - t0
+            store.upsert_many({hot[0]: state[hot[0]]})
+            store.close()
+
+            t0 = time.perf_counter()
+            loaded = WalUserStore(snapshot).load_all()
+            load_s = time.perf_counter() - t0
+            assert len(loaded) == n
+            del loaded
+
+            db = SQLiteUserStore(Path(tmp) / "runtime_users.sqlite", import_legacy=False)
+            db.upsert_many(state)
+            lat = []
+            for i in range(args.appends):
+                uid = hot[int(rng.integers(len(hot)))]
+                t0 = time.perf_counter()
+                db.upsert_many({uid: state[uid]})
+                lat.append(time.perf_counter() - t0)
+            rows.append({"users": n, "mode": "sqlite", **_percentiles(lat)})
+            db.close()
+
+        print(
+            f"[user_store_write] users={n:>9,}  rewrite p50={rows[-3]['p50_ms']:.1f} ms  "
+            f"wal p50={rows[-2]['p50_ms']:.3f} ms  sqlite p50={rows[-1]['p50_ms']:.3f} ms  "
+            f"compaction={compact_s:.2f}s  load={load_s:.2f}s"
+        )
+        del state
+
+    print()
+    df = pd.DataFrame(rows)
+    print(df.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/user_vector_codec.py
+
+"""
+Accuracy and size of the user-vector codecs (USER_VECTOR_CODEC).
+
+Each simulated user sends --messages inputs whose taste vectors lie near
+a few "liked" movies. The EMA fusion of RecommenderService runs once in
+float32 (reference) and once per codec with a store round trip after
+every message (decode -> fuse -> encode, as in production), so
+quantization error can accumulate. Reported per codec:
+
+  - bytes per vector and the SQLite file size for --users users
+  - drift: 1 - cosine(codec vector, float32 vector) after the last message
+  - recall@TOP_K / @FINAL_K of the retrieved movies vs the float32 vector
+
+Uses the real movie embeddings (MOVIE_EMBED_PATH) if present, else a
+random catalog:
+
+    python -m benchmarks.user_vector_codec --users 2000 --messages 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import FINAL_K, MOVIE_EMBED_PATH, TOP_K
+from recommender import USER_FUSE_ALPHA, _normalize_rows
+from user_store import VECTOR_CODECS, SQLiteUserStore, decode_vector, encode_vector
+
+
+def _movies(n: int, dim: int, rng) -> np.ndarray:
+    if MOVIE_EMBED_PATH and Path(MOVIE_EMBED_PATH).exists():
+        from embedding_loader import load_movie_embeddings
+
+        emb, _ = load_movie_embeddings(MOVIE_EMBED_PATH)
+        return _normalize_rows(emb)
+    print(f"[user_vector_codec] MOVIE_EMBED_PATH not set or missing; using {n:,} random movies")
+    return _normalize_rows(rng.standard_normal((n, dim), dtype=np.float32))
+
+
+def _round_trip(mat: np.ndarray, codec: str) -> np.ndarray:
+    return np.stack([decode_vector(encode_vector(v, codec), codec) for v in mat])
+
+
+def _recall(reference: np.ndarray, other: np.ndarray, movies: np.ndarray, k: int) -> float:
+    ref = np.argpartition(-(reference @ movies.T), k, axis=1)[:, :k]
+    got = np.argpartition(-(other @ movies.T), k, axis=1)[:, :k]
+    return float(np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(ref, got)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark user-vector codecs.")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--movies", type=int, default=20_000, help="random catalog size (fallback)")
+    parser.add_argument("--dim", type=int, default=768, help="random catalog dim (fallback)")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    movies = _movies(args.movies, args.dim, rng)
+    n, dim = args.users, movies.shape[1]
+
+    # Inputs: noisy copies of one of each user's 3 liked movies
+    liked = rng.integers(0, len(movies), size=(n, 3))
+    fused = {codec: None for codec in VECTOR_CODECS}
+    for _ in range(args.messages):
+        pick = liked[np.arange(n), rng.integers(0, 3, size=n)]
+        new = _normalize_rows(movies[pick] + 0.5 * rng.standard_normal((n, dim), dtype=np.float32) / np.sqrt(dim))
+        for codec, prev in fused.items():
+            vec = new if prev is None else _normalize_rows(USER_FUSE_ALPHA * prev + (1.0 - USER_FUSE_ALPHA) * new)
+            fused[codec] = _round_trip(vec, codec)
+
+    reference = fused["float32"]
+    rows = []
+    for codec, vecs in fused.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "users.sqlite"
+            store = SQLiteUserStore(path, import_legacy=False, codec=codec)
+            store.upsert_many({f"user-{i}": v for i, v in enumerate(vecs)})
+            store._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            db_mb = path.stat().st_size / 1e6
+            store.close()
+        cos = np.sum(vecs * reference, axis=1) / np.linalg.norm(vecs, axis=1)
+        rows.append({
+            "codec": codec,
+            "bytes/vec": len(encode_vector(reference[0], codec)),
+            "db_mb": db_mb,
+            "drift_mean": float(np.mean(1 - cos)),
+            "drift_max": float(np.max(1 - cos)),
+            f"recall@{TOP_K}": _recall(reference, vecs, movies, TOP_K),
+            f"recall@{FINAL_K}": _recall(reference, vecs, movies, FINAL_K),
+        })
+
+    print(
+        f"[user_vector_codec] {n:,} users x {args.messages} messages, "
+        f"{len(movies):,} movies, dim={dim}, alpha={USER_FUSE_ALPHA}"
+    )
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+
+
+if __name__ == "__main__":
+    main()
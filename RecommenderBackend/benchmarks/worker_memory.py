@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# RecommenderBackend/benchmarks/worker_memory.py
+
+"""
+Per-worker memory with and without preload (shared catalog + model).
+
+For each worker count, starts `gunicorn app:app -c gunicorn_conf.py` with
+RECOMMENDER_PRELOAD=0 and =1, waits until every worker reports ready, and
+reads /proc/<pid>/smaps_rollup of each worker:
+
+  - RSS: resident pages (shared pages are counted in every worker)
+  - PSS: shared pages divided among the processes mapping them
+  - USS: pages private to the worker (what one more worker really costs)
+
+Linux only. Run from RecommenderBackend/:
+    python -m benchmarks.worker_memory --workers 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _children(pid: int) -> list[int]:
+    kids: list[int] = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        text = (task / "children").read_text().split()
+        kids.extend(int(k) for k in text)
+    return kids
+
+
+def _smaps_rollup_kb(pid: int) -> dict:
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        fields[key.strip()] = int(value.split()[0])
+    return {
+        "rss_mb": fields["Rss"] / 1024,
+        "pss_mb": fields["Pss"] / 1024,
+        "uss_mb": (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024,
+    }
+
+
+def _wait_ready(url: str, n_workers: int, timeout_s: float) -> None:
+    # Requests land on arbitrary workers; require a run of consecutive 200s
+    deadline = time.monotonic() + timeout_s
+    streak = 0
+    while time.monotonic() < deadline:
+        try:
+            ok = httpx.get(url, timeout=2.0).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= 4 * n_workers:
+            return
+        time.sleep(0.25)
+    raise TimeoutError(f"workers not ready after {timeout_s}s")
+
+
+def measure(n_workers: int, preload: bool, port: int, timeout_s: float) -> dict:
+    env = dict(
+        os.environ,
+        RECOMMENDER_PRELOAD="1" if preload else "0",
+        WEB_CONCURRENCY=str(n_workers),
+        BIND=f"127.0.0.1:{port}",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app:app", "-c", "gunicorn_conf.py"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(f"http://127.0.0.1:{port}/readyz", n_workers, timeout_s)
+        workers = _children(proc.pid)
+        per_worker = pd.DataFrame([_smaps_rollup_kb(pid) for pid in workers])
+        master = _smaps_rollup_kb(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+    return {
+        "workers": n_workers,
+        "preload": preload,
+        "rss_per_worker_mb": per_worker["rss_mb"].mean(),
+        "pss_per_worker_mb": per_worker["pss_mb"].mean(),
+        "uss_per_worker_mb": per_worker["uss_mb"].mean(),
+        "total_pss_mb": per_worker["pss_mb"].sum() + master["pss_mb"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-worker memory with/without preload.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.workers:
+        for preload in (False, True):
+            row = measure(n, preload, args.port, args.timeout)
+            print(
+                f"[worker_memory] workers={n} preload={preload}  "
+                f"uss/worker={row['uss_per_worker_mb']:.0f} MB  total pss={row['total_pss_mb']:.0f} MB"
+            )
+            rows.append(row)
+
+    print()
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda x: f"{x:.1f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# RecommenderBackend/compact_event_log.py
+
+"""
+Compact sealed event-log segments into the partitioned parquet store.
+
+Each sealed segment in EVENT_LOG_DIR (event_log.py) is rewritten into
+EVENT_STORE_DIR (event_store.py), partitioned by date and user hash, then
+deleted. Active segments are left to their writers, except those whose
+writer process has exited without sealing them (crash, kill -9): they are
+sealed first and compacted with the rest. With --legacy the
+pre-segment rec_log.jsonl is compacted too and renamed to
+rec_log.jsonl.compacted.
+
+  - per source: write its parquet files, list it in the manifest (with
+    its message counters), then delete it; the manifest is the commit
+    point, so readers never see a source twice and a re-run after an
+    interruption overwrites the half-written files
+  - one compaction at a time (flock on <store>/.compact.lock); safe to run
+    from cron next to the service, on the host that runs it (writers are
+    checked by pid)
+
+    python compact_event_log.py            # sealed segments
+    python compact_event_log.py --legacy   # and rec_log.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import EVENT_LOG_DIR, EVENT_STORE_BUCKETS, EVENT_STORE_DIR, EVENT_STORE_ROW_GROUP
+from event_log import (
+    ACTIVE_SUFFIX,
+    LEGACY_LOG_PATH,
+    _read_legacy,
+    list_segments,
+    read_segment,
+    seal_orphaned_segments,
+)
+from event_store import read_manifest, write_manifest, write_source
+from user_store import _FileLock
+
+LEGACY_SOURCE = "legacy"
+
+
+def _retire_legacy(path: Path) -> None:
+    if path.exists():
+        os.replace(path, path.with_name(path.name + ".compacted"))
+
+
+def _retire_segment(meta_path: Path, vec_path: Path) -> None:
+    meta_path.unlink(missing_ok=True)  # metadata first: a reader then sees no events, not missing vectors
+    vec_path.unlink(missing_ok=True)
+
+
+def compact(
+    segment_dir: Path = EVENT_LOG_DIR,
+    store_dir: Path = EVENT_STORE_DIR,
+    legacy_path: Optional[Path] = None,
+    buckets: int = EVENT_STORE_BUCKETS,
+    row_group_size: int = EVENT_STORE_ROW_GROUP,
+) -> dict:
+    """
+    Move every sealed segment (and `legacy_path`, if given) into the store,
+    after sealing the segments of dead writers. Returns {"sources",
+    "events", "files", "skipped", "orphans_sealed"}.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    lock = _FileLock(store_dir / ".compact.lock")
+    lock.acquire(exclusive=True)
+    try:
+        manifest = read_manifest(store_dir)
+        if not manifest["sources"]:
+            manifest["buckets"] = buckets
+        done = set(manifest["sources"])
+        orphans = seal_orphaned_segments(segment_dir)
+        for stem in orphans:
+            print(f"[compact] Sealed {stem}: its writer is gone")
+
+        # (source, events, retire)
+        sources = []
+        if legacy_path is not None and Path(legacy_path).exists():
+            p = Path(legacy_path)
+            sources.append((LEGACY_SOURCE, lambda p=p: _read_legacy(p, None), lambda p=p: _retire_legacy(p)))
+        for stem, meta_path, vec_path in list_segments(segment_dir):
+            if not meta_path.name.endswith(ACTIVE_SUFFIX):
+                sources.append((
+                    stem,
+                    lambda m=meta_path, v=vec_path: read_segment(m, v),
+                    lambda m=meta_path, v=vec_path: _retire_segment(m, v),
+                ))
+
+        stats = {"sources": 0, "events": 0, "files": 0, "skipped": 0, "orphans_sealed": len(orphans)}
+        for source, events, retire in sources:
+            if source in done:  # interrupted after the manifest was written
+                retire()
+                continue
+            t0 = time.perf_counter()
+            files, counts, written, skipped = write_source(
+                source, events(), store_dir, manifest["buckets"], row_group_size
+            )
+            manifest["sources"].append(source)
+            for uid, mi in counts.items():
+                if mi > manifest["counts"].get(uid, 0):
+                    manifest["counts"][uid] = mi
+            write_manifest(manifest, store_dir)
+            retire()
+
+            stats["sources"] += 1
+            stats["events"] += written
+            stats["files"] += len(files)
+            stats["skipped"] += skipped
+            print(f"[compact] {source}: {written} events, {len(files)} files in {time.perf_counter() - t0:.1f}s")
+        return stats
+    finally:
+        lock.release()
+        lock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact sealed event-log segments into the parquet store.")
+    parser.add_argument("--segments", default=EVENT_LOG_DIR, help="event log directory")
+    parser.add_argument("--store", default=EVENT_STORE_DIR, help="parquet store directory")
+    parser.add_argument("--legacy", action="store_true", help=f"also compact {LEGACY_LOG_PATH.name}")
+    args = parser.parse_args()
+
+    stats = compact(args.segments, args.store, LEGACY_LOG_PATH if args.legacy else None)
+    print(f"[compact] Done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
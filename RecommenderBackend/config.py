@@ -7,6 +7,93 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MOVIE_EMBED_PATH = os.getenv("MOVIE_EMBED_PATH")
 USER_EMBED_PATH = os.getenv("USER_EMBED_PATH")
 
+# Browser origins allowed to call the API (the Demo runs on Vite's dev port)
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
+
+# Preload mode (set by gunicorn_conf.py): load the catalog/model once in the
+# master and share it with forked workers
+RECOMMENDER_PRELOAD = os.getenv("RECOMMENDER_PRELOAD", "0") == "1"
+
+# Query encoder device ("cuda", "mps", "cpu"); unset -> auto-detect
+EMBED_DEVICE = os.getenv("EMBED_DEVICE") or None
+
+# Query encoder implementation: "sentence-transformers" (PyTorch) or "onnx"
+# (int8-quantized ONNX Runtime, CPU only; exported on first start)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "sentence-transformers")
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR")
+# Query encoder model. Stored user vectors are tagged with it; after a
+# change, run migrate_user_vectors.py to rebuild them in the new space
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "BAAI/bge-base-en-v1.5")
+
+# Query-embedding cache: in-memory LRU size, plus optional float16 disk store
+EMBED_CACHE_MB = int(os.getenv("EMBED_CACHE_MB", "64"))
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR")
+
+# Runtime user vectors (user_store.py): "sqlite" (shared by all workers,
+# point reads) or "wal" (parquet snapshot + append-only log, in-process copy)
+USER_STORE_BACKEND = os.getenv("USER_STORE_BACKEND", "sqlite")
+USER_STORE_PATH = os.getenv(
+    "USER_STORE_PATH", os.path.join(os.path.dirname(__file__), "runtime_users.sqlite")
+)
+# In-process LRU of user state in front of the store (user_cache.py): max
+# users held, and the write-back interval (0 = write through, needed with
+# several workers)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_FLUSH_MS = float(os.getenv("USER_CACHE_FLUSH_MS", "0"))
+# Messages of each user kept (and stored) for the LLM prompt
+USER_HISTORY_LEN = int(os.getenv("USER_HISTORY_LEN", "10"))
+# How the "sqlite" backend stores vectors: "float32", "float16" (half the
+# bytes) or "int8" (a quarter, plus a per-vector scale). Rows keep the
+# codec they were written with, so switching needs no migration.
+USER_VECTOR_CODEC = os.getenv("USER_VECTOR_CODEC", "float32")
+# "wal" backend: group-fsync interval and when the background compactor
+# folds the WAL into the parquet snapshot
+USER_WAL_FSYNC_MS = float(os.getenv("USER_WAL_FSYNC_MS", "50"))
+USER_WAL_COMPACT_MB = float(os.getenv("USER_WAL_COMPACT_MB", "64"))
+USER_WAL_COMPACT_INTERVAL_S = float(os.getenv("USER_WAL_COMPACT_INTERVAL_S", "300"))
+
+# Recommendation event log (event_log.py): directory of per-process
+# segments, how often the background thread writes the buffered events
+# (0 = on every append), and the size at which a segment is sealed
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", os.path.join(os.path.dirname(__file__), "rec_log"))
+EVENT_LOG_FLUSH_MS = float(os.getenv("EVENT_LOG_FLUSH_MS", "200"))
+EVENT_LOG_SEGMENT_MB = float(os.getenv("EVENT_LOG_SEGMENT_MB", "64"))
+# Parquet store the sealed segments are compacted into (event_store.py,
+# compact_event_log.py): user-hash partitions per date (fixed when the
+# store is created) and rows per row group
+EVENT_STORE_DIR = os.getenv("EVENT_STORE_DIR", os.path.join(os.path.dirname(__file__), "rec_events"))
+EVENT_STORE_BUCKETS = int(os.getenv("EVENT_STORE_BUCKETS", "16"))
+EVENT_STORE_ROW_GROUP = int(os.getenv("EVENT_STORE_ROW_GROUP", "1024"))
+
+# LLM completion cache (SQLite, shared by all workers on this machine)
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "llm_cache.sqlite")
+)
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0") == "1"
+
+# Process-wide limits for OpenAI traffic (llm.py / rate_limit.py). Set the
+# per-minute budgets a little under the account limits, divided by the
+# number of worker processes.
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "8"))
+
+# Per-request time budget (seconds). When the LLM can't answer within what
+# is left of it, or its circuit breaker is open, /recommend returns a
+# retrieval-only response marked "degraded".
+RECOMMEND_DEADLINE_S = float(os.getenv("RECOMMEND_DEADLINE_S", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+
+# /recommend/batch: max items per call, and concurrent LLM reranks per call
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "256"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
 
 TOP_K = 20
 FINAL_K = 5
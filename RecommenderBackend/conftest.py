@@ -0,0 +1,95 @@
+# RecommenderBackend/conftest.py
+
+"""
+Shared fakes for the service tests: a deterministic encoder, a small random
+catalog and a context manager that swaps module attributes (the LLM, the
+event log) for the duration of a test and puts them back afterwards.
+
+pytest loads this file on its own; the tests import from it directly so
+they still run as `python test_*.py`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from embed_batcher import MicroBatcher
+from recommender import RecommenderService
+from TasteEmbeddingGenerator.embedding_cache import CachedEmbeddingBackend
+from vector_index import MovieIndex
+
+DIM = 16
+
+
+def fake_vector(text: str, model: str = "fake") -> np.ndarray:
+    """Deterministic DIM-dim vector for (model, text)."""
+    seed = int(hashlib.md5(f"{model}:{text}".encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).normal(size=DIM).astype("float32")
+
+
+class FakeEncoder:
+    """Stands in for the BGE encoder; counts calls to embed_texts()."""
+
+    def __init__(self, model_name: str = "fake", latency_s: float = 0.0):
+        self.model_name = model_name
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def embed_texts(self, texts):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return [fake_vector(t, self.model_name).tolist() for t in texts]
+
+
+class GatedEncoder(FakeEncoder):
+    """A FakeEncoder whose first embed_texts() call blocks until `gate` is set."""
+
+    def __init__(self, model_name: str = "fake"):
+        super().__init__(model_name)
+        self.gate = threading.Event()
+        self.started = threading.Event()
+
+    def embed_texts(self, texts):
+        if self.calls == 0:
+            self.started.set()
+            self.gate.wait(timeout=5)
+        return super().embed_texts(texts)
+
+
+def make_service(encoder: FakeEncoder = None, max_wait_ms: float = 1.0) -> RecommenderService:
+    """A ready RecommenderService on a 50-movie random catalog, no weights or API key."""
+    rng = np.random.default_rng(0)
+    emb = rng.normal(size=(50, DIM)).astype("float32")
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+
+    encoder = encoder or FakeEncoder()
+    svc = RecommenderService()
+    svc.movie_embeddings = emb
+    svc.movie_index = MovieIndex(emb)
+    svc.movie_metadata = [
+        {"movie_id": i, "title": f"Movie {i}", "year": 2000, "card": f"{i} | Movie {i} | 2000"}
+        for i in range(len(emb))
+    ]
+    svc.backend = CachedEmbeddingBackend(encoder, svc.embed_cache, encoder.model_name)
+    svc.batcher = MicroBatcher(svc.backend, max_batch_size=32, max_wait_ms=max_wait_ms)
+    svc.ready = True
+    return svc
+
+
+@contextmanager
+def patched(module, **attrs):
+    """Set module.<name> = value for each keyword; restore the originals on exit."""
+    saved = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
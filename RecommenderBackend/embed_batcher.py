@@ -0,0 +1,123 @@
+# RecommenderBackend/embed_batcher.py
+
+"""
+Dynamic micro-batching in front of an embedding backend.
+
+Callers enqueue a single text and get a Future back. One worker thread
+collects queued texts until either `max_batch_size` is reached or
+`max_wait_ms` has passed since the first text of the batch arrived, runs
+ONE `backend.embed_texts(batch)` call, and resolves every caller's future.
+
+Under concurrency this turns many batch-of-1 forward passes into a few
+larger ones; at low load a request waits at most `max_wait_ms` extra.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    from TasteEmbeddingGenerator.embeddings_backend import BaseEmbeddingBackend
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        backend: "BaseEmbeddingBackend",
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name="embed-batcher", daemon=True
+        )
+        self._worker.start()
+
+        # Simple counters for benchmarking / debugging
+        self.num_flushes = 0
+        self.num_texts = 0
+
+    def submit(self, text: str) -> Future:
+        """Enqueue one text; the future resolves to its vector (list[float])."""
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def embed(self, text: str) -> List[float]:
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(text).result()
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.num_texts / self.num_flushes if self.num_flushes else 0.0
+
+    # ---------- worker ----------
+
+    def _collect(self, first) -> Tuple[list, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _flush(self, batch: list) -> None:
+        # Drop callers that cancelled while queued (a disconnected stream, a
+        # cancelled wrap_future); the rest can no longer be cancelled.
+        batch = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = [text for text, _ in batch]
+        try:
+            vecs = self.backend.embed_texts(texts)
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+
+        self.num_flushes += 1
+        self.num_texts += len(texts)
+        for (_, fut), vec in zip(batch, vecs):
+            fut.set_result(vec)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # One bad batch must not kill the worker: every later
+                # submit() would hang.
+                print(f"[embed_batcher] Warning: batch of {len(batch)} failed: {e}")
+                for _, fut in batch:
+                    try:
+                        fut.set_exception(e)
+                    except InvalidStateError:
+                        pass
+            if stop:
+                return
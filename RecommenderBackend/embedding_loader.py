@@ -1,7 +1,63 @@
-import pandas as pd
 import numpy as np
 
+# pandas is imported inside the loaders: the card helpers are used on the
+# request path and by tools that never read a parquet file.
+
+# Candidate "card" budget (~60 tokens per movie in the rerank prompt)
+CARD_MAX_GENRES = 3
+CARD_MAX_CAST = 3
+CARD_PLOT_CHARS = 160
+
+CARD_HEADER = "id | title | year | genres | cast | plot"
+
+
+def as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        sep = "|" if "|" in value else ","
+        return [v.strip() for v in value.split(sep) if v.strip()]
+    if isinstance(value, float) and np.isnan(value):
+        return []
+    return [str(v).strip() for v in value if v is not None and str(v).strip()]
+
+
+def _clean(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    # "|" separates columns and newlines separate rows in the card table
+    return " ".join(str(value).replace("|", "/").split())
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:") + "…"
+
+
+def build_movie_card(meta: dict) -> str:
+    """
+    One dense table row describing a movie for the rerank prompt:
+    id | title | year | top genres | 3 cast names | truncated plot
+    """
+    try:
+        year = str(int(meta.get("year")))
+    except (TypeError, ValueError):  # None / NaN / pd.NA
+        year = ""
+    return " | ".join([
+        str(meta.get("movie_id")),
+        _clean(meta.get("title")),
+        year,
+        ", ".join(as_list(meta.get("genres"))[:CARD_MAX_GENRES]),
+        ", ".join(as_list(meta.get("tmdb_top_cast"))[:CARD_MAX_CAST]),
+        _truncate(_clean(meta.get("tmdb_overview")), CARD_PLOT_CHARS),
+    ])
+
+
 def load_movie_embeddings(path: str):
+    import pandas as pd
+
     df = pd.read_parquet(path)
 
     # movie_embeddings = np.vstack(df["embedding"].values).astype("float32")
@@ -18,10 +74,17 @@ def load_movie_embeddings(path: str):
         "tmdb_top_cast"
     ]].to_dict(orient="records")
 
+    # Cards are built once per catalog load; a precomputed "card" column wins
+    cards = df["card"].tolist() if "card" in df.columns else None
+    for i, meta in enumerate(movie_metadata):
+        meta["card"] = cards[i] if cards is not None else build_movie_card(meta)
+
     return movie_embeddings, movie_metadata
 
 
 def load_user_embeddings(path: str):
+    import pandas as pd
+
     df = pd.read_parquet(path)
 
     user_vectors = {}
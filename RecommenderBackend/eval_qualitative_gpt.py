@@ -4,7 +4,7 @@
 """
 Qualitative evaluation: GPT-as-judge.
 
-We simulate short 2-turn conversations from rec_log.jsonl:
+We simulate short 2-turn conversations from the recommendation event log:
 
   USER: <msg 1>
   ASSISTANT: <top-K movie titles for msg 1>
@@ -25,20 +25,14 @@ from __future__ import annotations
 
 import json
 from collections import defaultdict
-from pathlib import Path
 from typing import Dict, List
 
 import numpy as np
 import pandas as pd
-from openai import OpenAI
-
 from config import MOVIE_EMBED_PATH, FINAL_K
 from embedding_loader import load_movie_embeddings
-
-ROOT = Path(__file__).resolve().parent
-LOG_PATH = ROOT / "rec_log.jsonl"
-
-client = OpenAI()
+from event_log import has_events, read_events
+from llm import chat
 
 EVAL_SYSTEM_PROMPT = "You are a strict but fair evaluator of movie recommendation quality."
 
@@ -75,20 +69,10 @@ Conversation:
 
 
 def load_logs() -> List[dict]:
-    if not LOG_PATH.exists():
-        print(f"No log file found at {LOG_PATH}.")
+    if not has_events():
+        print("No recommendation event log found.")
         return []
-    rows = []
-    with open(LOG_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rows.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
-    return rows
+    return list(read_events(columns=("user_id", "msg_index", "user_input", "candidate_indices")))
 
 
 def build_conversations(
@@ -156,16 +140,14 @@ def build_conversations(
 def evaluate_conversation(conv_text: str) -> dict:
     prompt = EVAL_TEMPLATE.format(conversation_text=conv_text)
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini-2024-07-18",
-        messages=[
+    content = chat(
+        [
             {"role": "system", "content": EVAL_SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
+        model="gpt-4o-mini-2024-07-18",
         temperature=0.0,
     )
-
-    content = resp.choices[0].message.content
     try:
         scores = json.loads(content)
     except json.JSONDecodeError:
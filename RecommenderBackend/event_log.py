@@ -0,0 +1,373 @@
+# RecommenderBackend/event_log.py
+
+"""
+Recommendation event log: buffered writer, segment files, and a reader.
+
+Events (one per identified recommendation, see recommender.log_recommendation)
+used to be appended to rec_log.jsonl on the request path, one open() per
+event and the user vector as ~10-40 KB of JSON floats. Now:
+
+  - EventLogWriter.append() only buffers; a background thread
+    ("event-log-flush") writes the buffer every EVENT_LOG_FLUSH_MS
+  - each process writes its own segments in EVENT_LOG_DIR, so concurrent
+    workers never interleave records:
+        <UTC start>-<pid>-<seq>.active.jsonl   metadata, one JSON line per event
+        <UTC start>-<pid>-<seq>.f16            user vectors, raw float16 (little endian)
+    a metadata line holds everything but the vector, plus
+    "user_vec_offset" (bytes into the .f16 file) and "user_vec_dim"
+  - past EVENT_LOG_SEGMENT_MB (both files together) or on close the
+    segment is sealed: <stem>.active.jsonl is renamed to <stem>.jsonl
+  - vectors are written before the metadata that points at them, so a
+    crash can lose the last unflushed events but never leaves a line whose
+    vector is missing (a torn last line is skipped by the reader)
+
+read_events() yields every event in the original rec_log.jsonl shape
+("user_vec" as a list of floats): the legacy rec_log.jsonl first, then the
+parquet store the sealed segments are compacted into (event_store.py,
+compact_event_log.py), then the remaining segments in name order. Sources
+already compacted are read from the store only.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import event_store
+from config import EVENT_LOG_DIR, EVENT_LOG_FLUSH_MS, EVENT_LOG_SEGMENT_MB, EVENT_STORE_DIR
+
+LEGACY_LOG_PATH = Path(__file__).parent / "rec_log.jsonl"
+
+ACTIVE_SUFFIX = ".active.jsonl"
+SEALED_SUFFIX = ".jsonl"
+VECTOR_SUFFIX = ".f16"
+_STEM = re.compile(r"\d{8}T\d{6}-\d+-\d{4}")
+
+
+# ---------------------------------------------------------
+# Writer
+# ---------------------------------------------------------
+
+
+class EventLogWriter:
+    def __init__(
+        self,
+        directory: Path = EVENT_LOG_DIR,
+        flush_interval_s: float = EVENT_LOG_FLUSH_MS / 1000,
+        segment_bytes: int = int(EVENT_LOG_SEGMENT_MB * 1024 * 1024),
+    ):
+        self.directory = Path(directory)
+        self.flush_interval_s = flush_interval_s
+        self.segment_bytes = segment_bytes
+        self.pid = os.getpid()
+
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()  # the buffer
+        self._io_lock = threading.Lock()  # the segment files
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._seq = 0
+        self._stem: Optional[str] = None
+        self._meta = None
+        self._vecs = None
+        self._vec_pos = 0
+        self._segment_size = 0
+
+        self.appended = 0
+        self.written = 0
+        self.flushes = 0
+        self.segments = 0
+
+    # ---------- public API ----------
+
+    def append(self, records: List[dict]) -> None:
+        """Buffer events ("user_vec" as an array); written by the flush thread."""
+        if not records:
+            return
+        with self._lock:
+            self._buffer.extend(records)
+            self.appended += len(records)
+            thread = None
+            if self._thread is None and self.flush_interval_s > 0:
+                thread = self._thread = threading.Thread(target=self._flush_loop, name="event-log-flush", daemon=True)
+        if thread is not None:
+            try:
+                thread.start()
+            except RuntimeError:  # interpreter shutting down: write synchronously
+                self._thread = None
+                self.flush()
+        if self.flush_interval_s <= 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything buffered so far to the current segment."""
+        with self._io_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+            if not records:
+                return
+            self._write(records)
+            if self._segment_size >= self.segment_bytes:
+                self._seal()
+
+    def close(self) -> None:
+        """Stop the flush thread, write the buffer and seal the segment."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        self.flush()
+        with self._io_lock:
+            self._seal()
+        self._stop.clear()  # a later append starts a new thread and segment
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "appended": self.appended,
+            "written": self.written,
+            "buffered": buffered,
+            "flushes": self.flushes,
+            "segments": self.segments,
+        }
+
+    # ---------- segment files ----------
+
+    def _open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        start = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        while True:  # another writer of this process may have started this second
+            self._stem = f"{start}-{self.pid}-{self._seq:04d}"
+            self._seq += 1
+            if not any(
+                (self.directory / (self._stem + suffix)).exists()
+                for suffix in (ACTIVE_SUFFIX, SEALED_SUFFIX, VECTOR_SUFFIX)
+            ):
+                break
+        self._vecs = open(self.directory / (self._stem + VECTOR_SUFFIX), "ab")
+        self._meta = open(self.directory / (self._stem + ACTIVE_SUFFIX), "ab")
+        self._vec_pos = self._vecs.tell()
+        self._segment_size = self._vec_pos + self._meta.tell()
+        self.segments += 1
+
+    def _write(self, records: List[dict]) -> None:
+        if self._meta is None:
+            self._open()
+        vec_chunks, lines = [], []
+        pos = self._vec_pos
+        for rec in records:
+            rec = dict(rec)
+            vec = np.ascontiguousarray(rec.pop("user_vec"), dtype="<f2")
+            rec["user_vec_offset"] = pos
+            rec["user_vec_dim"] = int(vec.size)
+            vec_chunks.append(vec.tobytes())
+            lines.append(json.dumps(rec) + "\n")
+            pos += vec.nbytes
+
+        vec_bytes = b"".join(vec_chunks)
+        meta_bytes = "".join(lines).encode("utf-8")
+        # Vectors first: a metadata line never points past the .f16 file
+        self._vecs.write(vec_bytes)
+        self._vecs.flush()
+        self._meta.write(meta_bytes)
+        self._meta.flush()
+
+        self._vec_pos = pos
+        self._segment_size += len(vec_bytes) + len(meta_bytes)
+        self.written += len(records)
+        self.flushes += 1
+
+    def _seal(self) -> None:
+        if self._meta is None:
+            return
+        self._meta.close()
+        self._vecs.close()
+        self._meta = self._vecs = None
+        active = self.directory / (self._stem + ACTIVE_SUFFIX)
+        os.replace(active, self.directory / (self._stem + SEALED_SUFFIX))
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[event_log] Warning: flush failed: {e}")
+
+
+_writer: Optional[EventLogWriter] = None
+_writer_lock = threading.Lock()
+_close_registered = False
+
+
+def _close_at_exit() -> None:
+    # The flush thread is a daemon: without this, the buffer is lost and the
+    # segment never sealed when a script exits. A forked child inherits the
+    # handler but only closes its own writer.
+    writer = _writer
+    if writer is not None and writer.pid == os.getpid():
+        writer.close()
+
+
+def get_event_log() -> EventLogWriter:
+    """This process's writer (a forked worker gets its own segments and thread)."""
+    global _writer, _close_registered
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = EventLogWriter()
+            if not _close_registered:
+                atexit.register(_close_at_exit)
+                _close_registered = True
+        return _writer
+
+
+# ---------------------------------------------------------
+# Reader
+# ---------------------------------------------------------
+
+
+def list_segments(directory: Path = EVENT_LOG_DIR) -> List[Tuple[str, Path, Path]]:
+    """(stem, metadata path, vector path) of every segment, sealed or active, in name order."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    found: Dict[str, Path] = {}
+    for path in directory.iterdir():
+        name = path.name
+        if name.endswith(ACTIVE_SUFFIX) and _STEM.fullmatch(name[: -len(ACTIVE_SUFFIX)]):
+            found[name[: -len(ACTIVE_SUFFIX)]] = path
+        elif name.endswith(SEALED_SUFFIX) and _STEM.fullmatch(name[: -len(SEALED_SUFFIX)]):
+            found.setdefault(name[: -len(SEALED_SUFFIX)], path)
+    return [(stem, found[stem], directory / (stem + VECTOR_SUFFIX)) for stem in sorted(found)]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by someone else
+        return True
+    return True
+
+
+def seal_orphaned_segments(directory: Path = EVENT_LOG_DIR) -> List[str]:
+    """
+    Seal the active segments whose writer process (the pid in the name) is
+    gone, e.g. after a crash or kill -9; returns their stems. A torn last
+    line stays and is skipped by the readers. Only meaningful on the host
+    that runs the writers (a reused pid keeps a segment active until that
+    process exits too).
+    """
+    sealed = []
+    for stem, meta_path, _ in list_segments(directory):
+        if not meta_path.name.endswith(ACTIVE_SUFFIX):
+            continue
+        pid = int(stem.split("-")[1])
+        if pid == os.getpid() or _pid_alive(pid):
+            continue
+        try:
+            os.replace(meta_path, meta_path.with_name(stem + SEALED_SUFFIX))
+        except FileNotFoundError:  # sealed meanwhile
+            continue
+        sealed.append(stem)
+    return sealed
+
+
+def read_segment(meta_path: Path, vec_path: Path, user_id: Optional[str] = None) -> Iterator[dict]:
+    """
+    Events of one segment with "user_vec" decoded; torn lines are skipped,
+    and so is a segment compacted (deleted) since it was listed.
+    """
+    try:
+        vecs = np.memmap(vec_path, dtype="<f2", mode="r") if os.path.getsize(vec_path) else np.empty(0, "<f2")
+    except FileNotFoundError:
+        vecs = np.empty(0, "<f2")
+    try:
+        f = open(meta_path, "rb")
+    except FileNotFoundError:  # sealed (renamed) since it was listed
+        try:
+            f = open(Path(str(meta_path)[: -len(ACTIVE_SUFFIX)] + SEALED_SUFFIX), "rb")
+        except FileNotFoundError:
+            return
+    with f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if user_id is not None and rec.get("user_id") != user_id:
+                continue
+            start = rec.pop("user_vec_offset", 0) // 2
+            dim = rec.pop("user_vec_dim", 0)
+            if start + dim > len(vecs):
+                continue
+            rec["user_vec"] = vecs[start : start + dim].astype(np.float32).tolist()
+            yield rec
+
+
+def _read_legacy(path: Path, user_id: Optional[str]) -> Iterator[dict]:
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if user_id is None or rec.get("user_id") == user_id:
+                yield rec
+
+
+def _project(events: Iterator[dict], columns: Optional[Sequence[str]]) -> Iterator[dict]:
+    if columns is None:
+        yield from events
+    else:
+        for rec in events:
+            yield {c: rec[c] for c in columns if c in rec}
+
+
+def read_events(
+    user_id: Optional[str] = None,
+    directory: Path = EVENT_LOG_DIR,
+    legacy_path: Path = LEGACY_LOG_PATH,
+    store_dir: Path = EVENT_STORE_DIR,
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[dict]:
+    """
+    Every logged event (optionally of one user) as a rec_log.jsonl-style
+    dict: legacy rec_log.jsonl, the compacted store (only the user's
+    partitions), then the segments in name order. `columns` limits the
+    keys (and what the store reads).
+    """
+    # Segments before the manifest: one compacted meanwhile is read once, from the store
+    segments = list_segments(directory)
+    compacted = set(event_store.read_manifest(store_dir)["sources"])
+    if "legacy" not in compacted:
+        yield from _project(_read_legacy(Path(legacy_path), user_id), columns)
+    yield from event_store.iter_events(user_id, columns=columns, directory=store_dir)
+    for stem, meta_path, vec_path in segments:
+        if stem not in compacted:
+            yield from _project(read_segment(meta_path, vec_path, user_id), columns)
+
+
+def has_events(
+    directory: Path = EVENT_LOG_DIR, legacy_path: Path = LEGACY_LOG_PATH, store_dir: Path = EVENT_STORE_DIR
+) -> bool:
+    return (
+        Path(legacy_path).exists()
+        or bool(list_segments(directory))
+        or bool(event_store.read_manifest(store_dir)["sources"])
+    )
@@ -0,0 +1,366 @@
+# RecommenderBackend/event_store.py
+
+"""
+Partitioned parquet store of compacted recommendation events.
+
+compact_event_log.py moves sealed event-log segments (event_log.py) here,
+so analysis reads the columns and row groups it needs instead of
+JSON-parsing the whole log:
+
+    <EVENT_STORE_DIR>/
+        _manifest.json                                   buckets, compacted sources, msg counters
+        date=<YYYY-MM-DD>/user_bucket=<n>/<source>-<k>.parquet
+
+  - partitioned by the event's UTC date and crc32(user_id) % buckets, so
+    one user's events sit in one bucket directory per date; the number of
+    buckets is fixed in the manifest when the store is created
+  - rows are sorted by (user_id, msg_index) within a file and written in
+    row groups of EVENT_STORE_ROW_GROUP rows, so each row group's min/max
+    statistics bound both columns and scan_plan() skips the row groups
+    that cannot match
+  - "user_vec" is a fixed-size list<float32> column (a file holds one
+    embedding dimension); the other fields keep their rec_log.jsonl names
+
+A source (a segment stem, or "legacy" for rec_log.jsonl) becomes visible
+only once it is listed in the manifest, which is replaced atomically
+after all of its files are written. A compaction interrupted before that
+leaves invisible files that the re-run overwrites under the same names.
+
+pyarrow is imported by the functions that read or write parquet, not at
+module import.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config import EVENT_STORE_BUCKETS, EVENT_STORE_DIR, EVENT_STORE_ROW_GROUP
+
+MANIFEST_NAME = "_manifest.json"
+_MANIFEST_VERSION = 1
+
+COLUMNS = (
+    "timestamp",
+    "user_id",
+    "msg_index",
+    "user_input",
+    "history_text",
+    "user_vec",
+    "candidate_indices",
+    "candidate_scores",
+    "final_k",
+)
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_MSG_MIN, _MSG_MAX = -(2**63), 2**63 - 1
+
+MsgIndex = Union[int, Tuple[Optional[int], Optional[int]]]
+
+
+def user_bucket(user_id: Optional[str], buckets: int) -> int:
+    return zlib.crc32((user_id or "").encode("utf-8")) % buckets
+
+
+def _event_date(timestamp) -> str:
+    ts = str(timestamp or "")
+    return ts[:10] if _DATE.match(ts) else "unknown"
+
+
+# ---------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------
+
+
+def read_manifest(directory: Path = EVENT_STORE_DIR) -> dict:
+    """
+    {"buckets", "sources" (compacted, in order), "counts" (highest
+    msg_index per user over all compacted events)}; a new store's if none.
+    """
+    try:
+        data = json.loads((Path(directory) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"version": _MANIFEST_VERSION, "buckets": EVENT_STORE_BUCKETS, "sources": [], "counts": {}}
+    if data.get("version") != _MANIFEST_VERSION:
+        raise ValueError(f"{directory}: unsupported event store version {data.get('version')!r}")
+    return data
+
+
+def write_manifest(manifest: dict, directory: Path = EVENT_STORE_DIR) -> None:
+    path = Path(directory) / MANIFEST_NAME
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def compacted_counts(directory: Path = EVENT_STORE_DIR) -> Dict[str, int]:
+    try:
+        return {str(k): int(v) for k, v in read_manifest(directory)["counts"].items()}
+    except Exception as e:
+        print(f"[event_store] Warning: could not read {Path(directory) / MANIFEST_NAME}: {e}")
+        return {}
+
+
+# ---------------------------------------------------------
+# Writing (compact_event_log.py)
+# ---------------------------------------------------------
+
+
+def _to_table(records: List[dict]):
+    import pyarrow as pa
+
+    vecs = np.asarray([rec["user_vec"] for rec in records], dtype=np.float32)
+    return pa.table({
+        "timestamp": pa.array([rec.get("timestamp") for rec in records], pa.string()),
+        "user_id": pa.array([rec.get("user_id") for rec in records], pa.string()),
+        "msg_index": pa.array([rec.get("msg_index") for rec in records], pa.int64()),
+        "user_input": pa.array([rec.get("user_input") for rec in records], pa.string()),
+        "history_text": pa.array([rec.get("history_text") for rec in records], pa.string()),
+        "user_vec": pa.FixedSizeListArray.from_arrays(pa.array(vecs.ravel()), vecs.shape[1]),
+        "candidate_indices": pa.array([rec.get("candidate_indices") for rec in records], pa.list_(pa.int32())),
+        "candidate_scores": pa.array([rec.get("candidate_scores") for rec in records], pa.list_(pa.float64())),
+        "final_k": pa.array([rec.get("final_k") for rec in records], pa.int32()),
+    })
+
+
+def _write_file(path: Path, records: List[dict], row_group_size: int) -> None:
+    import pyarrow.parquet as pq
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(_to_table(records), tmp, row_group_size=row_group_size)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _write_chunk(
+    directory: Path, source: str, records: List[dict], first: int, buckets: int, row_group_size: int
+) -> List[Path]:
+    groups: Dict[Tuple[str, int, int], List[dict]] = {}
+    for rec in records:
+        key = (_event_date(rec.get("timestamp")), user_bucket(rec.get("user_id"), buckets), len(rec["user_vec"]))
+        groups.setdefault(key, []).append(rec)
+
+    paths = []
+    for (date, bucket, _), group in sorted(groups.items()):
+        group.sort(key=lambda rec: (rec.get("user_id") or "", int(rec.get("msg_index") or 0)))
+        path = directory / f"date={date}" / f"user_bucket={bucket}" / f"{source}-{first + len(paths):04d}.parquet"
+        _write_file(path, group, row_group_size)
+        paths.append(path)
+    return paths
+
+
+def write_source(
+    source: str,
+    events: Iterable[dict],
+    directory: Path = EVENT_STORE_DIR,
+    buckets: int = EVENT_STORE_BUCKETS,
+    row_group_size: int = EVENT_STORE_ROW_GROUP,
+    chunk_rows: int = 50_000,
+) -> Tuple[List[Path], Dict[str, int], int, int]:
+    """
+    Write one source's events (rec_log.jsonl-style dicts) into the
+    partitions, `chunk_rows` at a time. The files stay invisible until the
+    caller adds `source` to the manifest. Returns (files, highest msg_index
+    per user, events written, events skipped for lacking a user_vec).
+    """
+    directory = Path(directory)
+    files: List[Path] = []
+    counts: Dict[str, int] = {}
+    written = skipped = 0
+    chunk: List[dict] = []
+    for rec in events:
+        if rec.get("user_vec") is None:
+            skipped += 1
+            continue
+        chunk.append(rec)
+        written += 1
+        uid, mi = rec.get("user_id"), rec.get("msg_index")
+        if uid is not None and mi is not None and int(mi) > counts.get(uid, 0):
+            counts[uid] = int(mi)
+        if len(chunk) >= chunk_rows:
+            files += _write_chunk(directory, source, chunk, len(files), buckets, row_group_size)
+            chunk = []
+    if chunk:
+        files += _write_chunk(directory, source, chunk, len(files), buckets, row_group_size)
+    return files, counts, written, skipped
+
+
+# ---------------------------------------------------------
+# Reading
+# ---------------------------------------------------------
+
+
+def committed_files(
+    directory: Path = EVENT_STORE_DIR,
+    user_id: Optional[str] = None,
+    dates: Optional[Tuple[str, str]] = None,
+    manifest: Optional[dict] = None,
+) -> List[Path]:
+    """
+    Visible parquet files, restricted to `user_id`'s bucket and to the
+    inclusive `dates` range ("YYYY-MM-DD", "YYYY-MM-DD") if given.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    manifest = manifest or read_manifest(directory)
+    sources = set(manifest["sources"])
+    bucket = None if user_id is None else user_bucket(user_id, manifest["buckets"])
+
+    files = []
+    for date_dir in sorted(directory.glob("date=*")):
+        date = date_dir.name[len("date="):]
+        if dates is not None and not (dates[0] <= date <= dates[1]):
+            continue
+        if bucket is None:
+            bucket_dirs = sorted(date_dir.glob("user_bucket=*"))
+        else:
+            bucket_dirs = [date_dir / f"user_bucket={bucket}"]
+        for bucket_dir in bucket_dirs:
+            if not bucket_dir.is_dir():
+                continue
+            files += [p for p in sorted(bucket_dir.glob("*.parquet")) if p.stem.rsplit("-", 1)[0] in sources]
+    return files
+
+
+def _msg_range(msg_index: Optional[MsgIndex]) -> Optional[Tuple[int, int]]:
+    if msg_index is None:
+        return None
+    if isinstance(msg_index, tuple):
+        lo, hi = msg_index
+        return (_MSG_MIN if lo is None else int(lo), _MSG_MAX if hi is None else int(hi))
+    return int(msg_index), int(msg_index)
+
+
+def _may_contain(row_group, column: str, lo, hi) -> bool:
+    for j in range(row_group.num_columns):
+        chunk = row_group.column(j)
+        if chunk.path_in_schema == column:
+            stats = chunk.statistics
+            if stats is None or not stats.has_min_max:
+                return True
+            return stats.min <= hi and stats.max >= lo
+    return True
+
+
+def _plan(
+    user_id: Optional[str],
+    msg_range: Optional[Tuple[int, int]],
+    dates: Optional[Tuple[str, str]],
+    directory: Path,
+) -> list:
+    files = committed_files(directory, user_id, dates)
+    if not files:
+        return []
+    import pyarrow.parquet as pq
+
+    plan = []
+    for path in files:
+        pf = pq.ParquetFile(path)
+        groups = []
+        for i in range(pf.num_row_groups):
+            rg = pf.metadata.row_group(i)
+            if user_id is not None and not _may_contain(rg, "user_id", user_id, user_id):
+                continue
+            if msg_range is not None and not _may_contain(rg, "msg_index", *msg_range):
+                continue
+            groups.append(i)
+        if groups:
+            plan.append((path, pf, groups))
+    return plan
+
+
+def scan_plan(
+    user_id: Optional[str] = None,
+    msg_index: Optional[MsgIndex] = None,
+    dates: Optional[Tuple[str, str]] = None,
+    directory: Path = EVENT_STORE_DIR,
+) -> List[Tuple[Path, List[int]]]:
+    """(file, row groups) a query reads: the user's bucket, row groups by statistics."""
+    return [(path, groups) for path, _, groups in _plan(user_id, _msg_range(msg_index), dates, Path(directory))]
+
+
+def _scan(
+    user_id: Optional[str],
+    msg_index: Optional[MsgIndex],
+    columns: Optional[Sequence[str]],
+    dates: Optional[Tuple[str, str]],
+    directory: Path,
+) -> Iterator:
+    msg_range = _msg_range(msg_index)
+    plan = _plan(user_id, msg_range, dates, Path(directory))
+    if not plan:
+        return
+    import pyarrow.compute as pc
+
+    want = list(columns or COLUMNS)
+    needed = [c for c, used in (("user_id", user_id is not None), ("msg_index", msg_range is not None)) if used]
+    read = want + [c for c in needed if c not in want]
+
+    for _, pf, groups in plan:
+        table = pf.read_row_groups(groups, columns=read)
+        mask = None
+        if user_id is not None:
+            mask = pc.equal(table["user_id"], user_id)
+        if msg_range is not None:
+            in_range = pc.and_(
+                pc.greater_equal(table["msg_index"], msg_range[0]),
+                pc.less_equal(table["msg_index"], msg_range[1]),
+            )
+            mask = in_range if mask is None else pc.and_(mask, in_range)
+        if mask is not None:
+            table = table.filter(mask)
+        if table.num_rows:
+            yield table.select(want)
+
+
+def read_table(
+    user_id: Optional[str] = None,
+    msg_index: Optional[MsgIndex] = None,
+    columns: Optional[Sequence[str]] = None,
+    dates: Optional[Tuple[str, str]] = None,
+    directory: Path = EVENT_STORE_DIR,
+):
+    """
+    Compacted events as one pyarrow Table. `msg_index` is a value or an
+    inclusive (lo, hi) range, either end None; `columns` defaults to
+    COLUMNS. Only the user's bucket and the row groups whose statistics
+    can match are read.
+    """
+    import pyarrow as pa
+
+    tables = list(_scan(user_id, msg_index, columns, dates, directory))
+    if not tables:
+        return pa.table({c: pa.array([], pa.null()) for c in (columns or COLUMNS)})
+    if len({t.schema for t in tables}) > 1 and "user_vec" in tables[0].column_names:
+        # Files of different embedding dimensions: variable-size vectors
+        i = tables[0].column_names.index("user_vec")
+        tables = [t.set_column(i, "user_vec", t["user_vec"].cast(pa.list_(pa.float32()))) for t in tables]
+    return pa.concat_tables(tables)
+
+
+def iter_events(
+    user_id: Optional[str] = None,
+    msg_index: Optional[MsgIndex] = None,
+    columns: Optional[Sequence[str]] = None,
+    dates: Optional[Tuple[str, str]] = None,
+    directory: Path = EVENT_STORE_DIR,
+) -> Iterator[dict]:
+    """
+    Like read_table, as rec_log.jsonl-style dicts, one file at a time;
+    null fields are left out, as if the line had no such key.
+    """
+    for table in _scan(user_id, msg_index, columns, dates, directory):
+        for row in table.to_pylist():
+            yield {k: v for k, v in row.items() if v is not None}
@@ -12,9 +12,8 @@ Used on top of embedding-based retrieval in recommender.py.
 from typing import Dict, Any
 
 import numpy as np
-from openai import OpenAI
 
-client = OpenAI()
+from llm import chat
 
 # Replace this with the actual fine-tuned model id once you have it
 FINE_TUNED_MODEL = "ft:gpt-4o-mini-2024-07-18:org:project:movie-pref-ranker"
@@ -46,19 +45,17 @@ how much is this user likely to enjoy this movie on a 1-5 scale?
 Answer with a SINGLE number from 1 to 5.
 """
 
-    resp = client.chat.completions.create(
-        model=FINE_TUNED_MODEL,
-        messages=[
+    raw = chat(
+        [
             {
                 "role": "system",
                 "content": "You are a precise movie preference predictor. Answer with a single number 1-5.",
             },
             {"role": "user", "content": prompt},
         ],
+        model=FINE_TUNED_MODEL,
         temperature=0.0,
     )
-
-    raw = resp.choices[0].message.content.strip()
     try:
         return float(raw)
     except ValueError:
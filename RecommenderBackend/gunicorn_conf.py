@@ -0,0 +1,54 @@
+# RecommenderBackend/gunicorn_conf.py
+
+"""
+Multi-worker deployment with shared read-only state.
+
+    cd RecommenderBackend
+    gunicorn app:app -c gunicorn_conf.py
+
+With preload_app, gunicorn imports app.py once in the master process, which
+loads the SentenceTransformer weights, the movie catalog (embedding matrix
+in a `multiprocessing.shared_memory` segment) and the FAISS index. Workers
+are then forked and share those pages instead of each loading a copy.
+The master never runs inference; warm-up, the micro-batcher thread, user
+state and OpenAI clients are created per worker after the fork.
+
+Env:
+    WEB_CONCURRENCY      number of workers (default 4)
+    BIND                 listen address (default 0.0.0.0:8000)
+    RECOMMENDER_PRELOAD  "1" (default) shares state, "0" loads per worker
+"""
+
+import os
+
+os.environ.setdefault("RECOMMENDER_PRELOAD", "1")
+# HF tokenizers' thread pool is not fork-safe; workers tokenize single-threaded
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ["RECOMMENDER_PRELOAD"] == "1"
+timeout = 120
+
+
+def post_fork(server, worker):
+    # Split the cores between workers instead of every worker's torch /
+    # onnxruntime intra-op pool grabbing all of them.
+    threads = max(1, (os.cpu_count() or 1) // server.cfg.workers)
+    os.environ["EMBED_THREADS"] = str(threads)  # read by OnnxEmbeddingBackend
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def on_exit(server):
+    # Only the master owns (and unlinks) the shared-memory catalog
+    if not server.cfg.preload_app:
+        return
+    import app
+
+    if app._preloaded is not None:
+        app._preloaded.release_shared()
@@ -1,15 +1,409 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY
+"""
+Every OpenAI call in the backend goes through this module:
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+- one sync and one async client, each with a tuned keep-alive HTTP pool
+- the completion cache (llm_cache.py)
+- a process-wide limiter: requests/min and tokens/min buckets plus a cap on
+  concurrent calls (rate_limit.py)
+- jittered exponential backoff on 429/5xx/connection errors (honouring
+  Retry-After), bounded by the caller's deadline
+- the circuit breaker (resilience.py)
 
-def call_llm(prompt: str, temperature=0.2) -> str:
-    response = client.chat.completions.create(
-        # model="gpt-4o-mini",
-        model="ft:gpt-4o-mini-2024-07-18:org:project:movie-pref-ranker",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=temperature
+The SDK's own retries are disabled so retries happen in one place.
+
+`openai` and `httpx` are imported when the first client is created (the
+SDK alone takes ~0.4 s to import), so tools that only import this module
+for `chat` signatures or the breaker don't pay for it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Optional, Tuple
+
+from config import (
+    OPENAI_API_KEY,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_S,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_BYPASS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_S,
+    LLM_RPM,
+    LLM_TPM,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_S,
+    LLM_RETRY_MAX_S,
+)
+from llm_cache import CompletionCache, completion_key
+from metrics import LLM_ERRORS, LLM_RETRIES, LLM_THROTTLE_SECONDS
+from rate_limit import LLMLimiter, ThrottleTimeout
+from resilience import CircuitBreaker, CircuitOpenError, Deadline, is_outage_error
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+RERANK_MODEL = "ft:gpt-4o-mini-2024-07-18:org:project:movie-pref-ranker"
+
+# Rough completion size used for the tokens/min estimate before a call
+EST_COMPLETION_TOKENS = 400
+
+# Clients and the completion cache are created on first use (or by
+# RecommenderService.start), not at import time.
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_completion_cache: Optional[CompletionCache] = None
+_init_lock = threading.Lock()
+
+# One breaker and one limiter for every OpenAI call in this process
+breaker = CircuitBreaker(
+    failure_threshold=LLM_BREAKER_FAILURES,
+    reset_timeout_s=LLM_BREAKER_RESET_S,
+)
+limiter = LLMLimiter(rpm=LLM_RPM, tpm=LLM_TPM, max_concurrency=LLM_MAX_CONCURRENCY)
+
+
+def _pool_limits() -> "httpx.Limits":
+    import httpx
+
+    # Keep at least one warm connection per concurrent call
+    return httpx.Limits(
+        max_connections=max(100, LLM_MAX_CONCURRENCY),
+        max_keepalive_connections=max(20, LLM_MAX_CONCURRENCY),
+        keepalive_expiry=60.0,
     )
-    return response.choices[0].message.content.strip()
 
 
+def get_client() -> OpenAI:
+    """Shared sync client (scripts, CLI, fine-tuning); one keep-alive pool."""
+    global _client
+    with _init_lock:
+        if _client is None:
+            import httpx
+            from openai import OpenAI
+
+            _client = OpenAI(
+                api_key=OPENAI_API_KEY,
+                max_retries=0,
+                http_client=httpx.Client(
+                    limits=_pool_limits(),
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                ),
+            )
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Shared async client for the FastAPI event loop. One keep-alive pool is
+    reused by every request instead of opening a new TLS connection per call.
+    """
+    global _async_client
+    with _init_lock:
+        if _async_client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            _async_client = AsyncOpenAI(
+                api_key=OPENAI_API_KEY,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=_pool_limits(),
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                ),
+            )
+    return _async_client
+
+
+def get_completion_cache() -> CompletionCache:
+    """Completion cache shared by every call site (and every worker process)."""
+    global _completion_cache
+    with _init_lock:
+        if _completion_cache is None:
+            _completion_cache = CompletionCache(
+                LLM_CACHE_PATH,
+                ttl_seconds=LLM_CACHE_TTL_S,
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+            )
+    return _completion_cache
+
+
+# ---------------------------------------------------------------------------
+# Limits, retries and the breaker
+# ---------------------------------------------------------------------------
+
+
+def _estimate_tokens(messages: List[dict]) -> int:
+    chars = sum(len(str(m.get("content", ""))) for m in messages)
+    return chars // 4 + EST_COMPLETION_TOKENS
+
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _retry_delay(e: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying after `e`, or None if it isn't retryable."""
+    if isinstance(e, (CircuitOpenError, ThrottleTimeout)) or not is_outage_error(e):
+        return None
+    if getattr(e, "code", None) == "insufficient_quota":
+        return None
+    # Full jitter: spreads the retries of many callers instead of syncing them
+    delay = random.uniform(0.0, min(LLM_RETRY_MAX_S, LLM_RETRY_BASE_S * 2 ** attempt))
+    response = getattr(e, "response", None)
+    try:
+        retry_after = float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        retry_after = 0.0
+    return max(delay, retry_after)
+
+
+def _backoff(e: Exception, attempt: int, deadline: Optional[Deadline]) -> Optional[float]:
+    """Delay before the next attempt, or None to give up and re-raise `e`."""
+    delay = _retry_delay(e, attempt)
+    if delay is None or attempt >= LLM_MAX_RETRIES:
+        return None
+    if deadline is not None and delay >= deadline.remaining():
+        return None
+    LLM_RETRIES.inc()
+    return delay
+
+
+def _record_outcome(e: Optional[Exception]) -> None:
+    if e is None:
+        breaker.record_success()
+        return
+    LLM_ERRORS.labels(type(e).__name__).inc()
+    if isinstance(e, ThrottleTimeout):
+        # Our own limiter said no; says nothing about OpenAI's health
+        return
+    if is_outage_error(e):
+        breaker.record_failure()
+    else:
+        # OpenAI answered (e.g. 400); the service itself is healthy
+        breaker.record_success()
+
+
+def _create(messages: List[dict], model: str, temperature: float, timeout: Optional[float]):
+    """chat.completions.create on the shared sync client, with limits and retries."""
+    if not breaker.allow():
+        raise CircuitOpenError("OpenAI circuit breaker is open")
+    deadline = Deadline(timeout) if timeout is not None else None
+    est = _estimate_tokens(messages)
+    attempt = 0
+    while True:
+        try:
+            with limiter.slot(est, deadline) as waited:
+                LLM_THROTTLE_SECONDS.observe(waited)
+                client = get_client()
+                if deadline is not None:
+                    client = client.with_options(timeout=deadline.remaining())
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature
+                )
+        except Exception as e:
+            delay = _backoff(e, attempt, deadline)
+            if delay is None:
+                _record_outcome(e)
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        _record_outcome(None)
+        limiter.settle(est, _usage_tokens(response))
+        return response
+
+
+async def _aopen(
+    messages: List[dict],
+    model: str,
+    temperature: float,
+    timeout: Optional[float],
+    est_tokens: int,
+    stream: bool,
+) -> Tuple[AsyncExitStack, Any]:
+    """
+    Limiter admission, retries and the async create() call. Returns the
+    response and an exit stack that still holds the limiter slot; the
+    caller closes it when the call is over (for a stream, once it is read).
+    """
+    if not breaker.allow():
+        raise CircuitOpenError("OpenAI circuit breaker is open")
+    deadline = Deadline(timeout) if timeout is not None else None
+    attempt = 0
+    while True:
+        slot = AsyncExitStack()
+        try:
+            waited = await slot.enter_async_context(limiter.aslot(est_tokens, deadline))
+            LLM_THROTTLE_SECONDS.observe(waited)
+            client = get_async_client()
+            remaining = deadline.remaining() if deadline is not None else None
+            if remaining is not None:
+                client = client.with_options(timeout=remaining)
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    **({"stream": True} if stream else {}),
+                ),
+                remaining,
+            )
+        except BaseException as e:
+            await slot.aclose()
+            if not isinstance(e, Exception):
+                raise
+            delay = _backoff(e, attempt, deadline)
+            if delay is None:
+                _record_outcome(e)
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        return slot, response
+
+
+async def _acreate(messages: List[dict], model: str, temperature: float, timeout: Optional[float]):
+    """Async version of _create()."""
+    est = _estimate_tokens(messages)
+    slot, response = await _aopen(messages, model, temperature, timeout, est, stream=False)
+    await slot.aclose()
+    _record_outcome(None)
+    limiter.settle(est, _usage_tokens(response))
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def _use_cache(use_cache: Optional[bool], temperature: float) -> bool:
+    """None (the default) caches deterministic calls only: temperature 0."""
+    if LLM_CACHE_BYPASS:
+        return False
+    return temperature == 0 if use_cache is None else use_cache
+
+
+def chat(
+    messages: List[dict],
+    model: str = RERANK_MODEL,
+    temperature: float = 0.2,
+    use_cache: Optional[bool] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    """
+    Single entry point for chat completions, memoized on (model, messages, temperature).
+
+    Only temperature-0 calls are cached unless `use_cache` says otherwise: a
+    sampled answer would otherwise be replayed for every identical prompt.
+    `timeout` is the time left in the caller's deadline; retries only happen
+    while it still has room for the backoff.
+    """
+    use_cache = _use_cache(use_cache, temperature)
+    key = completion_key(model, messages, temperature)
+    if use_cache:
+        cached = get_completion_cache().get(key)
+        if cached is not None:
+            return cached
+
+    response = _create(messages, model, temperature, timeout)
+    text = response.choices[0].message.content.strip()
+
+    if use_cache:
+        get_completion_cache().put(key, model, text)
+    return text
+
+
+async def achat(
+    messages: List[dict],
+    model: str = RERANK_MODEL,
+    temperature: float = 0.2,
+    use_cache: Optional[bool] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    """Non-blocking version of chat(); SQLite I/O runs off the event loop."""
+    use_cache = _use_cache(use_cache, temperature)
+    key = completion_key(model, messages, temperature)
+    if use_cache:
+        cached = await asyncio.to_thread(get_completion_cache().get, key)
+        if cached is not None:
+            return cached
+
+    response = await _acreate(messages, model, temperature, timeout)
+    text = response.choices[0].message.content.strip()
+
+    if use_cache:
+        await asyncio.to_thread(get_completion_cache().put, key, model, text)
+    return text
+
+
+def call_llm(
+    prompt: str, temperature=0.2, timeout: Optional[float] = None, use_cache: Optional[bool] = None
+) -> str:
+    # model="gpt-4o-mini" for the base model
+    return chat(
+        [{"role": "user", "content": prompt}], temperature=temperature, use_cache=use_cache, timeout=timeout
+    )
+
+
+async def acall_llm(
+    prompt: str, temperature=0.2, timeout: Optional[float] = None, use_cache: Optional[bool] = None
+) -> str:
+    """Non-blocking version of call_llm for use inside the event loop."""
+    return await achat(
+        [{"role": "user", "content": prompt}], temperature=temperature, use_cache=use_cache, timeout=timeout
+    )
+
+
+async def astream_llm(
+    prompt: str, temperature=0.2, timeout: Optional[float] = None, use_cache: Optional[bool] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the completion as text deltas, as soon as OpenAI emits them.
+
+    Cached as chat() is. A cache hit is yielded as a single delta; a
+    streamed miss is stored once the stream completes. `timeout` bounds the
+    wait for the stream to start and between chunks.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    key = completion_key(RERANK_MODEL, messages, temperature)
+    use_cache = _use_cache(use_cache, temperature)
+    if use_cache:
+        cached = await asyncio.to_thread(get_completion_cache().get, key)
+        if cached is not None:
+            yield cached
+            return
+
+    slot, stream = await _aopen(
+        messages, RERANK_MODEL, temperature, timeout, _estimate_tokens(messages), stream=True
+    )
+    parts: List[str] = []
+    # The limiter slot is held until the stream is fully read or abandoned
+    async with slot:
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            _record_outcome(e)
+            raise
+    _record_outcome(None)
+
+    if use_cache:
+        await asyncio.to_thread(
+            get_completion_cache().put, key, RERANK_MODEL, "".join(parts).strip()
+        )
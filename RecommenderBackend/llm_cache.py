@@ -0,0 +1,156 @@
+# RecommenderBackend/llm_cache.py
+
+"""
+Content-addressed cache for chat completions.
+
+Key = sha256 of (model, messages, temperature) serialized as canonical JSON,
+so any cached call with identical inputs -- taste extraction,
+predict_like_score, replayed evaluations -- is answered from disk. llm.chat
+caches temperature-0 calls by default; sampled ones (the temperature-0.4
+rerank) only when the call site opts in.
+
+Stored in a local SQLite file in WAL mode, so several uvicorn/gunicorn
+workers (and offline scripts) share one cache safely. Entries expire after
+`ttl_seconds`; once the table grows past `max_entries`, the least recently
+used rows are deleted.
+
+Set LLM_CACHE_BYPASS=1 (or pass use_cache=False to llm.chat) to skip it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+def completion_key(model: str, messages: List[dict], temperature: float) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": float(temperature)},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    # Run the size check every N writes instead of on every put
+    EVICT_EVERY = 100
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 50_000,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._local = threading.local()
+        self._puts = 0
+        self._init_db()
+
+    # ---------- sqlite plumbing ----------
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread; reuse one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key         TEXT PRIMARY KEY,
+                model       TEXT NOT NULL,
+                response    TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn().execute(
+            "CREATE INDEX IF NOT EXISTS idx_completions_last_access "
+            "ON completions(last_access)"
+        )
+
+    # ---------- public API ----------
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT response, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE completions SET last_access = ? WHERE key = ?", (now, key)
+            )
+        except sqlite3.Error as e:
+            print(f"[llm_cache] Warning: read failed: {e}")
+            return None
+
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+        except sqlite3.Error as e:
+            print(f"[llm_cache] Warning: write failed: {e}")
+            return
+
+        self._puts += 1
+        if self._puts % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired rows, then LRU rows beyond max_entries."""
+        try:
+            conn = self._conn()
+            conn.execute(
+                "DELETE FROM completions WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            conn.execute(
+                """
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions
+                    ORDER BY last_access DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+        except sqlite3.Error as e:
+            print(f"[llm_cache] Warning: eviction failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
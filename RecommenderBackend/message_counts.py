@@ -0,0 +1,187 @@
+# RecommenderBackend/message_counts.py
+
+"""
+Per-user message counters (highest msg_index) recovered from the event
+log: the legacy rec_log.jsonl plus the metadata files of the event-log
+segments (event_log.py). Segments compacted into the parquet store are
+gone from the directory; their counters come from the store's manifest
+(event_store.compacted_counts).
+
+Parsing the whole log at startup grows with the service's entire
+history. Instead, a small checkpoint next to the legacy log
+(rec_log.counts.json) holds the counters up to a byte offset of the
+legacy log and of every segment; startup reads only the lines appended
+after those offsets and writes a new checkpoint. Any worker may write it
+(temp file + os.replace): each checkpoint is consistent on its own.
+
+The checkpoint is ignored (full rescan) when the legacy log no longer
+matches it: shorter than the offset, offset not at a line end, or
+different first bytes (the log was rotated or replaced). A segment whose
+offset doesn't match is read again from its start; counters are maxima,
+so reading a line twice is harmless.
+
+Lines are matched with a regex on the leading "user_id" / "msg_index"
+fields (json.dumps order in log_recommendation), falling back to
+json.loads for lines in any other shape.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config import EVENT_LOG_DIR, EVENT_STORE_DIR
+from event_log import SEALED_SUFFIX, list_segments
+from event_store import compacted_counts
+
+_FIELDS = re.compile(rb'"user_id": ("(?:[^"\\]|\\.)*"), "msg_index": (\d+)[,}]')
+_FIELDS_WITHIN = 4096  # bytes from the line start
+_HEAD_BYTES = 64 * 1024
+_CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(log_path: Path) -> Path:
+    return Path(log_path).with_suffix(".counts.json")
+
+
+def _head_crc(path: Path, offset: int) -> int:
+    if not offset:
+        return zlib.crc32(b"")
+    with open(path, "rb") as f:
+        return zlib.crc32(f.read(min(offset, _HEAD_BYTES)))
+
+
+def _at_line_end(path: Path, offset: int) -> bool:
+    if offset > os.path.getsize(path):
+        return False
+    if offset:
+        with open(path, "rb") as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\n"
+    return True
+
+
+def _parse_line(line: bytes) -> Optional[Tuple[str, int]]:
+    m = _FIELDS.search(line, 0, _FIELDS_WITHIN)
+    if m is not None:
+        return json.loads(m.group(1)), int(m.group(2))
+    try:
+        rec = json.loads(line)
+        uid, mi = rec.get("user_id"), rec.get("msg_index")
+        if uid is None or mi is None:
+            return None
+        return uid, int(mi)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def scan_log(path: Path, offset: int = 0, counts: Optional[Dict[str, int]] = None) -> Tuple[Dict[str, int], int]:
+    """
+    Fold the complete lines of `path` from byte `offset` on into `counts`.
+    Returns (counts, offset after the last complete line).
+    """
+    counts = dict(counts or {})
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # a write in progress; picked up next time
+            offset += len(line)
+            parsed = _parse_line(line)
+            if parsed is None:
+                continue
+            uid, mi = parsed
+            if mi > counts.get(uid, 0):
+                counts[uid] = mi
+    return counts, offset
+
+
+def _read_checkpoint(log_path: Path) -> Tuple[Dict[str, int], int, Dict[str, int]]:
+    """
+    (counts, legacy log offset, segment offsets) of a checkpoint that still
+    matches the legacy log, else ({}, 0, {}).
+    """
+    try:
+        data = json.loads(checkpoint_path(log_path).read_text(encoding="utf-8"))
+        if data.get("version") != _CHECKPOINT_VERSION:
+            return {}, 0, {}
+        offset = int(data["offset"])
+        if offset and not _at_line_end(log_path, offset):
+            return {}, 0, {}
+        if _head_crc(log_path, offset) != data["head_crc32"]:
+            return {}, 0, {}
+        counts = {str(k): int(v) for k, v in data["counts"].items()}
+        segments = {str(k): int(v) for k, v in data.get("segments", {}).items()}
+        return counts, offset, segments
+    except FileNotFoundError:
+        return {}, 0, {}
+    except Exception as e:
+        print(f"[message_counts] Warning: ignoring checkpoint {checkpoint_path(log_path)}: {e}")
+        return {}, 0, {}
+
+
+def write_checkpoint(
+    log_path: Path, counts: Dict[str, int], offset: int, segments: Optional[Dict[str, int]] = None
+) -> None:
+    path = checkpoint_path(log_path)
+    data = {
+        "version": _CHECKPOINT_VERSION,
+        "offset": offset,
+        "head_crc32": _head_crc(log_path, offset),
+        "segments": segments or {},
+        "counts": counts,
+    }
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _scan_segment(stem: str, meta_path: Path, offset: int, counts: Dict[str, int]) -> Tuple[Dict[str, int], int]:
+    # An active segment may have been sealed (renamed) since it was listed
+    for path in (meta_path, meta_path.with_name(stem + SEALED_SUFFIX)):
+        try:
+            return scan_log(path, offset if _at_line_end(path, offset) else 0, counts)
+        except FileNotFoundError:
+            continue
+    return counts, 0
+
+
+def load_message_counts(
+    log_path: Path, segment_dir: Path = EVENT_LOG_DIR, store_dir: Path = EVENT_STORE_DIR
+) -> Dict[str, int]:
+    """
+    Counters from the checkpoint and the compacted store, plus the legacy
+    log and segment tails after the checkpoint; refreshes the checkpoint.
+    """
+    log_path = Path(log_path)
+    counts, start, offsets = _read_checkpoint(log_path)
+    for uid, mi in compacted_counts(store_dir).items():
+        if mi > counts.get(uid, 0):
+            counts[uid] = mi
+    end, scanned, segments = start, 0, {}
+    try:
+        if log_path.exists():
+            counts, end = scan_log(log_path, start, counts)
+            scanned += end - start
+        for stem, meta_path, _ in list_segments(segment_dir):
+            begin = offsets.get(stem, 0)
+            counts, segments[stem] = _scan_segment(stem, meta_path, begin, counts)
+            scanned += segments[stem] - begin
+    except Exception as e:
+        print(f"[message_counts] Warning: could not parse log: {e}")
+        return counts
+    if end != start or segments != offsets:
+        try:
+            write_checkpoint(log_path, counts, end, segments)
+        except OSError as e:
+            print(f"[message_counts] Warning: could not write checkpoint: {e}")
+    if counts or scanned:
+        print(
+            f"[message_counts] {len(counts)} users from {log_path.name} + {len(segments)} segments: "
+            f"{'checkpoint + ' if start or offsets else ''}{scanned / 1e6:.1f} MB replayed"
+        )
+    return counts
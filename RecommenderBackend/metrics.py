@@ -0,0 +1,160 @@
+# RecommenderBackend/metrics.py
+
+"""
+Prometheus metrics for the recommender.
+
+Hot-path instrumentation is limited to `stage_timer` (two perf_counter()
+calls + one histogram observe on a pre-bound child) and a few counter
+increments; cache hit/miss totals, user count and index size are read
+from the live objects only when /metrics is scraped (ServiceCollector).
+
+Multi-worker: if PROMETHEUS_MULTIPROC_DIR is set, /metrics aggregates the
+per-worker files written by prometheus_client's multiprocess mode.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Stages of RecommenderService.recommend(), plus the whole request
+STAGES = ("embed", "fuse", "persist", "retrieve", "log", "llm_rerank", "total")
+
+STAGE_SECONDS = Histogram(
+    "recommender_stage_seconds",
+    "Latency of each recommend() pipeline stage.",
+    ["stage"],
+    buckets=(
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+        0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    ),
+)
+# Pre-bound children: .labels() does a dict lookup + lock we can skip
+_STAGE_CHILDREN = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+LLM_ERRORS = Counter(
+    "recommender_llm_errors",
+    "OpenAI calls that raised, by exception type.",
+    ["error"],
+)
+
+LLM_RETRIES = Counter(
+    "recommender_llm_retries",
+    "OpenAI calls retried after a transient failure.",
+)
+
+LLM_THROTTLE_SECONDS = Histogram(
+    "recommender_llm_throttle_seconds",
+    "Time OpenAI calls waited for the client-side rate limiter.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+DEGRADED = Counter(
+    "recommender_degraded_responses",
+    "Responses served without the LLM rerank, by reason.",
+    ["reason"],
+)
+
+CANDIDATES = Counter(
+    "recommender_candidates",
+    "Movies retrieved from the index and handed to the reranker.",
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STAGE_CHILDREN[stage].observe(time.perf_counter() - t0)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    _STAGE_CHILDREN[stage].observe(seconds)
+
+
+class ServiceCollector:
+    """Scrape-time view of cache counters and service size gauges."""
+
+    def __init__(self, get_service: Callable[[], Optional[object]], get_llm_cache: Callable):
+        self._get_service = get_service
+        self._get_llm_cache = get_llm_cache
+
+    def collect(self):
+        lookups = CounterMetricFamily(
+            "recommender_cache_lookups",
+            "Cache lookups by cache and result.",
+            labels=["cache", "result"],
+        )
+
+        service = self._get_service()
+        if service is not None:
+            emb = service.embedding_cache_stats()
+            lookups.add_metric(["embedding", "hit"], emb["hits"])
+            lookups.add_metric(["embedding", "disk_hit"], emb["disk_hits"])
+            lookups.add_metric(["embedding", "miss"], emb["misses"])
+            users = service.user_cache.stats()["cache"]
+            lookups.add_metric(["user", "hit"], users["hits"])
+            lookups.add_metric(["user", "miss"], users["misses"])
+
+        llm = self._get_llm_cache().stats()
+        lookups.add_metric(["llm", "hit"], llm["hits"])
+        lookups.add_metric(["llm", "miss"], llm["misses"])
+        yield lookups
+
+        if service is None or not service.ready:
+            return
+
+        users = GaugeMetricFamily("recommender_users", "Runtime users in the user store.")
+        users.add_metric([], len(service.user_vectors))
+        yield users
+
+        cache = service.user_cache.stats()["cache"]
+        capacity = GaugeMetricFamily("recommender_user_cache_capacity", "Max users in the in-process user cache.")
+        capacity.add_metric([], cache["capacity"])
+        yield capacity
+        size = GaugeMetricFamily("recommender_user_cache_size", "Users in the in-process user cache.")
+        size.add_metric([], cache["size"])
+        yield size
+
+        index = GaugeMetricFamily("recommender_index_size", "Movies in the FAISS index.")
+        index.add_metric([], service.movie_index.index.ntotal)
+        yield index
+
+
+_service_collector: Optional[ServiceCollector] = None
+
+
+def register_service_collector(get_service, get_llm_cache) -> ServiceCollector:
+    global _service_collector
+    if _service_collector is None:
+        _service_collector = ServiceCollector(get_service, get_llm_cache)
+        REGISTRY.register(_service_collector)
+    return _service_collector
+
+
+def render_metrics() -> tuple[bytes, str]:
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=multiproc_dir)
+        if _service_collector is not None:
+            # Scrape-time gauges/counters describe the worker answering the scrape
+            registry.register(_service_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# RecommenderBackend/migrate_user_vectors.py
+
+"""
+Rebuild stored user vectors after the embedding model changed.
+
+Every vector in the SQLite user store is tagged with the EMBED_MODEL_NAME
+that produced it; vectors of another model read as missing. This job
+re-creates them in the current model's space from each user's persisted
+message history: one batched encoder pass per chunk of users, then the
+same EMA fusion RecommenderService applies per message (oldest first).
+
+  - streams users in chunks (--chunk) by user_id, so memory is bounded by
+    one chunk of histories and vectors
+  - resumable: a rebuilt user is tagged with the new model, so a re-run
+    after an interruption only picks up the users not done yet
+  - a user who sent a message meanwhile (version changed) is skipped
+  - a user without a stored history (written before histories were
+    persisted) has nothing to replay: their old vector is dropped and the
+    row tagged as migrated, so they start a fresh vector on their next
+    message and the job still finishes
+
+Only the last USER_HISTORY_LEN messages are stored, so older messages
+(EMA weight USER_FUSE_ALPHA ** USER_HISTORY_LEN in total) are dropped.
+Run it with the new EMBED_MODEL_NAME / EMBED_BACKEND, before starting the
+service on that model:
+
+    EMBED_MODEL_NAME=... python migrate_user_vectors.py --chunk 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+from config import EMBED_MODEL_NAME, USER_STORE_PATH
+from recommender import USER_FUSE_ALPHA, _normalize_rows, make_encoder
+from user_store import SQLiteUserStore
+
+Encode = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+def replay_histories(histories: List[Tuple[str, ...]], encode: Encode) -> np.ndarray:
+    """
+    The vector each user would have after sending their history (oldest
+    first) to RecommenderService. Every distinct text is encoded once.
+    """
+    texts = list(dict.fromkeys(t for history in histories for t in history))
+    emb = _normalize_rows(np.asarray(encode(texts), dtype=np.float32))
+    row = {t: i for i, t in enumerate(texts)}
+
+    fused = np.zeros((len(histories), emb.shape[1]), dtype=np.float32)
+    for step in range(max(len(h) for h in histories)):
+        live = [i for i, h in enumerate(histories) if len(h) > step]
+        new = emb[[row[histories[i][step]] for i in live]]
+        if step == 0:
+            fused[live] = new
+        else:
+            fused[live] = _normalize_rows(USER_FUSE_ALPHA * fused[live] + (1.0 - USER_FUSE_ALPHA) * new)
+    return fused
+
+
+def migrate(store: SQLiteUserStore, encode: Encode, chunk_size: int = 500) -> dict:
+    """Re-embed every user whose vector isn't from `store.model`; returns counts."""
+    stats = {"rebuilt": 0, "no_history": 0, "conflicts": 0}
+    total = store.stale_count()
+    t0 = time.perf_counter()
+    for chunk in store.iter_stale(chunk_size):
+        users = {uid: rec for uid, rec in chunk.items() if rec.history}
+        empty = {uid: rec.version for uid, rec in chunk.items() if not rec.history}
+        if empty:
+            failed = store.reset_vectors(empty)
+            stats["no_history"] += len(empty) - len(failed)
+            stats["conflicts"] += len(failed)
+            print(f"[migrate] {len(empty) - len(failed)} users without a stored history: vector dropped, starts fresh")
+        if users:
+            vecs = replay_histories([rec.history for rec in users.values()], encode)
+            updates = {
+                uid: (rec._replace(vec=vec), rec.version)
+                for (uid, rec), vec in zip(users.items(), vecs)
+            }
+            # Same version as read: a user who sent a message meanwhile keeps that write
+            failed = store.compare_and_set_many(updates)
+            stats["rebuilt"] += len(updates) - len(failed)
+            stats["conflicts"] += len(failed)
+
+        done = sum(stats.values())
+        print(
+            f"[migrate] {done}/{total} users ({done / max(time.perf_counter() - t0, 1e-9):.0f}/s), "
+            f"last user_id={next(reversed(chunk))!r}"
+        )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed stored user vectors with EMBED_MODEL_NAME.")
+    parser.add_argument("--store", default=USER_STORE_PATH, help="SQLite user store")
+    parser.add_argument("--chunk", type=int, default=500, help="users per encoder pass / transaction")
+    args = parser.parse_args()
+
+    store = SQLiteUserStore(args.store, import_legacy=False, model=EMBED_MODEL_NAME)
+    stale = store.stale_count()
+    print(f"[migrate] {stale} users to re-embed with {EMBED_MODEL_NAME} in {args.store}")
+    if stale:
+        encoder = make_encoder()
+        stats = migrate(store, encoder.embed_texts, args.chunk)
+        print(f"[migrate] Done: {stats}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,6 @@
 # qualitative_eval.py
 import json
-from openai import OpenAI
-
-client = OpenAI()
+from llm import chat
 
 EVAL_SYSTEM_PROMPT = "You are a strict but fair evaluator of movie recommendation quality."
 
@@ -35,16 +33,14 @@ Conversation:
 def evaluate_conversation(conversation_text: str) -> dict:
     prompt = EVAL_TEMPLATE.format(conversation_text=conversation_text)
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini-2024-07-18",
-        messages=[
+    content = chat(
+        [
             {"role": "system", "content": EVAL_SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
+        model="gpt-4o-mini-2024-07-18",
         temperature=0.0,
     )
-
-    content = resp.choices[0].message.content
     try:
         scores = json.loads(content)
     except json.JSONDecodeError:
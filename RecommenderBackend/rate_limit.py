@@ -0,0 +1,195 @@
+# RecommenderBackend/rate_limit.py
+
+"""
+Client-side limits for OpenAI traffic, shared by every call in the process.
+
+- two token buckets, one for requests/minute and one for tokens/minute,
+  so we stay under the account limits instead of discovering them via 429s
+- a concurrency cap on in-flight calls: one slot count shared by the sync
+  client (threads) and the async client (coroutines on any event loop)
+
+Buckets work by reservation: `reserve(n)` takes n tokens immediately (the
+balance may go negative) and returns how long the caller has to wait, so
+waiters queue fairly without polling. Token cost is estimated up front and
+corrected with the real usage afterwards (`adjust`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Optional, Union
+
+from resilience import Deadline
+
+
+class ThrottleTimeout(TimeoutError):
+    """The limiter can't admit the call before the caller's deadline."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now; return the seconds to wait before using it."""
+        # A single call larger than the burst would otherwise never fit
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, delta: float) -> None:
+        """Charge (delta > 0) or refund (delta < 0) after the fact."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def _grant(fut: "asyncio.Future") -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class SlotPool:
+    """
+    A counting semaphore that threads and coroutines share.
+
+    Waiters queue in arrival order; release() hands the slot straight to
+    the oldest one, waking a thread through its Event or a coroutine
+    through its loop (call_soon_threadsafe), so nobody polls and no
+    executor thread is parked per waiting coroutine.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._free = size
+        self._lock = threading.Lock()
+        self._waiters: Deque[Union[threading.Event, tuple]] = deque()
+
+    @property
+    def in_use(self) -> int:
+        with self._lock:
+            return self.size - self._free
+
+    def _take_or_enqueue(self, waiter) -> bool:
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _withdraw(self, waiter) -> bool:
+        """Leave the queue; False if release() already handed us the slot."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        event = threading.Event()
+        if self._take_or_enqueue(event) or event.wait(timeout):
+            return True
+        if self._withdraw(event):
+            return False
+        return True  # granted between the timeout and _withdraw
+
+    async def aacquire(self, timeout: Optional[float] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        waiter = (loop, fut)
+        if self._take_or_enqueue(waiter):
+            return True
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not self._withdraw(waiter):
+                self.release()  # granted, but we are no longer waiting
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, fut = waiter
+                try:
+                    loop.call_soon_threadsafe(_grant, fut)
+                    return
+                except RuntimeError:
+                    continue  # its loop is closed; try the next waiter
+            if self._free >= self.size:
+                raise ValueError("SlotPool released too many times")
+            self._free += 1
+
+
+class LLMLimiter:
+    def __init__(self, rpm: float, tpm: float, max_concurrency: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.slots = SlotPool(max_concurrency)
+
+    def _reserve(self, est_tokens: int, deadline: Optional[Deadline]) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(est_tokens))
+        if deadline is not None and wait >= deadline.remaining():
+            self.requests.adjust(-1)
+            self.tokens.adjust(-est_tokens)
+            raise ThrottleTimeout(f"rate limit wait of {wait:.1f}s exceeds the deadline")
+        return wait
+
+    @contextmanager
+    def slot(self, est_tokens: int, deadline: Optional[Deadline] = None):
+        """Blocking admission; yields the seconds spent waiting."""
+        t0 = time.monotonic()
+        wait = self._reserve(est_tokens, deadline)
+        if wait > 0:
+            time.sleep(wait)
+        timeout = deadline.remaining() if deadline is not None else None
+        if not self.slots.acquire(timeout):
+            raise ThrottleTimeout("no free LLM slot before the deadline")
+        try:
+            yield time.monotonic() - t0
+        finally:
+            self.slots.release()
+
+    @asynccontextmanager
+    async def aslot(self, est_tokens: int, deadline: Optional[Deadline] = None):
+        """Async admission; yields the seconds spent waiting."""
+        t0 = time.monotonic()
+        wait = self._reserve(est_tokens, deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        timeout = deadline.remaining() if deadline is not None else None
+        if not await self.slots.aacquire(timeout):
+            raise ThrottleTimeout("no free LLM slot before the deadline")
+        try:
+            yield time.monotonic() - t0
+        finally:
+            self.slots.release()
+
+    def settle(self, est_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket once the real usage is known."""
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - est_tokens)
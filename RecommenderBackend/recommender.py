@@ -1,18 +1,60 @@
 from __future__ import annotations
 
-import os
+import asyncio
+import atexit
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Callable, Optional, Dict, List, Tuple
 
 import numpy as np
 
-from embedding_loader import load_movie_embeddings
+from embedding_loader import CARD_HEADER, as_list, load_movie_embeddings
 from vector_index import MovieIndex
-from llm import call_llm
-from config import MOVIE_EMBED_PATH, TOP_K, FINAL_K
-from user_store import load_user_state, save_user_state
+from llm import (
+    chat,
+    call_llm,
+    acall_llm,
+    astream_llm,
+    get_client,
+    get_async_client,
+    get_completion_cache,
+)
+from config import (
+    MOVIE_EMBED_PATH,
+    TOP_K,
+    FINAL_K,
+    EMBED_CACHE_MB,
+    EMBED_CACHE_DIR,
+    EMBED_DEVICE,
+    EMBED_BACKEND,
+    EMBED_MODEL_NAME,
+    EMBED_ONNX_DIR,
+    BATCH_LLM_CONCURRENCY,
+    RECOMMEND_DEADLINE_S,
+)
+from user_store import (
+    BaseUserStore,
+    MemoryUserStore,
+    UserRecord,
+    UserVectors,
+    append_history,
+    get_user_store,
+)
+from user_cache import CachedUserStore
 from gpt_reranker import predict_like_score, combined_score
+from embed_batcher import MicroBatcher
+from shared_catalog import SharedArray
+from event_log import LEGACY_LOG_PATH, get_event_log
+from message_counts import load_message_counts
+from metrics import CANDIDATES, DEGRADED, observe_stage, stage_timer
+from resilience import CircuitOpenError, Deadline
+from singleflight import SingleFlight
+from striped_lock import StripedLock
 
 # -------------------------------------------------------------------
 # Make TasteEmbeddingGenerator importable (sibling directory)
@@ -20,28 +62,31 @@ from gpt_reranker import predict_like_score, combined_score
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(PROJECT_ROOT))
 
-from TasteEmbeddingGenerator.embeddings_backend import SentenceTransformerBackend
-from openai import OpenAI
+from TasteEmbeddingGenerator.embeddings_backend import (
+    OnnxEmbeddingBackend,
+    SentenceTransformerBackend,
+)
+from TasteEmbeddingGenerator.embedding_cache import (
+    CachedEmbeddingBackend,
+    EmbeddingCache,
+    normalize_text,
+)
 
 
-# -------------------------------------------------------------------
-# Embedding backend (SentenceTransformer for taste vectors)
-# -------------------------------------------------------------------
+USER_FUSE_ALPHA = 0.8  # 0.8 old taste, 0.2 new taste per interaction
 
-EMBED_MODEL_NAME = "BAAI/bge-base-en-v1.5"
+# Pre-segment recommendation log (JSON Lines); still read, no longer written
+RECOMMENDER_LOG_PATH = LEGACY_LOG_PATH
 
-_backend = SentenceTransformerBackend(
-    model_name=EMBED_MODEL_NAME,
-    device="mps",  # "mps" for your Mac; use "cpu" or "cuda" elsewhere
-)
+# Texts encoded/searched during warm-up (pages in weights, index and JIT paths)
+WARMUP_TEXTS = [
+    "I like slow atmospheric sci-fi",
+    "feel-good comedy",
+    "dark psychological thriller with a twist ending",
+]
 
 
-def embed_user_taste(text: str) -> np.ndarray:
-    """
-    Convert a normalized taste description into a unit-norm embedding
-    using the same backbone as movie embeddings (BGE-base).
-    """
-    vec = _backend.embed_texts([text])[0]
+def _normalize(vec) -> np.ndarray:
     vec = np.asarray(vec, dtype=np.float32)
 
     # Normalize so cosine similarity ≈ dot product
@@ -52,13 +97,29 @@ def embed_user_taste(text: str) -> np.ndarray:
     return vec
 
 
+def _normalize_rows(mat) -> np.ndarray:
+    """Row-wise _normalize for an (N, D) matrix."""
+    mat = np.asarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat / np.where(norms > 0, norms, 1.0)
+
+
+def make_encoder(device: Optional[str] = EMBED_DEVICE):
+    """The configured query encoder (EMBED_BACKEND, EMBED_MODEL_NAME); weights load lazily."""
+    if EMBED_BACKEND == "onnx":
+        # int8 ONNX Runtime on CPU; the session is created after the fork
+        return OnnxEmbeddingBackend(model_name=EMBED_MODEL_NAME, onnx_dir=EMBED_ONNX_DIR)
+    return SentenceTransformerBackend(
+        model_name=EMBED_MODEL_NAME,
+        device=device,  # None -> auto: cuda, then mps, then cpu
+        show_progress_bar=False,
+    )
+
+
 # -------------------------------------------------------------------
 # Optional: LLM-based taste normalization (minimize noisy input)
 # -------------------------------------------------------------------
 
-_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-
 def extract_taste_with_llm(user_input: str) -> str:
     """
     Uses an LLM to convert raw user input into a clean taste profile string.
@@ -74,180 +135,28 @@ Do NOT recommend movies.
 Only return the normalized preference description.
 """
 
-    resp = _client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    return chat(
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_input},
         ],
+        model="gpt-4o-mini",
         temperature=0.2,
+        use_cache=True,  # a normalized profile, not a sampled answer
     )
 
-    return resp.choices[0].message.content.strip()
-
-
-# -------------------------------------------------------------------
-# Load movie embeddings & build index
-# -------------------------------------------------------------------
-
-movie_embeddings, movie_metadata = load_movie_embeddings(MOVIE_EMBED_PATH)
-movie_index = MovieIndex(movie_embeddings)
-
-# -------------------------------------------------------------------
-# Persistent runtime users (REAL users only, not offline dataset users)
-# user_vectors: user_id -> taste vector (np.ndarray)
-# -------------------------------------------------------------------
-
-user_vectors: Dict[str, np.ndarray] = load_user_state()
-USER_FUSE_ALPHA = 0.8  # 0.8 old taste, 0.2 new taste per interaction
-
-# In-process textual history for nicer explanations (not persisted)
-preference_history: Dict[str, List[str]] = {}
-
-
-# -------------------------------------------------------------------
-# Core recommender entry point
-# -------------------------------------------------------------------
-
-# def recommend(user_input: str, user_id: Optional[str] = None) -> str:
-#     """
-#     Main recommendation entry point.
-
-#     Steps:
-#     1. Convert this message into a taste embedding (optionally via LLM normalization).
-#     2. If user_id is known, fuse with previous taste embedding (EMA).
-#     3. Persist updated taste vector to runtime_users.parquet (via user_store).
-#     4. Maintain a small preference text history per user for explanations.
-#     5. Retrieve Top-K movies via embedding index.
-#     6. Use a single LLM call to rerank & explain FINAL_K movies.
-#     """
-
-#     # ----------------- 1) TASTE EMBEDDING FROM CURRENT INPUT -----------------
-#     # Option A (cheaper): directly embed the raw input
-#     taste_profile = user_input
-
-#     # Option B (more structured): uncomment to normalize via GPT
-#     # taste_profile = extract_taste_with_llm(user_input)
-
-#     new_vec = embed_user_taste(taste_profile)
-
-#     # ----------------- 2) FUSE WITH PREVIOUS TASTE (IF ANY) ------------------
-#     has_identity = user_id is not None and user_id != ""
-
-#     if has_identity and user_id in user_vectors:
-#         prev_vec = user_vectors[user_id]
-#         user_vec = USER_FUSE_ALPHA * prev_vec + (1.0 - USER_FUSE_ALPHA) * new_vec
-#     else:
-#         user_vec = new_vec
-
-#     # ----------------- 3) UPDATE & PERSIST USER STATE ------------------------
-#     if has_identity:
-#         # Vector memory
-#         user_vectors[user_id] = user_vec
-#         save_user_state(user_vectors)
-
-#         # Textual preference history (for LLM explanations only)
-#         prefs = preference_history.get(user_id, [])
-#         prefs.append(user_input)
-#         # keep last N messages for sanity
-#         if len(prefs) > 10:
-#             prefs = prefs[-10:]
-#         preference_history[user_id] = prefs
-#         history_text = "\n".join(f"- {p}" for p in prefs)
-#     else:
-#         history_text = "- (no persistent user id; only using this message)"
-
-#     # ----------------- 4) MOVIE RETRIEVAL ------------------------------------
-#     # If MovieIndex expects (1, d), wrap with user_vec[None, :]
-#     idxs, scores = movie_index.search(user_vec, k=TOP_K)
-#     candidates = [movie_metadata[i] for i in idxs]
-
-#     # ----------------- 5) LLM RERANK + EXPLANATION ---------------------------
-#     rerank_prompt = f"""
-# You are a movie recommender system.
-
-# User's long-term preferences so far:
-# {history_text}
-
-# User's latest message:
-# {user_input}
-
-# Candidate movies (as a Python-like list of dicts):
-# {candidates}
-
-# From these candidates, choose the best {FINAL_K} movies
-# that match BOTH the user's long-term tastes and their latest message.
-# Explain briefly why each one fits.
-# Return a clear, human-readable list.
-# """
-
-#     return call_llm(rerank_prompt, temperature=0.4)
-
 
 # ----------------- PERSISTENT USER STATE & LOGGING -----------------
 
-from typing import Optional, Dict
-import json
-from datetime import datetime
-from pathlib import Path
-import numpy as np
-
-from user_store import load_user_state, save_user_state
-
-# Persistent runtime users: user_id -> np.ndarray taste vector
-user_vectors: Dict[str, np.ndarray] = load_user_state()
-USER_FUSE_ALPHA = 0.8  # 0.8 old taste, 0.2 new
-
-# In-process text memory for explanations
-preference_history: dict[str, list[str]] = {}
-
-# Recommendation log path (JSON Lines)
-RECOMMENDER_LOG_PATH = Path(__file__).parent / "rec_log.jsonl"
-
 
 def _init_message_counts_from_log() -> Dict[str, int]:
     """
-    Scan rec_log.jsonl (if it exists) and recover the highest msg_index
-    per user_id so that new messages continue the sequence.
+    Recover the highest msg_index per user_id from the event log (legacy
+    rec_log.jsonl and the segments) so that new messages continue the
+    sequence. Reads only what was written since the last checkpoint
+    (message_counts.py).
     """
-    counts: Dict[str, int] = {}
-    if not RECOMMENDER_LOG_PATH.exists():
-        return counts
-
-    try:
-        with open(RECOMMENDER_LOG_PATH, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    rec = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-                uid = rec.get("user_id")
-                mi = rec.get("msg_index")
-                if uid is None or mi is None:
-                    continue
-                try:
-                    mi = int(mi)
-                except (TypeError, ValueError):
-                    continue
-                prev = counts.get(uid, 0)
-                if mi > prev:
-                    counts[uid] = mi
-    except Exception as e:
-        print(f"[recommender] Warning: could not parse log {RECOMMENDER_LOG_PATH}: {e}")
-    return counts
-
-
-# Per-user message counters for "msg 1, msg 2, …"
-USER_MESSAGE_COUNTS: Dict[str, int] = _init_message_counts_from_log()
-
-
-def _next_msg_index(user_id: str) -> int:
-    cur = USER_MESSAGE_COUNTS.get(user_id, 0) + 1
-    USER_MESSAGE_COUNTS[user_id] = cur
-    return cur
+    return load_message_counts(RECOMMENDER_LOG_PATH)
 
 
 def log_recommendation(
@@ -262,7 +171,7 @@ def log_recommendation(
     final_k: int,
 ) -> None:
     """
-    Append a single recommendation event to rec_log.jsonl.
+    Append a single recommendation event to the event log (event_log.py).
 
     This gives you:
       - exact query
@@ -271,128 +180,92 @@ def log_recommendation(
       - which movie indices were retrieved (Top-K)
       - the number of movies LLM was asked to focus on (final_k)
     """
-    record = {
+    append_log_records([
+        _log_record(
+            user_id=user_id,
+            msg_index=msg_index,
+            user_input=user_input,
+            history_text=history_text,
+            user_vec=user_vec,
+            candidate_indices=candidate_indices,
+            candidate_scores=candidate_scores,
+            final_k=final_k,
+        )
+    ])
+
+
+def _log_record(
+    *,
+    user_id: str,
+    msg_index: int,
+    user_input: str,
+    history_text: str,
+    user_vec: np.ndarray,
+    candidate_indices: np.ndarray,
+    candidate_scores: np.ndarray,
+    final_k: int,
+) -> dict:
+    return {
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "user_id": user_id,
         "msg_index": msg_index,
         "user_input": user_input,
         "history_text": history_text,
-        "user_vec": user_vec.tolist(),  # store as list[float]
+        "user_vec": np.asarray(user_vec, dtype=np.float32),  # float16 sidecar on disk
         "candidate_indices": [int(i) for i in candidate_indices.tolist()],
         "candidate_scores": [float(s) for s in candidate_scores.tolist()],
         "final_k": int(final_k),
     }
 
-    try:
-        with open(RECOMMENDER_LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record) + "\n")
-    except Exception as e:
-        print(f"[recommender] Warning: failed to write log: {e}")
 
+def append_log_records(records: List[dict]) -> None:
+    """Buffer several events; the event log's thread writes them in the background."""
+    get_event_log().append(records)
 
-# ----------------- CORE RECOMMENDER -----------------
-
-
-def recommend(user_input: str, user_id: Optional[str] = None) -> str:
-    """
-    Main recommendation entry point.
-
-    - Build a taste vector from this input
-    - Fuse with previous taste if user_id is known
-    - Save updated taste vector to runtime_users.parquet
-    - Keep a small text history per user for the LLM
-    - Retrieve movies and ask GPT to explain/rerank using both history + latest input
-    - Log each interaction to rec_log.jsonl with msg_index, query, and rec indices
-    """
-
-    # ----------------- 1) TASTE EMBEDDING FROM CURRENT INPUT -----------------
-    # Simple version: use raw input as taste profile
-    # Option A (cheaper): directly embed the raw input
-    taste_profile = user_input
-
-    # Option B (more structured): uncomment to normalize via GPT
-    # taste_profile = extract_taste_with_llm(user_input)
-    new_vec = embed_user_taste(taste_profile)
-    new_vec = np.array(new_vec, dtype=np.float32)
 
-    # ----------------- 2) FUSE WITH PREVIOUS TASTE (IF ANY) ------------------
-    has_identity = user_id is not None and user_id != ""
-
-    if has_identity and user_id in user_vectors:
-        prev_vec = user_vectors[user_id]
-        user_vec = USER_FUSE_ALPHA * prev_vec + (1.0 - USER_FUSE_ALPHA) * new_vec
-    else:
-        user_vec = new_vec
-
-    # Normalize fused vector for safety
-    norm = np.linalg.norm(user_vec)
-    if norm > 0:
-        user_vec = user_vec / norm
-
-    # ----------------- 3) UPDATE & PERSIST USER STATE ------------------------
-    if has_identity:
-        # Vector memory
-        user_vectors[user_id] = user_vec
-        save_user_state(user_vectors)
-
-        # Textual preference history (for LLM explanations)
-        prefs = preference_history.get(user_id, [])
-        prefs.append(user_input)
-        # Optional: keep only last N preference lines
-        if len(prefs) > 10:
-            prefs = prefs[-10:]
-        preference_history[user_id] = prefs
-        history_text = "\n".join(f"- {p}" for p in prefs)
-    else:
-        history_text = "- (no stable user id; only using this message)"
-
-    # ----------------- 4) MOVIE RETRIEVAL ------------------------------------
-    # NOTE: movie_index.search should accept user_vec (D,) or (1, D)
-    idxs, scores = movie_index.search(user_vec, k=TOP_K)
-        # idxs, scores = movie_index.search(user_vec, k=TOP_K)
-    # idxs = np.asarray(idxs).ravel()
-    # scores = np.asarray(scores).ravel()
-
-    # # Build candidate list with combined scores
-    # scored = []
-    # for idx, base_score in zip(idxs, scores):
-    #     movie = movie_metadata[idx]
-    #     gpt_score = predict_like_score(history_text, movie)  # or user_input
-    #     final_score = combined_score(user_vec, movie_embeddings[idx], gpt_score)
-    #     scored.append((final_score, movie))
-
-    # # Sort and keep FINAL_K
-    # scored.sort(key=lambda x: x[0], reverse=True)
-    # top_movies = [m for _, m in scored[:FINAL_K]]
-
-    # Make sure these are 1D arrays
-    idxs = np.asarray(idxs)
-    scores = np.asarray(scores)
-    if idxs.ndim > 1:
-        idxs = idxs[0]
-    if scores.ndim > 1:
-        scores = scores[0]
-
-    rec_indices = idxs[:FINAL_K]
-    candidates = [movie_metadata[i] for i in idxs]
-
-    # ----------------- 5) LOG THIS RECOMMENDATION EVENT ----------------------
-    if has_identity:
-        msg_index = _next_msg_index(user_id)
+def _persist_event(
+    *,
+    user_id: str,
+    msg_index: int,
+    user_input: str,
+    history_text: str,
+    user_vec: np.ndarray,
+    candidate_indices: np.ndarray,
+    candidate_scores: np.ndarray,
+) -> None:
+    """Write the log line (the user vector was already stored by _update_user)."""
+    with stage_timer("log"):
         log_recommendation(
             user_id=user_id,
             msg_index=msg_index,
             user_input=user_input,
             history_text=history_text,
             user_vec=user_vec,
-            candidate_indices=idxs,
-            candidate_scores=scores,
+            candidate_indices=candidate_indices,
+            candidate_scores=candidate_scores,
             final_k=FINAL_K,
         )
-    # If no user_id, we skip logging (ephemeral session)
 
-    # ----------------- 6) LLM RERANK + EXPLANATION ---------------------------
-    rerank_prompt = f"""
+
+def _persist_batch(*, events: List[dict]) -> None:
+    """
+    Batch version of _persist_event: one log append for a whole
+    /recommend/batch call. `events` are _log_record kwargs (without final_k).
+    """
+    with stage_timer("log"):
+        append_log_records([_log_record(**ev, final_k=FINAL_K) for ev in events])
+
+
+def _format_history(history) -> str:
+    """Render a user's recent messages for the LLM prompt."""
+    return "\n".join(f"- {p}" for p in history)
+
+
+def _build_rerank_prompt(history_text: str, user_input: str, candidates: List[dict]) -> str:
+    # Compact cards (embedding_loader.build_movie_card) instead of the full
+    # metadata dicts: fewer prompt tokens -> faster and cheaper rerank call.
+    card_table = "\n".join(c["card"] for c in candidates)
+    return f"""
 You are a movie recommender system.
 
 User's long-term preferences so far:
@@ -401,8 +274,9 @@ User's long-term preferences so far:
 User's latest message:
 {user_input}
 
-Candidate movies (as a Python-like list of dicts):
-{candidates}
+Candidate movies (one per line):
+{CARD_HEADER}
+{card_table}
 
 From these candidates, choose the best {FINAL_K} movies
 that match BOTH the user's long-term tastes and their latest message.
@@ -410,5 +284,787 @@ Explain briefly why each one fits.
 Return a clear, human-readable list.
 """
 
-    return call_llm(rerank_prompt, temperature=0.4)
 
+def _fallback_recommendation(user_input: str, candidates: List[dict], scores) -> str:
+    """
+    Deterministic answer for when the LLM can't be used: the Top-FINAL_K
+    candidates in retrieval order, with reasons templated from metadata.
+    """
+    top = list(zip(candidates, scores))[:FINAL_K]
+    lines = [
+        f'Top {len(top)} picks for "{user_input}" '
+        "(ranked by taste similarity; detailed explanations are temporarily unavailable):",
+        "",
+    ]
+    for rank, (meta, score) in enumerate(top, 1):
+        title = meta.get("title")
+        try:
+            title = f"{title} ({int(meta.get('year'))})"
+        except (TypeError, ValueError):
+            pass
+
+        genres = as_list(meta.get("genres"))[:2]
+        cast = as_list(meta.get("tmdb_top_cast"))[:2]
+        reason = f"a {' / '.join(genres)} pick" if genres else "a close match"
+        if cast:
+            reason += f" starring {' and '.join(cast)}"
+        lines.append(f"{rank}. {title} - {reason}, close to what you described (similarity {float(score):.2f}).")
+    return "\n".join(lines)
+
+
+def _degraded_reason(e: Exception) -> str:
+    from openai import APITimeoutError  # loaded by now: the call went through llm.py
+
+    if isinstance(e, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError, APITimeoutError)):
+        return "timeout"
+    print(f"[recommender] Warning: LLM rerank failed, serving retrieval-only answer: {e!r}")
+    return "error"
+
+
+def _degraded(user_input: str, candidates: List[dict], scores, reason: str) -> str:
+    DEGRADED.labels(reason).inc()
+    return _fallback_recommendation(user_input, candidates, scores)
+
+
+# ----------------- CORE RECOMMENDER -----------------
+
+
+class RecommenderService:
+    """
+    Owns everything the recommender needs at runtime: the query encoder
+    (+ cache and micro-batcher), the movie catalog and FAISS index, the
+    runtime user vectors and message counters, and the persistence thread.
+
+    Nothing is loaded in __init__; `start()` does the heavy lifting
+    (model load, parquet read, index build, user/log replay, warm-up) and
+    records per-stage timings, so the API can serve /healthz immediately
+    and flip /readyz once `ready` is True.
+    """
+
+    def __init__(self, device: Optional[str] = EMBED_DEVICE):
+        self.device = device
+        self.ready = False
+        self.startup_error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
+
+        # Repeated / normalized-identical inputs (onboarding presets, retries)
+        # are served from the embedding cache instead of being re-encoded.
+        self.embed_cache = EmbeddingCache(
+            max_bytes=EMBED_CACHE_MB * 1024 * 1024,
+            disk_dir=EMBED_CACHE_DIR,
+        )
+        self.backend: Optional[CachedEmbeddingBackend] = None
+        self.batcher: Optional[MicroBatcher] = None
+
+        self._shared_loaded = False
+        self.shared_embeddings: Optional[SharedArray] = None
+        self.movie_embeddings: Optional[np.ndarray] = None
+        self.movie_metadata: List[dict] = []
+        self.movie_index: Optional[MovieIndex] = None
+
+        # Persistent runtime users (REAL users only, not offline dataset users).
+        # user_cache: bounded LRU of each user's vector, message counter and
+        # history in front of the store (user_cache.py); user_vectors:
+        # user_id -> taste vector view over it. start() opens the real store.
+        self.use_user_store(MemoryUserStore())
+        # Message counts replayed from the event log, for users whose
+        # stored counter predates it
+        self.logged_message_counts: Dict[str, int] = {}
+        # Read-fuse-write of a user's vector, counter and history holds that
+        # user's stripe; across workers the store's compare-and-set decides
+        self.user_locks = StripedLock(256)
+
+        # Identical in-flight /recommend calls (double-clicks, client
+        # retries) share one pipeline run instead of fusing twice.
+        self.singleflight = SingleFlight()
+
+        # Log appends for the async path run on a single writer thread so
+        # they stay ordered. (Encoding already runs
+        # on the batcher's worker thread, never on the event loop.)
+        self.persist_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="persist"
+        )
+
+    # ---------- lifecycle ----------
+
+    def _timed(self, stage: str, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.startup_timings[stage] = time.perf_counter() - t0
+        return out
+
+    def load_shared(self, use_shared_memory: bool = False) -> "RecommenderService":
+        """
+        Load the read-only part of the state: encoder weights, movie catalog
+        and FAISS index. Starts no threads and runs no inference, so it is
+        safe to call in a parent process before forking workers (preload
+        mode, see gunicorn_conf.py).
+
+        With `use_shared_memory`, the embedding matrix is copied into a
+        named shared-memory segment that forked workers map read-only.
+        """
+        if self._shared_loaded:
+            return self
+
+        encoder = make_encoder(self.device)
+        self._timed("load_model", encoder._ensure_model)
+        self.backend = CachedEmbeddingBackend(encoder, cache=self.embed_cache)
+
+        embeddings, self.movie_metadata = self._timed(
+            "load_catalog", load_movie_embeddings, MOVIE_EMBED_PATH
+        )
+        if use_shared_memory:
+            self.shared_embeddings = SharedArray.create(embeddings)
+            embeddings = self.shared_embeddings.array
+        self.movie_embeddings = embeddings
+        self.movie_index = self._timed("build_index", MovieIndex, self.movie_embeddings)
+
+        self._shared_loaded = True
+        return self
+
+    def start(self, warm_up: bool = True) -> "RecommenderService":
+        """
+        Load everything and (optionally) warm up. Safe to run in a thread.
+
+        Per-process state (batcher thread, users, counters, OpenAI clients)
+        is always created here, i.e. after any fork.
+        """
+        t0 = time.perf_counter()
+        try:
+            self.load_shared()
+
+            # Concurrent requests are coalesced into one encode() call per flush
+            # (up to 32 texts, or whatever arrived within 5 ms of the first one).
+            self.batcher = MicroBatcher(self.backend, max_batch_size=32, max_wait_ms=5.0)
+
+            # Users are read from the store on demand; the "wal" backend
+            # replays its snapshot + WAL here and starts its background threads
+            self.use_user_store(get_user_store())
+            self._timed("open_user_store", self.user_cache.start)
+            self.logged_message_counts = self._timed("replay_log", _init_message_counts_from_log)
+
+            # Create the OpenAI clients (and their pools) and open the cache up front
+            self._timed(
+                "init_llm_clients",
+                lambda: (get_client(), get_async_client(), get_completion_cache()),
+            )
+
+            if warm_up:
+                self._timed("warm_up", self.warm_up)
+        except Exception as e:
+            self.startup_error = f"{type(e).__name__}: {e}"
+            print(f"[recommender] Startup failed: {self.startup_error}")
+            raise
+
+        self.startup_timings["total"] = time.perf_counter() - t0
+        self.ready = True
+        print(
+            f"[recommender] Ready in {self.startup_timings['total']:.2f}s "
+            f"(device={self.backend.backend.device}, movies={len(self.movie_metadata)}, "
+            f"users={len(self.user_vectors)})"
+        )
+        return self
+
+    def warm_up(self) -> None:
+        """
+        Run a few real encode + search passes so the first user request
+        does not pay for lazy weight paging, kernel selection / JIT and
+        first-touch of the embedding matrix and FAISS index.
+        """
+        # Straight to the encoder: the cache must not short-circuit warm-up
+        vecs = self.backend.backend.embed_texts(WARMUP_TEXTS)
+        for vec in vecs:
+            self._retrieve(_normalize(vec))
+        # Touch every page of the catalog matrix
+        float(self.movie_embeddings.sum())
+
+    def close(self) -> None:
+        if self.batcher is not None:
+            self.batcher.close()
+        self.persist_executor.shutdown(wait=True)
+        get_event_log().close()
+        self.user_cache.close()
+
+    def release_shared(self) -> None:
+        """Unlink the shared-memory catalog (preload master only, at exit)."""
+        if self.shared_embeddings is not None:
+            self.movie_index = None
+            self.movie_embeddings = None
+            self.shared_embeddings.close()
+            self.shared_embeddings = None
+
+    def use_user_store(self, store: BaseUserStore, **cache_kwargs) -> None:
+        """Serve runtime users from `store` through a fresh LRU cache (not started)."""
+        self.user_cache = CachedUserStore(store, **cache_kwargs)
+        self.user_vectors = UserVectors(self.user_cache)
+
+    # Per-user state of the cached users (introspection and tests)
+
+    @property
+    def message_counts(self) -> Dict[str, int]:
+        return {uid: version for uid, (version, _) in self.user_cache.cached().items() if version}
+
+    # The message counter doubles as the state version in the coalescing key
+    state_versions = message_counts
+
+    @property
+    def preference_history(self) -> Dict[str, List[str]]:
+        return {uid: history for uid, (_, history) in self.user_cache.cached().items() if history}
+
+    # ---------- embedding ----------
+
+    def embed_user_taste(self, text: str) -> np.ndarray:
+        """
+        Convert a normalized taste description into a unit-norm embedding
+        using the same backbone as movie embeddings (BGE-base).
+        """
+        cached = self.backend.lookup(text)
+        if cached is not None:
+            return _normalize(cached)
+        return _normalize(self.batcher.embed(text))
+
+    async def aembed_user_taste(self, text: str) -> np.ndarray:
+        """Async version of embed_user_taste(); awaits the batcher's future."""
+        cached = self.backend.lookup(text)
+        if cached is not None:
+            return _normalize(cached)
+        return _normalize(await asyncio.wrap_future(self.batcher.submit(text)))
+
+    # ---------- pipeline stages ----------
+
+    def _fuse_user_vec(self, prev_vec: Optional[np.ndarray], new_vec: np.ndarray) -> np.ndarray:
+        """EMA-fuse the new taste vector with the stored one (if any) and normalize."""
+        if prev_vec is not None:
+            user_vec = USER_FUSE_ALPHA * prev_vec + (1.0 - USER_FUSE_ALPHA) * new_vec
+        else:
+            user_vec = new_vec
+
+        # Normalize fused vector for safety
+        return _normalize(user_vec)
+
+    def _next_msg_index(self, user_id: str, stored: int) -> int:
+        # The store's version counts the user's messages across workers;
+        # the event-log replay covers users that predate it
+        return max(stored, self.logged_message_counts.get(user_id, 0)) + 1
+
+    def _update_user(
+        self,
+        user_id: str,
+        user_input: str,
+        new_vec: np.ndarray,
+        on_commit: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Steps 2-3 for an identified user, atomic per user: fuse with the
+        stored vector, write it back, take the next msg_index and extend the
+        history. Returns (user_vec, msg_index, history_text); msg_index is
+        also the user's new state version.
+
+        Concurrent requests of the same user in this process wait on the
+        user's lock stripe; a write from another worker in between makes
+        compare-and-set fail and the fusion is redone on the fresh vector.
+        `on_commit(msg_index)` runs once the write succeeded, still under
+        the stripe.
+        """
+        store = self.user_cache
+        with self.user_locks.hold([user_id]):
+            while True:
+                prev = store.get_many_versioned([user_id])[user_id]
+                with stage_timer("fuse"):
+                    user_vec = self._fuse_user_vec(prev.vec, new_vec)
+                msg_index = self._next_msg_index(user_id, prev.version)
+                history = append_history(prev.history, user_input)
+                with stage_timer("persist"):
+                    update = {user_id: (UserRecord(user_vec, msg_index, history), prev.version)}
+                    if not store.compare_and_set_many(update):
+                        break
+            if on_commit is not None:
+                on_commit(msg_index)
+        return user_vec, msg_index, _format_history(history)
+
+    def _flight_key(self, user_input: str, user_id: Optional[str], version=None) -> tuple:
+        """
+        Coalescing key: (user_id, normalized input, user's state version).
+
+        The version is read under the user's stripe, so an update in
+        progress is either complete or not started (blocking: call it from
+        a worker thread).
+        """
+        user_id = user_id or None
+        if version is None:
+            version = 0
+            if user_id:
+                with self.user_locks.hold([user_id]):
+                    version = self.user_cache.peek_version(user_id)
+        return (user_id, normalize_text(user_input), version)
+
+    def _alias_flight(self, flight_key: tuple, user_input: str, user_id: str, msg_index: int) -> None:
+        # Duplicates arriving from now on see the bumped version; they are
+        # still the same request. Runs under the stripe (on_commit), before
+        # any of them can read the new version.
+        self.singleflight.alias(flight_key, self._flight_key(user_input, user_id, msg_index))
+
+    def _update_users_batch(
+        self, user_ids: List[Optional[str]], texts: List[str], new_vecs: np.ndarray
+    ) -> Tuple[np.ndarray, List[Optional[int]], List[str]]:
+        """
+        Vectorized _update_user over a batch, holding the lock stripes of all
+        its users. A user that appears several times is fused in order of
+        appearance (one wave per repeat), matching sequential calls. Returns
+        (fused vectors, msg_index per item or None, history text per item).
+        """
+        fused = new_vecs.copy()
+        msg_indices: List[Optional[int]] = [None] * len(user_ids)
+        histories = ["- (no stable user id; only using this message)"] * len(user_ids)
+
+        waves: List[List[int]] = []
+        seen: Dict[str, int] = {}
+        for i, uid in enumerate(user_ids):
+            if not uid:
+                continue
+            n = seen.get(uid, 0)
+            seen[uid] = n + 1
+            if n == len(waves):
+                waves.append([])
+            waves[n].append(i)
+
+        store = self.user_cache
+        with self.user_locks.hold(seen):
+            # One batch read and one batch compare-and-set per wave (plus a
+            # retry for users another worker updated in between)
+            for wave in waves:
+                pending = wave
+                while pending:
+                    stored = store.get_many_versioned(user_ids[i] for i in pending)
+                    known = [i for i in pending if stored[user_ids[i]].vec is not None]
+                    with stage_timer("fuse"):
+                        fused[pending] = new_vecs[pending]
+                        if known:
+                            prev = np.stack([stored[user_ids[i]].vec for i in known])
+                            fused[known] = USER_FUSE_ALPHA * prev + (1.0 - USER_FUSE_ALPHA) * new_vecs[known]
+                        fused[pending] = _normalize_rows(fused[pending])
+
+                    updates = {}
+                    for i in pending:
+                        uid, prev = user_ids[i], stored[user_ids[i]]
+                        msg_indices[i] = self._next_msg_index(uid, prev.version)
+                        history = append_history(prev.history, texts[i])
+                        histories[i] = _format_history(history)
+                        updates[uid] = (UserRecord(fused[i].copy(), msg_indices[i], history), prev.version)
+                    with stage_timer("persist"):
+                        failed = set(store.compare_and_set_many(updates))
+                    pending = [i for i in pending if user_ids[i] in failed]
+
+        return fused, msg_indices, histories
+
+    def _retrieve(self, user_vec: np.ndarray):
+        """Top-K retrieval; always returns 1D (idxs, scores) arrays."""
+        # NOTE: movie_index.search should accept user_vec (D,) or (1, D)
+        idxs, scores = self.movie_index.search(user_vec, k=TOP_K)
+
+        # Make sure these are 1D arrays
+        idxs = np.asarray(idxs)
+        scores = np.asarray(scores)
+        if idxs.ndim > 1:
+            idxs = idxs[0]
+        if scores.ndim > 1:
+            scores = scores[0]
+        return idxs, scores
+
+    def _candidate_summary(self, idx: int, score: float) -> dict:
+        """JSON-safe view of one retrieved movie for the streaming endpoint."""
+        meta = self.movie_metadata[idx]
+        year = meta.get("year")
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            year = None
+        return {
+            "index": int(idx),
+            "movie_id": int(meta["movie_id"]),
+            "title": meta.get("title"),
+            "year": year,
+            "score": float(score),
+        }
+
+    # ---------- entry points ----------
+
+    def recommend(
+        self,
+        user_input: str,
+        user_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """
+        Main recommendation entry point.
+
+        - Build a taste vector from this input
+        - Fuse with previous taste if user_id is known
+        - Write the updated taste vector to the user store (user_store.py)
+        - Keep a small text history per user for the LLM
+        - Retrieve movies and ask GPT to explain/rerank using both history + latest input
+        - Log each interaction (event_log.py) with msg_index, query, and rec indices
+
+        If the LLM doesn't answer within `deadline` (default
+        RECOMMEND_DEADLINE_S), a retrieval-only answer is returned instead.
+        """
+        deadline = deadline or Deadline(RECOMMEND_DEADLINE_S)
+        with stage_timer("total"):
+            return self._recommend(user_input, user_id, deadline)
+
+    def _recommend(self, user_input: str, user_id: Optional[str], deadline: Deadline) -> str:
+
+        # ----------------- 1) TASTE EMBEDDING FROM CURRENT INPUT -----------------
+        # Simple version: use raw input as taste profile
+        # Option A (cheaper): directly embed the raw input
+        taste_profile = user_input
+
+        # Option B (more structured): uncomment to normalize via GPT
+        # taste_profile = extract_taste_with_llm(user_input)
+        with stage_timer("embed"):
+            new_vec = self.embed_user_taste(taste_profile)
+
+        # ----------------- 2) + 3) FUSE WITH PREVIOUS TASTE, UPDATE USER STATE --
+        # (_update_user times the fusion and the write as separate stages)
+        has_identity = user_id is not None and user_id != ""
+        if has_identity:
+            user_vec, msg_index, history_text = self._update_user(user_id, user_input, new_vec)
+        else:
+            with stage_timer("fuse"):
+                user_vec = self._fuse_user_vec(None, new_vec)
+            history_text = "- (no stable user id; only using this message)"
+
+        # ----------------- 4) MOVIE RETRIEVAL ------------------------------------
+        with stage_timer("retrieve"):
+            idxs, scores = self._retrieve(user_vec)
+        CANDIDATES.inc(len(idxs))
+        # # Numerical reranker alternative (see gpt_reranker.py):
+        # scored = []
+        # for idx, base_score in zip(idxs, scores):
+        #     movie = self.movie_metadata[idx]
+        #     gpt_score = predict_like_score(history_text, movie)  # or user_input
+        #     final_score = combined_score(user_vec, self.movie_embeddings[idx], gpt_score)
+        #     scored.append((final_score, movie))
+        candidates = [self.movie_metadata[i] for i in idxs]
+
+        # ----------------- 5) PERSIST + LOG THIS RECOMMENDATION EVENT ------------
+        if has_identity:
+            _persist_event(
+                user_id=user_id,
+                msg_index=msg_index,
+                user_input=user_input,
+                history_text=history_text,
+                user_vec=user_vec,
+                candidate_indices=idxs,
+                candidate_scores=scores,
+            )
+        # If no user_id, we skip logging (ephemeral session)
+
+        # ----------------- 6) LLM RERANK + EXPLANATION ---------------------------
+        text, _ = self._rerank(history_text, user_input, idxs, scores, deadline)
+        return text
+
+    def _rerank(self, history_text, user_input, idxs, scores, deadline: Deadline):
+        """
+        Step 6 within what is left of the deadline. Returns (text, reason),
+        where reason is None for an LLM answer, else why we degraded.
+        """
+        candidates = [self.movie_metadata[i] for i in idxs]
+        reason = "timeout"
+        if not deadline.expired:
+            rerank_prompt = _build_rerank_prompt(history_text, user_input, candidates)
+            try:
+                with stage_timer("llm_rerank"):
+                    return call_llm(rerank_prompt, temperature=0.4, timeout=deadline.remaining()), None
+            except Exception as e:
+                reason = _degraded_reason(e)
+        return _degraded(user_input, candidates, scores, reason), reason
+
+    async def _arerank(self, history_text, user_input, idxs, scores, deadline: Deadline):
+        """Async version of _rerank()."""
+        candidates = [self.movie_metadata[i] for i in idxs]
+        reason = "timeout"
+        if not deadline.expired:
+            rerank_prompt = _build_rerank_prompt(history_text, user_input, candidates)
+            try:
+                with stage_timer("llm_rerank"):
+                    text = await acall_llm(
+                        rerank_prompt, temperature=0.4, timeout=deadline.remaining()
+                    )
+                return text, None
+            except Exception as e:
+                reason = _degraded_reason(e)
+        return _degraded(user_input, candidates, scores, reason), reason
+
+    async def _aprepare(
+        self, user_input: str, user_id: Optional[str], flight_key: Optional[tuple] = None
+    ):
+        """
+        Steps 1-5 of the pipeline for the async path.
+
+        Encoding goes through the micro-batcher, the user-state update (lock
+        stripe wait + store compare-and-set) runs in a worker thread, the log
+        append is handed to the single writer thread (not awaited). Returns
+        (history_text, idxs, scores).
+        """
+        loop = asyncio.get_running_loop()
+
+        # 1) Taste embedding (off the event loop)
+        with stage_timer("embed"):
+            new_vec = await self.aembed_user_taste(user_input)
+
+        # 2) + 3) Fuse and update the user's state (off the event loop: it may
+        #         wait on the user's lock stripe or a busy store)
+        has_identity = user_id is not None and user_id != ""
+        if has_identity:
+            on_commit = None
+            if flight_key is not None:
+                on_commit = partial(self._alias_flight, flight_key, user_input, user_id)
+            user_vec, msg_index, history_text = await asyncio.to_thread(
+                self._update_user, user_id, user_input, new_vec, on_commit
+            )
+        else:
+            with stage_timer("fuse"):
+                user_vec = self._fuse_user_vec(None, new_vec)
+            history_text = "- (no stable user id; only using this message)"
+
+        # 4) Retrieval (flat inner-product search, ~ms)
+        with stage_timer("retrieve"):
+            idxs, scores = self._retrieve(user_vec)
+        CANDIDATES.inc(len(idxs))
+
+        # 5) Persist + log in the background (only this user's vector)
+        if has_identity:
+            loop.run_in_executor(
+                self.persist_executor,
+                partial(
+                    _persist_event,
+                    user_id=user_id,
+                    msg_index=msg_index,
+                    user_input=user_input,
+                    history_text=history_text,
+                    user_vec=user_vec,
+                    candidate_indices=idxs,
+                    candidate_scores=scores,
+                ),
+            )
+
+        return history_text, idxs, scores
+
+    async def arecommend(self, user_input: str, user_id: Optional[str] = None) -> str:
+        """
+        Async version of recommend() for the FastAPI event loop; the rerank
+        call goes through the shared AsyncOpenAI client.
+        """
+        response = await self.arecommend_response(user_input, user_id)
+        return response["recommendation"]
+
+    async def arecommend_response(
+        self,
+        user_input: str,
+        user_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> dict:
+        """
+        arecommend() plus whether the answer is degraded (LLM timed out,
+        failed, or its circuit breaker is open -> retrieval-only answer).
+
+        Concurrent calls with the same user, normalized input and user state
+        version are coalesced: they await one pipeline run (one embedding,
+        one EMA update, one LLM call) and get the same response.
+        """
+        if user_id:
+            key = await asyncio.to_thread(self._flight_key, user_input, user_id)
+        else:
+            key = self._flight_key(user_input, user_id)
+        return await self.singleflight.do(
+            key, partial(self._arecommend_response, user_input, user_id, deadline, key)
+        )
+
+    async def _arecommend_response(self, user_input, user_id, deadline, flight_key) -> dict:
+        deadline = deadline or Deadline(RECOMMEND_DEADLINE_S)
+        with stage_timer("total"):
+            history_text, idxs, scores = await self._aprepare(user_input, user_id, flight_key)
+            # 6) LLM rerank + explanation
+            text, reason = await self._arerank(history_text, user_input, idxs, scores, deadline)
+
+        response = {"recommendation": text, "degraded": reason is not None}
+        if reason is not None:
+            response["degraded_reason"] = reason
+        return response
+
+    async def arecommend_stream(
+        self,
+        user_input: str,
+        user_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Streaming version of arecommend().
+
+        Yields (event, payload) pairs:
+          - ("candidates", {...}) once, right after retrieval
+          - ("token", {"text": ...}) for each LLM delta
+          - ("done", {"degraded": bool}) when the rerank completion is finished
+
+        The deadline bounds the wait for the first token; if the LLM can't
+        start in time, the retrieval-only answer is sent as a single token.
+        """
+        deadline = deadline or Deadline(RECOMMEND_DEADLINE_S)
+        t0 = time.perf_counter()
+        history_text, idxs, scores = await self._aprepare(user_input, user_id)
+        candidates = [self.movie_metadata[i] for i in idxs]
+
+        yield "candidates", {
+            "candidates": [self._candidate_summary(i, s) for i, s in zip(idxs, scores)]
+        }
+
+        rerank_prompt = _build_rerank_prompt(history_text, user_input, candidates)
+        t_llm = time.perf_counter()
+        reason = "timeout"
+        streamed = False
+        if not deadline.expired:
+            try:
+                async for delta in astream_llm(
+                    rerank_prompt, temperature=0.4, timeout=deadline.remaining()
+                ):
+                    streamed = True
+                    yield "token", {"text": delta}
+                reason = None
+            except Exception as e:
+                if streamed:
+                    # Partial answer already sent; surface as an error event
+                    raise
+                reason = _degraded_reason(e)
+        if reason is None:
+            observe_stage("llm_rerank", time.perf_counter() - t_llm)
+        else:
+            yield "token", {"text": _degraded(user_input, candidates, scores, reason)}
+        observe_stage("total", time.perf_counter() - t0)
+
+        yield "done", {"degraded": reason is not None}
+
+    async def arecommend_batch(
+        self,
+        items: List[Tuple[str, Optional[str]]],
+        max_concurrency: int = BATCH_LLM_CONCURRENCY,
+    ) -> List[dict]:
+        """
+        Recommendations for many (user_input, user_id) pairs in one call.
+
+        Steps 1-5 run once for the whole batch: one encoder call (cached and
+        duplicate texts are not re-encoded), one vectorized fusion, one FAISS
+        search and one user-state write + log append. The LLM reranks then
+        run concurrently, at most `max_concurrency` at a time.
+
+        Returns one {"user_id", "recommendation", "degraded"} per item, in
+        input order; an item whose rerank fails gets the retrieval-only answer.
+        """
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in items]
+        user_ids = [uid or None for _, uid in items]
+
+        # 1) One encoder call for every text
+        new_vecs = _normalize_rows(await asyncio.to_thread(self.backend.embed_texts, texts))
+
+        # 2) + 3) Vectorized fusion, message counters and histories (worker thread)
+        user_vecs, msg_indices, histories = await asyncio.to_thread(
+            self._update_users_batch, user_ids, texts, new_vecs
+        )
+        events: List[dict] = []
+        event_rows: List[int] = []
+        for i, (text, uid) in enumerate(zip(texts, user_ids)):
+            if uid is None:
+                continue
+            event_rows.append(i)
+            events.append({
+                "user_id": uid,
+                "msg_index": msg_indices[i],
+                "user_input": text,
+                "history_text": histories[i],
+                "user_vec": user_vecs[i],
+            })
+
+        # 4) One batched search
+        idxs, scores = self.movie_index.search_batch(user_vecs, k=TOP_K)
+        CANDIDATES.inc(idxs.size)
+
+        # 5) One write for all user updates (background, like _aprepare)
+        if events:
+            for ev, i in zip(events, event_rows):
+                ev["candidate_indices"] = idxs[i]
+                ev["candidate_scores"] = scores[i]
+            loop.run_in_executor(
+                self.persist_executor,
+                partial(
+                    _persist_batch,
+                    events=events,
+                ),
+            )
+
+        # 6) LLM reranks, bounded concurrency. Each item gets its own deadline
+        #    once it holds a slot, so queueing behind the pool doesn't eat it.
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def rerank(i: int) -> dict:
+            async with sem:
+                text, reason = await self._arerank(
+                    histories[i], texts[i], idxs[i], scores[i], Deadline(RECOMMEND_DEADLINE_S)
+                )
+            result = {"user_id": user_ids[i], "recommendation": text, "degraded": reason is not None}
+            if reason is not None:
+                result["degraded_reason"] = reason
+            return result
+
+        return list(await asyncio.gather(*(rerank(i) for i in range(len(items)))))
+
+    def embedding_cache_stats(self) -> dict:
+        """Hit/miss counters of the query-embedding cache."""
+        return self.embed_cache.stats()
+
+
+# -------------------------------------------------------------------
+# Module-level default service (CLI, scripts). The API creates its own
+# in the FastAPI lifespan and registers it with set_service().
+# -------------------------------------------------------------------
+
+_service: Optional[RecommenderService] = None
+_service_lock = threading.Lock()
+
+
+def _close_at_exit(service: RecommenderService) -> None:
+    # Unless it was replaced with set_service() (its new owner closes it)
+    if _service is service:
+        service.close()
+
+
+def get_service() -> RecommenderService:
+    """Return the default service, starting it on first use; closed at exit."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RecommenderService().start()
+            atexit.register(_close_at_exit, _service)
+        return _service
+
+
+def set_service(service: Optional[RecommenderService]) -> None:
+    global _service
+    with _service_lock:
+        _service = service
+
+
+def embed_user_taste(text: str) -> np.ndarray:
+    return get_service().embed_user_taste(text)
+
+
+def recommend(user_input: str, user_id: Optional[str] = None) -> str:
+    return get_service().recommend(user_input=user_input, user_id=user_id)
+
+
+async def arecommend(user_input: str, user_id: Optional[str] = None) -> str:
+    return await get_service().arecommend(user_input=user_input, user_id=user_id)
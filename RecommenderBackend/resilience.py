@@ -0,0 +1,93 @@
+# RecommenderBackend/resilience.py
+
+"""
+Request deadlines and a circuit breaker for the OpenAI calls.
+
+- `Deadline`: an absolute time budget created when a request starts. The
+  embedding and retrieval stages don't consult it; the LLM rerank gets
+  `remaining()` as its timeout (and llm.py retries only while it has room),
+  so time spent in the earlier stages shrinks the LLM budget.
+- `CircuitBreaker`: after `failure_threshold` consecutive outage-like
+  failures (timeouts, connection errors, 429/5xx) the breaker opens and
+  calls fail fast with `CircuitOpenError` for `reset_timeout_s`; then one
+  probe call is let through (half-open) and its outcome closes or re-opens
+  the breaker.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+def is_outage_error(exc: BaseException) -> bool:
+    """Failures that say the service is unhealthy (vs. a bad request of ours)."""
+    status = getattr(exc, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a call go through right now?"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout_s:
+                return False
+            # Open long enough (or the last probe never reported back):
+            # let one probe through and hold the rest.
+            self.state = self.HALF_OPEN
+            self.opened_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(
+                        f"[resilience] Warning: circuit opened after "
+                        f"{self.failures} failures; failing fast for {self.reset_timeout_s:.0f}s"
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
@@ -0,0 +1,74 @@
+# RecommenderBackend/shared_catalog.py
+
+"""
+Read-only numpy arrays backed by `multiprocessing.shared_memory`.
+
+Used by the preload deployment (gunicorn_conf.py): the master process
+copies the movie embedding matrix into one named shared-memory segment
+before forking, and every worker maps those same physical pages instead of
+holding its own copy. Workers started some other way (spawn) can attach to
+the segment by name with `SharedArray.attach`.
+"""
+
+from __future__ import annotations
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import Tuple
+
+import numpy as np
+
+
+class SharedArray:
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        shape: Tuple[int, ...],
+        dtype,
+        owner: bool,
+    ):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = owner
+
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+        self.array.flags.writeable = False
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def create(cls, arr: np.ndarray) -> "SharedArray":
+        """Copy `arr` into a new shared-memory segment owned by this process."""
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+        view[...] = arr
+        return cls(shm, arr.shape, arr.dtype, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, ...], dtype) -> "SharedArray":
+        """Map an existing segment read-only (non-owning)."""
+        shm = shared_memory.SharedMemory(name=name)
+        # Only the creator may unlink the segment; stop this process's
+        # resource tracker from removing it when we exit.
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, shape, dtype, owner=False)
+
+    def close(self) -> None:
+        # Drop our view first so the buffer can be released
+        self.array = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Something (e.g. a FAISS index or a slice) still references it
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
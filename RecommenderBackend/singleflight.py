@@ -0,0 +1,67 @@
+# RecommenderBackend/singleflight.py
+
+"""
+Request coalescing ("single flight") for the async endpoints.
+
+Concurrent calls with the same key share one execution: the first caller
+starts the work as a task, later callers await the same task. The task is
+shielded, so a caller that disconnects (double-click, client retry) does
+not cancel the work for the others, and side effects such as the user
+vector update happen exactly once.
+
+A key can be aliased while in flight (`alias`), so a request whose own
+work changes the key (e.g. bumps the user's state version) still catches
+duplicates that arrive after that change. `alias` may be called from a
+worker thread, at the moment of the change, so that no duplicate can see
+the new key before it is registered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()  # alias() runs on worker threads
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._inflight[key] = task
+                task.add_done_callback(self._forget)
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def alias(self, key: Hashable, new_key: Hashable) -> None:
+        """Let callers arriving with `new_key` join the flight running under `key`."""
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is not None and new_key not in self._inflight:
+                self._inflight[new_key] = task
+
+    def _forget(self, task: asyncio.Task) -> None:
+        with self._lock:
+            for key in [k for k, t in self._inflight.items() if t is task]:
+                del self._inflight[key]
+        # Every caller may have gone away; don't log "exception never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(set(map(id, self._inflight.values())))
+        return {
+            "in_flight": in_flight,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,36 @@
+# RecommenderBackend/striped_lock.py
+
+"""
+Striped locks: a fixed pool of threading.Locks, one picked per key by hash.
+
+Memory stays constant however many keys (user ids) there are, and two keys
+only contend when they land on the same stripe. `hold()` takes the stripes
+of several keys in index order, so overlapping multi-key holders (batch
+requests) cannot deadlock each other.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterable, Iterator
+
+
+class StripedLock:
+    def __init__(self, stripes: int = 256):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _index(self, key: Hashable) -> int:
+        return hash(key) % len(self._locks)
+
+    @contextmanager
+    def hold(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        """Hold the stripes of all `keys` for the duration of the block."""
+        stripes = sorted({self._index(k) for k in keys})
+        for i in stripes:
+            self._locks[i].acquire()
+        try:
+            yield
+        finally:
+            for i in reversed(stripes):
+                self._locks[i].release()
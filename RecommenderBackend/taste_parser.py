@@ -17,4 +17,5 @@ Return a single paragraph describing:
 Do NOT include filler or explanation.
 """
 
-    return call_llm(prompt, temperature=0.1)
+    # Same message, same profile: worth caching despite the sampling
+    return call_llm(prompt, temperature=0.1, use_cache=True)
@@ -0,0 +1,43 @@
+# RecommenderBackend/test_embed_batcher.py
+
+"""
+MicroBatcher must survive callers that give up on their future (a
+/recommend/stream client that disconnects cancels it): the rest of the
+batch and every later submit() still resolve.
+
+Uses the fake encoder from conftest.py, so no model weights:
+
+    python test_embed_batcher.py   (or: pytest test_embed_batcher.py)
+"""
+
+from conftest import GatedEncoder, fake_vector
+from embed_batcher import MicroBatcher
+
+
+def test_cancelled_future_does_not_kill_the_worker():
+    encoder = GatedEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=8, max_wait_ms=20.0)
+    try:
+        warm = batcher.submit("warm")
+        assert encoder.started.wait(timeout=5)
+
+        # Queued behind the blocked batch, so they flush together.
+        keep, drop, also_keep = (batcher.submit(t) for t in ("sad", "happy", "slow"))
+        assert drop.cancel()
+        encoder.gate.set()
+
+        assert warm.result(timeout=5) == fake_vector("warm").tolist()
+        assert keep.result(timeout=5) == fake_vector("sad").tolist()
+        assert also_keep.result(timeout=5) == fake_vector("slow").tolist()
+        assert drop.cancelled()
+
+        assert batcher.submit("later").result(timeout=5) == fake_vector("later").tolist()
+        assert batcher.num_texts == 4  # the cancelled text is never encoded
+    finally:
+        encoder.gate.set()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    test_cancelled_future_does_not_kill_the_worker()
+    print("✅ Micro-batcher tests passed!")
@@ -0,0 +1,133 @@
+# RecommenderBackend/test_event_log.py
+
+"""
+Buffered, segmented recommendation event log (event_log.py).
+
+  - append() only buffers; the flush thread writes within the interval
+  - segments rotate past segment_bytes and are sealed on close
+  - read_events() returns the rec_log.jsonl shape: every field as logged,
+    "user_vec" rounded to float16; the legacy file is read first
+  - a torn last metadata line (crash mid-write) is skipped
+
+    python test_event_log.py   (or: pytest test_event_log.py)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from event_log import ACTIVE_SUFFIX, EventLogWriter, list_segments, read_events
+from message_counts import load_message_counts
+from recommender import _log_record
+
+DIM = 768
+
+
+def _records(user_id: str, n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        _log_record(
+            user_id=user_id,
+            msg_index=i + 1,
+            user_input=f"{user_id} message {i + 1}",
+            history_text=f"- {user_id} message {i + 1}",
+            user_vec=rng.standard_normal(DIM).astype("float32"),
+            candidate_indices=np.arange(20),
+            candidate_scores=rng.random(20),
+            final_k=5,
+        )
+        for i in range(n)
+    ]
+
+
+def _read(tmp: str, user_id=None) -> list:
+    return list(read_events(user_id, directory=tmp, legacy_path=Path(tmp) / "rec_log.jsonl", store_dir=tmp))
+
+
+def _same(got: dict, rec: dict) -> None:
+    rec = dict(rec)
+    vec = rec.pop("user_vec").astype(np.float16).astype(np.float32)
+    assert np.array_equal(np.asarray(got.pop("user_vec"), dtype=np.float32), vec)
+    assert got == json.loads(json.dumps(rec))
+
+
+def test_flush_thread_and_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = EventLogWriter(tmp, flush_interval_s=0.05, segment_bytes=16 * 1024)
+        records = _records("alice", 40)
+        writer.append(records[:1])
+        assert writer.stats()["buffered"] == 1  # not on the caller's thread
+
+        deadline = time.time() + 2.0
+        while writer.stats()["written"] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        assert writer.stats()["written"] == 1
+        assert [rec["msg_index"] for rec in _read(tmp)] == [1]  # readable while active
+
+        for rec in records[1:]:
+            writer.append([rec])
+            time.sleep(0.002)
+        writer.close()
+
+        segments = list_segments(tmp)
+        assert len(segments) > 1, segments
+        assert not any(meta.name.endswith(ACTIVE_SUFFIX) for _, meta, _ in segments)
+        got = _read(tmp)
+        assert len(got) == len(records)
+        for g, rec in zip(got, records):
+            _same(g, rec)
+
+
+def test_legacy_log_torn_line_and_user_filter():
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = _records("bob", 2, seed=1)
+        with open(Path(tmp) / "rec_log.jsonl", "w", encoding="utf-8") as f:
+            for rec in legacy:
+                f.write(json.dumps(dict(rec, user_vec=rec["user_vec"].tolist())) + "\n")
+
+        writer = EventLogWriter(tmp, flush_interval_s=0)
+        writer.append(_records("alice", 3, seed=2))
+        writer.append(_records("bob", 3, seed=3)[2:])
+        (_, meta, _), = list_segments(tmp)
+        with open(meta, "ab") as f:
+            f.write(b'{"timestamp": "x", "user_id": "bob", "msg_index": 4')  # crash mid-write
+
+        got = _read(tmp, "bob")
+        assert [rec["msg_index"] for rec in got] == [1, 2, 3]
+        assert got[0]["user_vec"] == legacy[0]["user_vec"].tolist()  # legacy: full precision
+        assert len(_read(tmp)) == 6
+
+        # Message counters see the legacy log and the segment alike
+        writer.close()
+        assert load_message_counts(Path(tmp) / "rec_log.jsonl", tmp, tmp) == {"alice": 3, "bob": 3}
+
+
+def test_buffer_written_at_exit():
+    # A script that never closes the writer: the atexit handler flushes the
+    # buffer (the flush interval is far away) and seals the segment
+    with tempfile.TemporaryDirectory() as tmp:
+        script = (
+            "import numpy as np, event_log\n"
+            "from test_event_log import _records\n"
+            "event_log.get_event_log().append(_records('carol', 3))\n"
+        )
+        env = {"EVENT_LOG_DIR": tmp, "EVENT_LOG_FLUSH_MS": "60000"}
+        subprocess.run(
+            [sys.executable, "-c", script], cwd=Path(__file__).parent, check=True, env={**os.environ, **env}
+        )
+        segments = list_segments(tmp)
+        assert [meta.name.endswith(ACTIVE_SUFFIX) for _, meta, _ in segments] == [False]
+        assert [rec["msg_index"] for rec in _read(tmp)] == [1, 2, 3]
+
+
+if __name__ == "__main__":
+    test_flush_thread_and_rotation()
+    test_legacy_log_torn_line_and_user_filter()
+    test_buffer_written_at_exit()
+    print("✅ Event log tests passed!")
@@ -0,0 +1,159 @@
+# RecommenderBackend/test_event_store.py
+
+"""
+Compaction of the event log into the partitioned parquet store
+(compact_event_log.py, event_store.py).
+
+  - read_events() returns the same events before and after compaction;
+    sealed segments are deleted, the active one is left alone, the legacy
+    rec_log.jsonl is renamed
+  - a user's query plans only files of their bucket, and only the row
+    groups whose statistics can hold the user / msg_index range
+  - files written by an interrupted compaction stay invisible, and the
+    re-run doesn't duplicate them
+  - message counters survive their segments being compacted away
+  - an active segment whose writer died is sealed and compacted; one
+    whose writer is alive is left alone
+
+    python test_event_store.py   (or: pytest test_event_store.py)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import event_store
+from compact_event_log import compact
+from event_log import ACTIVE_SUFFIX, EventLogWriter, list_segments, read_events, read_segment
+from message_counts import load_message_counts
+from recommender import _log_record
+
+DIM = 32
+USERS = [f"user-{i}" for i in range(40)]
+
+
+def _record(rng, user_id: str, msg_index: int, day: str) -> dict:
+    rec = _log_record(
+        user_id=user_id,
+        msg_index=msg_index,
+        user_input=f"{user_id} message {msg_index}",
+        history_text=f"- {user_id} message {msg_index}",
+        user_vec=rng.standard_normal(DIM).astype("float32"),
+        candidate_indices=np.arange(20),
+        candidate_scores=rng.random(20),
+        final_k=5,
+    )
+    rec["timestamp"] = f"{day}T12:00:00.000000Z"
+    return rec
+
+
+def _fill(tmp: Path) -> dict:
+    """Legacy log, sealed segments over two days and an active segment; returns counts."""
+    rng = np.random.default_rng(0)
+    counts = {}
+
+    def nxt(user_id):
+        counts[user_id] = counts.get(user_id, 0) + 1
+        return counts[user_id]
+
+    with open(tmp / "rec_log.jsonl", "w", encoding="utf-8") as f:
+        for user_id in USERS[:10]:
+            rec = _record(rng, user_id, nxt(user_id), "2026-10-17")
+            f.write(json.dumps(dict(rec, user_vec=rec["user_vec"].tolist())) + "\n")
+
+    writer = EventLogWriter(tmp / "segments", flush_interval_s=0, segment_bytes=32 * 1024)
+    for day in ("2026-10-18", "2026-10-19"):
+        for user_id in rng.choice(USERS, size=300):
+            writer.append([_record(rng, str(user_id), nxt(str(user_id)), day)])
+    writer.close()
+
+    active = EventLogWriter(tmp / "segments", flush_interval_s=0)
+    active.append([_record(rng, "user-0", nxt("user-0"), "2026-10-19")])
+    return counts
+
+
+def _read(tmp: Path, **kw) -> list:
+    events = read_events(directory=tmp / "segments", legacy_path=tmp / "rec_log.jsonl", store_dir=tmp / "store", **kw)
+    return sorted(events, key=lambda rec: (rec["user_id"], rec["msg_index"]))
+
+
+def test_compaction_preserves_events_and_prunes_reads():
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        counts = _fill(tmp)
+        before = _read(tmp)
+        sealed = [stem for stem, meta, _ in list_segments(tmp / "segments") if not meta.name.endswith(ACTIVE_SUFFIX)]
+        assert len(sealed) > 2
+
+        # An interrupted run: one segment's files written, never listed in the manifest
+        (_, meta, vec), = [s for s in list_segments(tmp / "segments") if s[0] == sealed[0]]
+        event_store.write_source(sealed[0], read_segment(meta, vec), tmp / "store", 8, 16)
+        assert _read(tmp) == before
+
+        stats = compact(tmp / "segments", tmp / "store", tmp / "rec_log.jsonl", buckets=8, row_group_size=16)
+        assert stats["sources"] == len(sealed) + 1 and stats["events"] == len(before) - 1, stats
+        assert _read(tmp) == before
+        assert [meta.name.endswith(ACTIVE_SUFFIX) for _, meta, _ in list_segments(tmp / "segments")] == [True]
+        assert (tmp / "rec_log.jsonl.compacted").exists() and not (tmp / "rec_log.jsonl").exists()
+
+        # One user: their bucket only, a fraction of the row groups
+        user_id = "user-7"
+        bucket = f"user_bucket={event_store.user_bucket(user_id, 8)}"
+        plan = event_store.scan_plan(user_id, directory=tmp / "store")
+        all_groups = sum(len(g) for _, g in event_store.scan_plan(directory=tmp / "store"))
+        assert plan and all(path.parent.name == bucket for path, _ in plan)
+        assert sum(len(g) for _, g in plan) < all_groups / 4, (plan, all_groups)
+        ranged = event_store.scan_plan(user_id, msg_index=(1, 2), directory=tmp / "store")
+        assert sum(len(g) for _, g in ranged) <= sum(len(g) for _, g in plan)
+
+        table = event_store.read_table(user_id, msg_index=(3, 5), directory=tmp / "store")
+        assert table.column("msg_index").to_pylist() == [3, 4, 5]
+        assert table.schema.field("user_vec").type.list_size == DIM
+        mine = [rec for rec in before if rec["user_id"] == user_id]
+        assert _read(tmp, user_id=user_id) == mine
+        assert _read(tmp, columns=("user_id", "msg_index")) == [
+            {"user_id": rec["user_id"], "msg_index": rec["msg_index"]} for rec in before
+        ]
+
+        # Counters from the manifest, the active segment and no checkpoint
+        assert load_message_counts(tmp / "rec_log.jsonl", tmp / "segments", tmp / "store") == counts
+
+        # Nothing left to do: a second run is a no-op
+        assert compact(tmp / "segments", tmp / "store")["sources"] == 0
+        assert _read(tmp) == before
+
+
+def test_dead_writer_segment_is_compacted():
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        # A worker that writes 5 events and dies without closing its writer
+        script = (
+            "import os, numpy as np, event_log\n"
+            "from test_event_store import _record\n"
+            "rng = np.random.default_rng(0)\n"
+            "event_log.get_event_log().append([_record(rng, 'dora', i, '2026-10-19') for i in range(1, 6)])\n"
+            "os._exit(0)\n"
+        )
+        env = {**os.environ, "EVENT_LOG_DIR": str(tmp / "segments"), "EVENT_LOG_FLUSH_MS": "0"}
+        subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).parent, check=True, env=env)
+        live = EventLogWriter(tmp / "segments", flush_interval_s=0)  # this process: alive
+        live.append([_record(np.random.default_rng(1), "erin", 1, "2026-10-19")])
+
+        assert [meta.name.endswith(ACTIVE_SUFFIX) for _, meta, _ in list_segments(tmp / "segments")] == [True, True]
+        stats = compact(tmp / "segments", tmp / "store")
+        assert stats["orphans_sealed"] == 1 and stats["events"] == 5, stats
+        (stem, meta, _), = list_segments(tmp / "segments")
+        assert meta.name.endswith(ACTIVE_SUFFIX) and stem.split("-")[1] == str(os.getpid())
+        assert [rec["msg_index"] for rec in _read(tmp, user_id="dora")] == [1, 2, 3, 4, 5]
+        live.close()
+
+
+if __name__ == "__main__":
+    test_compaction_preserves_events_and_prunes_reads()
+    test_dead_writer_segment_is_compacted()
+    print("✅ Event store tests passed!")
@@ -0,0 +1,116 @@
+# RecommenderBackend/test_import_time.py
+
+"""
+Import-time budget for the backend's entry points.
+
+Each entry point is imported in a fresh interpreter under
+`python -X importtime`. The test fails if a heavy library (torch, the
+OpenAI SDK, faiss, pandas, matplotlib, ...) is imported eagerly where the
+code path doesn't need it, or if the total import time exceeds its budget.
+Budgets are ~3x the time measured on a laptop; scale them for slow CI
+machines with IMPORT_BUDGET_SCALE=2.
+
+    python test_import_time.py      (or: pytest test_import_time.py)
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+BUDGET_SCALE = float(os.getenv("IMPORT_BUDGET_SCALE", "1"))
+
+# Never needed at import time: loaded by the code paths that use them
+ALWAYS_LAZY = {
+    "torch", "sentence_transformers", "transformers", "onnxruntime",
+    "openai", "faiss", "matplotlib", "sklearn",
+}
+
+# module -> (budget in ms, extra libraries it must not import)
+ENTRY_POINTS = {
+    "app": (1000, {"pandas"}),
+    "recommender": (400, {"pandas"}),  # also what test_cli.py starts with
+    "user_store": (200, {"pandas"}),
+    "eval_embedding_alignment": (800, set()),
+    "eval_qualitative_gpt": (800, set()),
+    "visualizations": (50, {"pandas", "numpy"}),
+    "TasteEmbeddingGenerator": (200, {"pandas"}),
+}
+
+
+def _importtime(module: str):
+    """Return ({top-level package: cumulative us}, total us) for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE,
+        env={**os.environ, "PYTHONPATH": str(HERE.parent)},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+    loaded, total = {}, None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():  # header line
+            continue
+        name = name.rstrip()
+        if name.strip() == module:
+            total = int(cumulative)
+        top = name.strip().split(".")[0]
+        loaded[top] = max(loaded.get(top, 0), int(cumulative))
+    assert total is not None, f"{module} not found in -X importtime output"
+    return loaded, total
+
+
+def _check(module: str):
+    budget_ms, lazy = ENTRY_POINTS[module]
+    # Best of 3: the first run may include writing .pyc files
+    runs = [_importtime(module) for _ in range(3)]
+    loaded, _ = runs[0]
+    total_ms = min(total for _, total in runs) / 1000
+
+    eager = sorted((ALWAYS_LAZY | lazy) & loaded.keys())
+    assert not eager, f"`import {module}` eagerly imports {eager}"
+    assert total_ms <= budget_ms * BUDGET_SCALE, (
+        f"`import {module}` took {total_ms:.0f} ms (budget {budget_ms * BUDGET_SCALE:.0f} ms)"
+    )
+    return total_ms
+
+
+def test_app_import_time():
+    _check("app")
+
+
+def test_recommender_import_time():
+    _check("recommender")
+
+
+def test_user_store_import_time():
+    _check("user_store")
+
+
+def test_eval_embedding_alignment_import_time():
+    _check("eval_embedding_alignment")
+
+
+def test_eval_qualitative_gpt_import_time():
+    _check("eval_qualitative_gpt")
+
+
+def test_visualizations_import_time():
+    _check("visualizations")
+
+
+def test_taste_embedding_generator_import_time():
+    _check("TasteEmbeddingGenerator")
+
+
+if __name__ == "__main__":
+    for name in ENTRY_POINTS:
+        print(f"  import {name:<26} {_check(name):7.0f} ms  (budget {ENTRY_POINTS[name][0]} ms)")
+    print("✅ Import-time budgets respected!")
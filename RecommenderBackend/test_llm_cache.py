@@ -0,0 +1,70 @@
+# RecommenderBackend/test_llm_cache.py
+
+"""
+Which completions llm.chat / achat / astream_llm memoize (llm_cache.py).
+
+  - temperature 0 is cached by default; a sampled call (the 0.4 rerank) is
+    not, so each one reaches OpenAI
+  - use_cache=True opts a sampled call in, use_cache=False opts out
+  - temperature is part of the key
+
+A fake OpenAI call and a temporary cache file, so no API key:
+
+    python test_llm_cache.py   (or: pytest test_llm_cache.py)
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import llm
+from conftest import patched
+from llm_cache import CompletionCache
+
+
+class _FakeOpenAI:
+    """Stands in for llm._create / llm._acreate; every answer is new."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _response(self):
+        self.calls += 1
+        message = SimpleNamespace(content=f"answer #{self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    def create(self, messages, model, temperature, timeout):
+        return self._response()
+
+    async def acreate(self, messages, model, temperature, timeout, stream=False):
+        return self._response()
+
+
+def test_only_deterministic_or_opted_in_calls_are_cached():
+    with tempfile.TemporaryDirectory() as tmp:
+        api = _FakeOpenAI()
+        cache = CompletionCache(Path(tmp) / "llm_cache.sqlite", ttl_seconds=60, max_entries=100)
+        with patched(llm, _create=api.create, _acreate=api.acreate, _completion_cache=cache):
+            msgs = [{"role": "user", "content": "rate this movie"}]
+
+            assert llm.chat(msgs, temperature=0.0) == llm.chat(msgs, temperature=0.0) == "answer #1"
+            assert llm.chat(msgs, temperature=0.4) != llm.chat(msgs, temperature=0.4)
+            assert api.calls == 3
+
+            async def rerank():
+                return await llm.acall_llm("rerank", temperature=0.4)
+
+            assert asyncio.run(rerank()) != asyncio.run(rerank())
+            assert api.calls == 5
+
+            first = llm.call_llm("taste", temperature=0.1, use_cache=True)
+            assert llm.call_llm("taste", temperature=0.1, use_cache=True) == first
+            assert llm.call_llm("taste", temperature=0.2, use_cache=True) != first  # temperature is in the key
+            assert llm.chat(msgs, temperature=0.0, use_cache=False) != "answer #1"
+            assert api.calls == 8
+
+
+if __name__ == "__main__":
+    test_only_deterministic_or_opted_in_calls_are_cached()
+    print("✅ LLM cache tests passed!")
@@ -0,0 +1,131 @@
+# RecommenderBackend/test_message_counts.py
+
+"""
+Startup recovery of per-user msg_index counters from a large rec_log.jsonl
+(message_counts.py).
+
+  - a cold start (no checkpoint) recovers every user's highest msg_index
+  - a warm start reads only the lines appended after the checkpoint: the
+    already-checkpointed part of the log is overwritten with garbage and
+    the counters still come out right
+  - a truncated / replaced log invalidates the checkpoint (full rescan)
+
+Size with MESSAGE_COUNTS_TEST_MB (default 8; the README lists timings for both):
+
+    python test_message_counts.py   (or: pytest test_message_counts.py)
+    MESSAGE_COUNTS_TEST_MB=1024 python test_message_counts.py
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from message_counts import checkpoint_path, load_message_counts
+from recommender import _log_record
+
+LOG_MB = int(os.getenv("MESSAGE_COUNTS_TEST_MB", "8"))
+USERS = 500
+
+
+def _line(rng, user_id: str, msg_index: int, vec: np.ndarray) -> str:
+    rec = _log_record(
+        user_id=user_id,
+        msg_index=msg_index,
+        user_input=f"{user_id} message {msg_index}",
+        history_text=f"- {user_id} message {msg_index}",
+        user_vec=vec,
+        candidate_indices=np.arange(20),
+        candidate_scores=rng.random(20),
+        final_k=5,
+    )
+    rec["user_vec"] = rec["user_vec"].tolist()  # legacy rec_log.jsonl shape
+    return json.dumps(rec) + "\n"
+
+
+def _write_log(path: Path, target_bytes: int):
+    """Synthetic log of real-format lines (768-dim vectors); returns expected counts."""
+    rng = np.random.default_rng(0)
+    # One serialized line per vector, user_id / msg_index filled in per line
+    templates = [
+        _line(rng, "\0", 0, vec).replace('"\\u0000", "msg_index": 0,', "{}")
+        for vec in rng.standard_normal((8, 768)).astype("float32")
+    ]
+    counts = {}
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target_bytes:
+            lines = []
+            for uid in rng.integers(0, USERS, size=100):
+                user_id = f'user-{uid} "quoted" ✓'
+                counts[user_id] = counts.get(user_id, 0) + 1
+                fields = f'{json.dumps(user_id)}, "msg_index": {counts[user_id]},'
+                lines.append(templates[uid % 8].replace("{}", fields, 1))
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk.encode("utf-8"))
+    return counts
+
+
+def _append(path: Path, counts: dict, user_ids) -> None:
+    rng = np.random.default_rng(1)
+    with open(path, "a", encoding="utf-8") as f:
+        for user_id in user_ids:
+            counts[user_id] = counts.get(user_id, 0) + 1
+            f.write(_line(rng, user_id, counts[user_id], np.zeros(768, dtype="float32")))
+
+
+def test_checkpoint_replays_only_the_tail():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / "rec_log.jsonl"
+        expected = _write_log(log, LOG_MB * 1024 * 1024)
+        size = log.stat().st_size
+
+        t0 = time.perf_counter()
+        assert load_message_counts(log, tmp, tmp) == expected
+        cold = time.perf_counter() - t0
+        assert json.loads(checkpoint_path(log).read_text())["offset"] == size
+
+        # New lines after the checkpoint, plus a torn last line (write in progress)
+        _append(log, expected, ["user-1 \"quoted\" ✓", "brand-new", "brand-new"])
+        with open(log, "ab") as f:
+            f.write(b'{"timestamp": "x", "user_id": "torn", "msg_index": 99')
+
+        # Overwrite the checkpointed middle of the log: only the tail may be read
+        with open(log, "r+b") as f:
+            f.seek(size // 2)
+            f.write(b"\x00" * 1024 * 1024)
+
+        t0 = time.perf_counter()
+        assert load_message_counts(log, tmp, tmp) == expected
+        warm = time.perf_counter() - t0
+        print(f"[test_message_counts] {size / 1e6:.0f} MB log: cold {cold:.2f}s, warm {warm * 1000:.1f} ms")
+
+
+def test_replaced_log_invalidates_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / "rec_log.jsonl"
+        counts = {}
+        _append(log, counts, ["a", "b", "a", "a"])
+        assert load_message_counts(log, tmp, tmp) == {"a": 3, "b": 1}
+
+        # Rotated: a new, shorter log
+        log.unlink()
+        counts = {}
+        _append(log, counts, ["c"])
+        assert load_message_counts(log, tmp, tmp) == {"c": 1}
+
+        # Replaced by a longer log with different content
+        counts = {}
+        log.unlink()
+        _append(log, counts, ["d"] * 10)
+        assert load_message_counts(log, tmp, tmp) == {"d": 10}
+
+
+if __name__ == "__main__":
+    test_checkpoint_replays_only_the_tail()
+    test_replaced_log_invalidates_checkpoint()
+    print("✅ Message-counter checkpoint tests passed!")
@@ -0,0 +1,106 @@
+# RecommenderBackend/test_onnx_parity.py
+
+"""
+Parity of the int8 ONNX query encoder with the PyTorch one.
+
+Encodes the same queries with SentenceTransformerBackend and
+OnnxEmbeddingBackend and checks that the vectors (and the retrieval they
+drive) agree. Needs the BGE weights plus torch, transformers, onnx and
+onnxruntime; skipped otherwise.
+
+    python test_onnx_parity.py      (or: pytest test_onnx_parity.py)
+"""
+
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from TasteEmbeddingGenerator.embeddings_backend import (
+    OnnxEmbeddingBackend,
+    SentenceTransformerBackend,
+)
+
+MODEL_NAME = "BAAI/bge-base-en-v1.5"
+MIN_COSINE = 0.99       # per query
+MIN_MEAN_COSINE = 0.995
+
+QUERIES = [
+    "I like slow atmospheric sci-fi",
+    "feel-good comedy for a rainy evening",
+    "sad movies with great acting",
+    "mind-bending thrillers like Inception",
+    "animated films the whole family can enjoy",
+    "gritty crime dramas set in the 70s",
+    "romantic movies that are not too cheesy",
+    "epic fantasy adventures with big battles",
+    "something like Amélie but darker",
+    "a",
+    "I loved Heat, Collateral and Thief; more moody LA crime please, nothing with "
+    "superheroes, ideally from the 80s or 90s, long takes, synth scores " * 8,
+]
+
+_backends = {}
+
+
+def _require_deps():
+    missing = [
+        m for m in ("torch", "transformers", "onnx", "onnxruntime", "sentence_transformers")
+        if importlib.util.find_spec(m) is None
+    ]
+    if missing:
+        raise unittest.SkipTest(f"missing: {', '.join(missing)}")
+
+
+def _encode(texts):
+    _require_deps()
+    if not _backends:
+        _backends["torch"] = SentenceTransformerBackend(
+            model_name=MODEL_NAME, device="cpu", show_progress_bar=False
+        )
+        _backends["onnx"] = OnnxEmbeddingBackend(model_name=MODEL_NAME)
+    ref = np.asarray(_backends["torch"].embed_texts(texts), dtype="float32")
+    got = np.asarray(_backends["onnx"].embed_texts(texts), dtype="float32")
+    return ref, got
+
+
+def test_vectors_match_pytorch():
+    ref, got = _encode(QUERIES)
+    assert ref.shape == got.shape, (ref.shape, got.shape)
+    assert np.allclose(np.linalg.norm(got, axis=1), 1.0, atol=1e-4)
+
+    cos = (ref * got).sum(axis=1)
+    assert cos.min() >= MIN_COSINE, cos
+    assert cos.mean() >= MIN_MEAN_COSINE, cos.mean()
+
+
+def test_nearest_neighbours_match_pytorch():
+    # Same top-1 among the queries themselves, i.e. retrieval is unchanged
+    ref, got = _encode(QUERIES)
+    ref_sim, got_sim = ref @ ref.T, got @ got.T
+    np.fill_diagonal(ref_sim, -1.0)
+    np.fill_diagonal(got_sim, -1.0)
+    assert (ref_sim.argmax(axis=1) == got_sim.argmax(axis=1)).all()
+
+
+def test_batching_does_not_change_vectors():
+    _, batched = _encode(QUERIES)
+    single = np.asarray(
+        [_backends["onnx"].embed_texts([q])[0] for q in QUERIES], dtype="float32"
+    )
+    assert np.allclose(batched, single, atol=1e-4)
+
+
+if __name__ == "__main__":
+    try:
+        test_vectors_match_pytorch()
+        test_nearest_neighbours_match_pytorch()
+        test_batching_does_not_change_vectors()
+    except unittest.SkipTest as e:
+        print(f"⏭️  ONNX parity tests skipped ({e})")
+    else:
+        print("✅ ONNX parity tests passed!")
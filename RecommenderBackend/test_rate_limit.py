@@ -0,0 +1,121 @@
+# RecommenderBackend/test_rate_limit.py
+
+"""
+The LLM concurrency cap (rate_limit.py, llm.py).
+
+  - sync calls and async calls on any event loop share one slot count
+  - a streamed completion keeps its slot until the stream is read or
+    abandoned, not just until it opens
+
+A fake OpenAI client, so no API key:
+
+    python test_rate_limit.py   (or: pytest test_rate_limit.py)
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import llm
+from conftest import patched
+from rate_limit import LLMLimiter, ThrottleTimeout
+from resilience import Deadline
+
+
+def _limiter(max_concurrency: int) -> LLMLimiter:
+    return LLMLimiter(rpm=1e6, tpm=1e9, max_concurrency=max_concurrency)
+
+
+async def _try_aslot(limiter: LLMLimiter, timeout_s: float = 0.05) -> bool:
+    try:
+        async with limiter.aslot(1, Deadline(timeout_s)):
+            return True
+    except ThrottleTimeout:
+        return False
+
+
+def test_sync_and_async_callers_share_one_cap():
+    limiter = _limiter(2)
+    with limiter.slot(1):
+        # One slot left: two event loops can't both get it
+        async def hold_then_probe(entered: threading.Event, leave: threading.Event):
+            async with limiter.aslot(1):
+                entered.set()
+                await asyncio.to_thread(leave.wait, 5)
+
+        entered, leave = threading.Event(), threading.Event()
+        other_loop = threading.Thread(target=asyncio.run, args=(hold_then_probe(entered, leave),))
+        other_loop.start()
+        assert entered.wait(5)
+        assert limiter.slots.in_use == 2
+
+        assert not asyncio.run(_try_aslot(limiter))
+        assert not limiter.slots.acquire(timeout=0.05)
+
+        # A waiter on this loop is woken by a release from another loop
+        async def wait_for_release():
+            threading.Timer(0.05, leave.set).start()
+            return await _try_aslot(limiter, timeout_s=5)
+
+        assert asyncio.run(wait_for_release())
+        other_loop.join(5)
+    assert limiter.slots.in_use == 0
+
+
+class _FakeStream:
+    """An OpenAI chunk stream that waits for `more` before its last delta."""
+
+    def __init__(self):
+        self.more = asyncio.Event()
+
+    @staticmethod
+    def _chunk(text):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    async def __aiter__(self):
+        yield self._chunk("Try ")
+        await self.more.wait()
+        yield self._chunk("Movie 1.")
+
+
+class _FakeAsyncClient:
+    def __init__(self, stream):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.stream = stream
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def _create(self, **kwargs):
+        return self.stream
+
+
+def test_stream_holds_its_slot_until_read():
+    limiter = _limiter(1)
+
+    async def scenario():
+        stream = _FakeStream()
+        with patched(llm, limiter=limiter, get_async_client=lambda: _FakeAsyncClient(stream)):
+            deltas = llm.astream_llm("rerank", temperature=0.4, use_cache=False)
+            assert await deltas.__anext__() == "Try "
+            assert limiter.slots.in_use == 1
+            assert not await _try_aslot(limiter)
+
+            stream.more.set()
+            assert [d async for d in deltas] == ["Movie 1."]
+            assert limiter.slots.in_use == 0
+
+            # A reader that stops early (client disconnect) gives the slot back
+            stream = _FakeStream()
+            deltas = llm.astream_llm("rerank", temperature=0.4, use_cache=False)
+            assert await deltas.__anext__() == "Try "
+            await deltas.aclose()
+            assert limiter.slots.in_use == 0
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_sync_and_async_callers_share_one_cap()
+    test_stream_holds_its_slot_until_read()
+    print("✅ Rate limiter tests passed!")
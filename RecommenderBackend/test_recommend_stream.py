@@ -0,0 +1,72 @@
+# RecommenderBackend/test_recommend_stream.py
+
+"""
+RecommenderService.arecommend_stream (the /recommend/stream SSE path).
+
+  - events arrive as candidates, then tokens, then done
+  - a client that disconnects while its text is being encoded does not
+    take the micro-batcher down for everyone else
+
+A fake encoder and a fake streaming LLM, so no weights or API key:
+
+    python test_recommend_stream.py   (or: pytest test_recommend_stream.py)
+"""
+
+import asyncio
+from contextlib import contextmanager
+
+import recommender
+from conftest import GatedEncoder, make_service, patched
+
+
+async def _fake_stream(prompt, temperature=0.4, timeout=None):
+    for delta in ("Try ", "Movie 1."):
+        await asyncio.sleep(0)
+        yield delta
+
+
+@contextmanager
+def _service():
+    encoder = GatedEncoder()
+    svc = make_service(encoder, max_wait_ms=2.0)
+    try:
+        with patched(recommender, astream_llm=_fake_stream, _persist_event=lambda **kw: None):
+            yield svc, encoder
+    finally:
+        encoder.gate.set()
+        svc.close()
+
+
+async def _collect(svc, text, user_id):
+    return [event async for event in svc.arecommend_stream(text, user_id)]
+
+
+def test_disconnect_during_embed_keeps_the_stream_working():
+    async def scenario(svc, encoder):
+        # Occupy the worker so the next text waits in the batcher's queue.
+        warm = asyncio.wrap_future(svc.batcher.submit("warm up"))
+        await asyncio.to_thread(encoder.started.wait, 5)
+
+        client = asyncio.ensure_future(_collect(svc, "I like sad movies", "emily"))
+        await asyncio.sleep(0.05)
+        client.cancel()  # what Starlette does when the SSE client goes away
+        try:
+            await client
+        except asyncio.CancelledError:
+            pass
+        encoder.gate.set()
+        await warm
+
+        events = await asyncio.wait_for(_collect(svc, "I like sad movies", "emily"), timeout=5)
+        assert [name for name, _ in events] == ["candidates", "token", "token", "done"]
+        assert events[0][1]["candidates"]
+        assert "".join(p["text"] for name, p in events if name == "token") == "Try Movie 1."
+        assert events[-1][1] == {"degraded": False}
+
+    with _service() as (svc, encoder):
+        asyncio.run(scenario(svc, encoder))
+
+
+if __name__ == "__main__":
+    test_disconnect_during_embed_keeps_the_stream_working()
+    print("✅ Streaming tests passed!")
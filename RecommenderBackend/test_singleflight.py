@@ -0,0 +1,148 @@
+# RecommenderBackend/test_singleflight.py
+
+"""
+Concurrency test for request coalescing in RecommenderService.
+
+Runs the real async pipeline (micro-batcher, fusion, FAISS) on a small
+random catalog with a fake encoder and a fake LLM, so it needs neither
+the BGE weights nor an OpenAI key:
+
+    python test_singleflight.py      (or: pytest test_singleflight.py)
+"""
+
+import asyncio
+from contextlib import contextmanager
+
+import numpy as np
+
+import recommender
+from conftest import DIM, FakeEncoder, make_service, patched
+from recommender import USER_FUSE_ALPHA, _normalize
+from user_store import UserRecord
+
+
+class _FakeLLM:
+    def __init__(self, latency_s: float = 0.2):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    async def __call__(self, prompt, temperature=0.2, timeout=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        return f"answer #{self.calls}"
+
+
+@contextmanager
+def _service(llm: _FakeLLM):
+    """Yields (svc, encoder, persisted events) with `llm` as the LLM."""
+    encoder = FakeEncoder()
+    svc = make_service(encoder, max_wait_ms=2.0)
+    persisted = []
+    try:
+        with patched(recommender, acall_llm=llm, _persist_event=lambda **kw: persisted.append(kw)):
+            yield svc, encoder, persisted
+    finally:
+        svc.close()
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_duplicate_burst_makes_one_llm_call():
+    llm = _FakeLLM()
+    prev = _normalize(np.ones(DIM, dtype="float32"))
+
+    async def burst():
+        first = [svc.arecommend_response("I like sad movies", "emily") for _ in range(5)]
+        tasks = [asyncio.ensure_future(c) for c in first]
+        # Duplicates that arrive after the leader's state update (while
+        # the LLM call is in flight) must join the same flight too.
+        await asyncio.sleep(0.1)
+        late = [svc.arecommend_response("  i like SAD movies ", "emily") for _ in range(5)]
+        return await asyncio.gather(*tasks, *late)
+
+    with _service(llm) as (svc, encoder, persisted):
+        svc.user_vectors["emily"] = prev.copy()
+        results = _run(burst())
+
+    assert llm.calls == 1, llm.calls
+    assert encoder.calls == 1, encoder.calls
+    assert all(r == results[0] for r in results)
+
+    # EMA update applied exactly once
+    new_vec = _normalize(encoder.embed_texts(["I like sad movies"])[0])
+    expected = _normalize(USER_FUSE_ALPHA * prev + (1.0 - USER_FUSE_ALPHA) * new_vec)
+    assert np.allclose(svc.user_vectors["emily"], expected, atol=1e-6)
+    assert svc.message_counts["emily"] == 1
+    assert svc.state_versions["emily"] == 1
+    assert svc.preference_history["emily"] == ["I like sad movies"]
+    assert len(persisted) == 1
+    assert svc.singleflight.stats() == {"in_flight": 0, "executions": 1, "coalesced": 9}
+
+
+def test_distinct_requests_are_not_coalesced():
+    llm = _FakeLLM(latency_s=0.05)
+
+    async def burst():
+        return await asyncio.gather(
+            svc.arecommend_response("sad movies", "emily"),
+            svc.arecommend_response("sad movies", "bob"),
+            svc.arecommend_response("heist movies", "emily"),
+            svc.arecommend_response("sad movies", None),
+        )
+
+    with _service(llm) as (svc, _, _):
+        _run(burst())
+
+    assert llm.calls == 4, llm.calls
+    assert svc.message_counts == {"emily": 2, "bob": 1}
+
+
+def test_repeat_after_completion_runs_again():
+    llm = _FakeLLM(latency_s=0.01)
+
+    async def twice():
+        await svc.arecommend_response("sad movies", "emily")
+        await svc.arecommend_response("sad movies", "emily")
+
+    with _service(llm) as (svc, _, _):
+        _run(twice())
+
+    assert llm.calls == 2, llm.calls
+    assert svc.state_versions["emily"] == 2
+
+
+def test_duplicate_after_interleaved_update_joins_the_flight():
+    # Another message of the user is being applied (its stripe held) when a
+    # request arrives; the request's duplicate comes in after that update
+    # has committed but before the request's own one
+    llm = _FakeLLM(latency_s=0.1)
+
+    async def interleaved():
+        stripe = svc.user_locks._locks[svc.user_locks._index("emily")]
+        stripe.acquire()
+        first = asyncio.ensure_future(svc.arecommend_response("sad movies", "emily"))
+        await asyncio.sleep(0.05)
+        other = UserRecord(_normalize(np.ones(DIM, dtype="float32")), 1, ("heist movies",))
+        assert not svc.user_cache.compare_and_set_many({"emily": (other, 0)})
+        dup = asyncio.ensure_future(svc.arecommend_response("sad movies", "emily"))
+        await asyncio.sleep(0.05)
+        stripe.release()
+        return await asyncio.gather(first, dup)
+
+    with _service(llm) as (svc, _, persisted):
+        results = _run(interleaved())
+
+    assert llm.calls == 1, llm.calls
+    assert results[0] == results[1]
+    assert svc.state_versions["emily"] == 2
+    assert [kw["msg_index"] for kw in persisted] == [2]
+
+
+if __name__ == "__main__":
+    test_duplicate_burst_makes_one_llm_call()
+    test_distinct_requests_are_not_coalesced()
+    test_repeat_after_completion_runs_again()
+    test_duplicate_after_interleaved_update_joins_the_flight()
+    print("✅ Single-flight coalescing tests passed!")
@@ -0,0 +1,210 @@
+# RecommenderBackend/test_user_state_concurrency.py
+
+"""
+Stress test for per-user state updates (no lost EMA updates, no duplicate
+msg_index) under concurrency.
+
+64 requests per user hit the blocking recommend() from a thread pool (what
+FastAPI's threadpool does), through a write-back user cache smaller than
+the number of users, and from 4 processes x 16 threads sharing one SQLite
+user store. Afterwards, for every user:
+
+  - msg_index values are exactly 1..64
+  - replaying the logged inputs in msg_index order through the EMA fusion
+    reproduces every logged vector and the stored one
+  - the stored history is the last USER_HISTORY_LEN inputs in that order
+
+The history and message counter also survive a restart, on the SQLite and
+on the WAL backend (before and after WAL compaction).
+
+Fake encoder / LLM and a small random catalog, so no weights or API key:
+
+    python test_user_state_concurrency.py   (or: pytest test_user_state_concurrency.py)
+"""
+
+import asyncio
+import multiprocessing as mp
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+import recommender
+from config import USER_HISTORY_LEN
+from conftest import FakeEncoder, fake_vector, make_service, patched
+from recommender import USER_FUSE_ALPHA, _normalize
+from user_store import SQLiteUserStore, WalUserStore, _encode_record
+
+USERS = ["emily", "bob", "carol"]
+PER_USER = 64
+
+
+async def _fake_acall_llm(prompt, temperature=0.2, timeout=None):
+    return "ok"
+
+
+def _open_store(path: Path):
+    if path.suffix == ".parquet":
+        return WalUserStore(path)
+    return SQLiteUserStore(path, import_legacy=False)
+
+
+@contextmanager
+def _service(store_path: Path, cache_size=None, flush_ms=None):
+    """A service on a SQLite (or, for *.parquet, WAL) user store, with a fake LLM; yields (svc, logged events)."""
+    svc = make_service(FakeEncoder(latency_s=0.001))  # latency widens the race window
+    cache = {} if cache_size is None else {"capacity": cache_size, "flush_interval_s": flush_ms / 1000}
+    svc.use_user_store(_open_store(store_path), **cache)
+    svc.user_cache.start()
+
+    logged = []
+
+    def persist(**kw):
+        logged.append((kw["user_id"], kw["msg_index"], kw["user_input"], np.array(kw["user_vec"])))
+
+    fake_llm = lambda prompt, temperature=0.2, timeout=None: "ok"
+    try:
+        with patched(recommender, call_llm=fake_llm, acall_llm=_fake_acall_llm, _persist_event=persist):
+            yield svc, logged
+    finally:
+        svc.close()
+
+
+def _hammer(store_path: str, inputs, cache_size=None, flush_ms=None):
+    """Run recommend() for every (user_id, text) from 16 threads; return the log."""
+    with _service(Path(store_path), cache_size, flush_ms) as (svc, logged):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(lambda item: svc.recommend(item[1], item[0]), inputs))
+    return logged
+
+
+def _inputs(worker: int = 0, per_user: int = PER_USER):
+    return [(u, f"{u} likes movie mood #{worker}-{k}") for k in range(per_user) for u in USERS]
+
+
+def _check(logged, store_path: Path):
+    store = SQLiteUserStore(store_path, import_legacy=False)
+    for user in USERS:
+        events = sorted((e for e in logged if e[0] == user), key=lambda e: e[1])
+        assert [e[1] for e in events] == list(range(1, PER_USER + 1)), [e[1] for e in events]
+
+        vec = None
+        for _, msg_index, text, logged_vec in events:
+            new_vec = _normalize(fake_vector(text))
+            vec = new_vec if vec is None else _normalize(
+                USER_FUSE_ALPHA * vec + (1.0 - USER_FUSE_ALPHA) * new_vec
+            )
+            assert np.allclose(vec, logged_vec, atol=1e-5), (user, msg_index)
+
+        rec = store.get_many_versioned([user])[user]
+        assert rec.version == PER_USER, rec.version
+        assert np.allclose(rec.vec, vec, atol=1e-5), user
+        assert rec.history == tuple(e[2] for e in events[-USER_HISTORY_LEN:]), rec.history
+    store.close()
+
+
+def test_concurrent_threads_lose_no_updates():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "users.sqlite"
+        logged = _hammer(str(path), _inputs())
+        _check(logged, path)
+
+
+def test_tiny_write_back_cache_loses_no_updates():
+    # Capacity below the number of users: entries are evicted (and written
+    # back) while other threads are using them
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "users.sqlite"
+        logged = _hammer(str(path), _inputs(), cache_size=2, flush_ms=5)
+        _check(logged, path)
+
+
+def _restart_sees_history(path: Path) -> None:
+    with _service(path) as (svc, _):
+        for k in range(12):
+            svc.recommend(f"message {k}", "emily")
+
+    # A fresh service (restart, or another worker) builds the prompt
+    # from the stored history
+    seen = []
+    with _service(path) as (svc, _):
+        with patched(recommender, _persist_event=lambda **kw: seen.append((kw["msg_index"], kw["history_text"]))):
+            svc.recommend("message 12", "emily")
+    expected = [f"- message {k}" for k in range(13 - USER_HISTORY_LEN, 13)]
+    assert seen == [(13, "\n".join(expected))], seen
+
+
+def test_history_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        _restart_sees_history(Path(tmp) / "users.sqlite")
+
+
+def test_wal_store_persists_versions_and_history():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "users.parquet"
+        _restart_sees_history(path)  # from the WAL
+
+        store = WalUserStore(path)
+        before = store.get_many_versioned(["emily"])["emily"]
+        assert store.compact()
+        store.close()
+        store = WalUserStore(path)
+        after = store.get_many_versioned(["emily"])["emily"]  # from the snapshot
+        store.close()
+        assert after.version == before.version == 13 and after.history == before.history
+        assert np.allclose(after.vec, before.vec)
+
+        # A record written before versioning (no meta) only replaces the vector
+        with open(path.with_suffix(".wal"), "ab") as f:
+            f.write(_encode_record("emily", np.ones(len(before.vec), dtype="float32")))
+        store = WalUserStore(path)
+        rec = store.get_many_versioned(["emily"])["emily"]
+        store.close()
+        assert rec.version == 13 and rec.history == before.history and np.allclose(rec.vec, 1.0)
+
+
+def test_contended_user_does_not_block_event_loop():
+    with tempfile.TemporaryDirectory() as tmp:
+        async def main():
+            task = asyncio.create_task(svc.arecommend("hello", "emily"))
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.05)
+            ticked = time.perf_counter() - t0
+            assert not task.done()
+            assert await task == "ok"
+            return ticked
+
+        with _service(Path(tmp) / "users.sqlite") as (svc, _):
+            # Another request of this user holds its stripe for 1 s
+            stripe = svc.user_locks._locks[svc.user_locks._index("emily")]
+            stripe.acquire()
+            threading.Timer(1.0, stripe.release).start()
+            ticked = asyncio.run(main())
+        assert ticked < 0.5, f"event loop blocked for {ticked:.2f}s"
+
+
+def test_concurrent_processes_lose_no_updates():
+    workers = 4
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "users.sqlite"
+        SQLiteUserStore(path, import_legacy=False).close()
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(workers) as pool:
+            logs = pool.starmap(
+                _hammer, [(str(path), _inputs(w, PER_USER // workers)) for w in range(workers)]
+            )
+        _check([e for log in logs for e in log], path)
+
+
+if __name__ == "__main__":
+    test_concurrent_threads_lose_no_updates()
+    test_tiny_write_back_cache_loses_no_updates()
+    test_history_survives_restart()
+    test_wal_store_persists_versions_and_history()
+    test_contended_user_does_not_block_event_loop()
+    test_concurrent_processes_lose_no_updates()
+    print("✅ User-state concurrency tests passed!")
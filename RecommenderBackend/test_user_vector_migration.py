@@ -0,0 +1,112 @@
+# RecommenderBackend/test_user_vector_migration.py
+
+"""
+Re-embedding migration of stored user vectors (migrate_user_vectors.py).
+
+Users talk to a service whose encoder is "model A". With the store
+switched to "model B", their vectors read as missing; after the migration
+each one equals the vector the service would have built with model B from
+the same messages, also when the job is interrupted and re-run. A user
+without a stored history is marked migrated without a vector.
+
+Fake encoders and a small random catalog, so no weights or API key:
+
+    python test_user_vector_migration.py   (or: pytest test_user_vector_migration.py)
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import recommender
+from conftest import FakeEncoder, make_service, patched
+from migrate_user_vectors import migrate
+from user_store import SQLiteUserStore
+
+# Fewer messages than USER_HISTORY_LEN, so the stored history is complete
+MESSAGES = {f"user-{i}": [f"user-{i} likes mood #{k}" for k in range(1 + i % 6)] for i in range(8)}
+
+
+def _talk(path: Path, model: str) -> None:
+    """Send every user's messages, in order, to a service running `model`."""
+    svc = make_service(FakeEncoder(model))
+    svc.use_user_store(SQLiteUserStore(path, import_legacy=False, model=model))
+    fake_llm = lambda prompt, temperature=0.2, timeout=None: "ok"
+    try:
+        with patched(recommender, call_llm=fake_llm, _persist_event=lambda **kw: None):
+            for user, texts in MESSAGES.items():
+                for text in texts:
+                    svc.recommend(text, user)
+    finally:
+        svc.close()
+
+
+def _vectors(path: Path, model: str) -> dict:
+    store = SQLiteUserStore(path, import_legacy=False, model=model)
+    try:
+        return store.get_many_versioned(MESSAGES)
+    finally:
+        store.close()
+
+
+def test_migration_matches_service_and_resumes():
+    with tempfile.TemporaryDirectory() as tmp:
+        expected_path, path = Path(tmp) / "expected.sqlite", Path(tmp) / "users.sqlite"
+        _talk(expected_path, "model-b")
+        _talk(path, "model-a")
+        expected = _vectors(expected_path, "model-b")
+
+        store = SQLiteUserStore(path, import_legacy=False, model="model-b")
+        assert store.stale_count() == len(MESSAGES)
+        assert all(rec.vec is None for rec in store.get_many_versioned(MESSAGES).values())
+
+        # Interrupted after the first chunk of 3 users ...
+        encoder, calls = FakeEncoder("model-b"), []
+
+        def flaky(texts):
+            calls.append(len(texts))
+            if len(calls) > 1:
+                raise RuntimeError("killed")
+            return encoder.embed_texts(texts)
+
+        try:
+            migrate(store, flaky, chunk_size=3)
+        except RuntimeError:
+            pass
+        assert store.stale_count() == len(MESSAGES) - 3
+
+        # ... and re-run: only the remaining users are encoded
+        stats = migrate(store, encoder.embed_texts, chunk_size=3)
+        assert stats == {"rebuilt": len(MESSAGES) - 3, "no_history": 0, "conflicts": 0}, stats
+        assert store.stale_count() == 0
+        store.close()
+
+        for user, rec in _vectors(path, "model-b").items():
+            assert np.allclose(rec.vec, expected[user].vec, atol=1e-5), user
+            assert rec.version == len(MESSAGES[user])
+            assert rec.history == tuple(MESSAGES[user])
+
+
+def test_user_without_history_is_marked_migrated():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "users.sqlite"
+        _talk(path, "model-a")
+        store = SQLiteUserStore(path, import_legacy=False, model="model-a")
+        store.upsert_many({"legacy-user": np.ones(16, dtype="float32")})  # no version, no history
+        store.close()
+
+        store = SQLiteUserStore(path, import_legacy=False, model="model-b")
+        stats = migrate(store, FakeEncoder("model-b").embed_texts, chunk_size=3)
+        assert stats == {"rebuilt": len(MESSAGES), "no_history": 1, "conflicts": 0}, stats
+        assert store.stale_count() == 0
+        assert store.get_many_versioned(["legacy-user"])["legacy-user"] == (None, 0, ())
+        assert "legacy-user" not in store.load_all()
+        assert migrate(store, FakeEncoder("model-b").embed_texts)["no_history"] == 0
+        store.close()
+
+
+if __name__ == "__main__":
+    test_migration_matches_service_and_resumes()
+    test_user_without_history_is_marked_migrated()
+    print("✅ User-vector migration tests passed!")
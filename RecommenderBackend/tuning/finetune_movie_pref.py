@@ -7,20 +7,24 @@ Assumes movie_pref_train.jsonl and movie_pref_val.jsonl were
 created by build_finetune_data.py and live under artifacts/.
 """
 
+import sys
 from pathlib import Path
 
-from openai import OpenAI
-
 ROOT = Path(__file__).resolve().parent
+sys.path.append(str(ROOT.parent))
+
+from llm import get_client  # noqa: E402  (shared client / HTTP pool)
+
 ARTIFACTS = ROOT / "artifacts"
 
 TRAIN_FILE = ARTIFACTS / "movie_pref_train.jsonl"
 VAL_FILE = ARTIFACTS / "movie_pref_val.jsonl"
 
-client = OpenAI()  # reads OPENAI_API_KEY from env
-
 
 def main():
+    # File uploads can take longer than the default 60 s request timeout
+    client = get_client().with_options(timeout=600.0)
+
     # 1. Upload training file
     train = client.files.create(
         file=open(TRAIN_FILE, "rb"),
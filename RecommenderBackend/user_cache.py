@@ -0,0 +1,284 @@
+# RecommenderBackend/user_cache.py
+
+"""
+Bounded in-process cache of runtime user state in front of a user store.
+
+An entry holds one user's vector, version (the store's per-user counter,
+which is also the user's message count, see user_store.py) and recent
+preference history. Entries are faulted in from the store on first access
+and the least recently used ones are dropped beyond `capacity`, so memory
+no longer grows with every session id that ever talked to the server.
+
+Writes (compare_and_set_many) are checked against the cached version and
+then either
+
+  - written through to the store right away (flush_interval_s == 0, the
+    default). Required with several workers: the store's compare-and-set
+    is what notices that another worker updated the user, after which the
+    stale entry is dropped and the caller re-reads; or
+  - marked dirty and written back in batches, every flush_interval_s by a
+    background thread and when the entry is evicted (single worker: one
+    store write per active user per interval instead of one per message).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import USER_CACHE_FLUSH_MS, USER_CACHE_SIZE
+from user_store import BaseUserStore, UserRecord
+
+
+@dataclass
+class _Entry:
+    vec: Optional[np.ndarray]
+    version: int
+    synced_version: int  # version the store holds for this user
+    history: Tuple[str, ...]
+    dirty: bool = False
+
+    def record(self) -> UserRecord:
+        return UserRecord(self.vec, self.version, self.history)
+
+
+class CachedUserStore(BaseUserStore):
+    def __init__(
+        self,
+        inner: BaseUserStore,
+        capacity: int = USER_CACHE_SIZE,
+        flush_interval_s: float = USER_CACHE_FLUSH_MS / 1000,
+    ):
+        super().__init__()
+        self.inner = inner
+        self.capacity = max(1, capacity)
+        self.flush_interval_s = flush_interval_s
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Evicted dirty entries until their write-back lands, so a fault-in
+        # in between doesn't read the older stored version
+        self._evicting: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()  # the entries
+        self._flush_lock = threading.Lock()  # one write-back at a time
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.written_back = 0
+        self.conflicts = 0
+
+    @property
+    def write_back(self) -> bool:
+        return self.flush_interval_s > 0
+
+    # ---------- entries ----------
+
+    def _entries_for(self, user_ids: Iterable[str]) -> Dict[str, _Entry]:
+        """Cached entries of `user_ids`, faulting the missing ones in with one store read."""
+        out: Dict[str, _Entry] = {}
+        missing: List[str] = []
+        with self._lock:
+            for uid in dict.fromkeys(user_ids):
+                entry = self._entries.get(uid)
+                if entry is None and uid in self._evicting:
+                    entry = self._entries[uid] = self._evicting.pop(uid)
+                if entry is None:
+                    missing.append(uid)
+                else:
+                    self._entries.move_to_end(uid)
+                    out[uid] = entry
+            self.hits += len(out)
+            self.misses += len(missing)
+        if not missing:
+            return out
+
+        loaded = self.inner.get_many_versioned(missing)
+        with self._lock:
+            for uid in missing:
+                entry = self._entries.get(uid)  # faulted in meanwhile by another thread
+                if entry is None:
+                    rec = loaded[uid]
+                    entry = _Entry(rec.vec, rec.version, rec.version, rec.history)
+                    self._entries[uid] = entry
+                out[uid] = entry
+            victims = self._evict_locked()
+        self._write_back(victims)
+        return out
+
+    def _evict_locked(self) -> List[Tuple[str, _Entry]]:
+        victims = []
+        while len(self._entries) > self.capacity:
+            uid, entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            if entry.dirty:
+                self._evicting[uid] = entry
+                victims.append((uid, entry))
+        return victims
+
+    def _write_back(self, entries: List[Tuple[str, _Entry]]) -> None:
+        """Compare-and-set dirty entries into the store (one batch)."""
+        if not entries:
+            return
+        with self._flush_lock:
+            with self._lock:
+                updates = {uid: (e.record(), e.synced_version) for uid, e in entries if e.dirty}
+            if not updates:
+                return
+            failed = set(self.inner.compare_and_set_many(updates))
+            with self._lock:
+                for uid, entry in entries:
+                    if self._evicting.get(uid) is entry:
+                        del self._evicting[uid]
+                    if uid not in updates:
+                        continue
+                    version = updates[uid][0].version
+                    if uid in failed:
+                        # Another worker wrote this user: its update wins, ours is lost
+                        self.conflicts += 1
+                        entry.dirty = False
+                        if self._entries.get(uid) is entry:
+                            del self._entries[uid]
+                        continue
+                    entry.synced_version = version
+                    entry.dirty = entry.version != version
+                self.written_back += len(updates) - len(failed)
+        if failed:
+            print(f"[user_cache] Warning: {len(failed)} write-backs lost to updates from another worker")
+
+    def flush(self) -> None:
+        """Write back every dirty entry."""
+        with self._lock:
+            dirty = [(uid, e) for uid, e in self._entries.items() if e.dirty]
+        self._write_back(dirty)
+
+    def peek_version(self, user_id: str) -> int:
+        """Cached version of `user_id` (0 if not cached); never touches the store."""
+        with self._lock:
+            entry = self._entries.get(user_id) or self._evicting.get(user_id)
+            return entry.version if entry is not None else 0
+
+    def cached(self) -> Dict[str, Tuple[int, List[str]]]:
+        """user_id -> (version, history) of the cached users with any state."""
+        with self._lock:
+            return {
+                uid: (e.version, list(e.history))
+                for uid, e in self._entries.items()
+                if e.version or e.history
+            }
+
+    # ---------- BaseUserStore ----------
+
+    def get_many(self, user_ids):
+        return {uid: e.vec for uid, e in self._entries_for(user_ids).items() if e.vec is not None}
+
+    def get_many_versioned(self, user_ids):
+        ids = list(user_ids)
+        entries = self._entries_for(ids)
+        with self._lock:
+            return {uid: entries[uid].record() for uid in ids}
+
+    def compare_and_set_many(self, updates):
+        entries = self._entries_for(updates)
+        with self._lock:
+            failed = [uid for uid, (_, expected) in updates.items() if entries[uid].version != expected]
+            if self.write_back:
+                for uid, (rec, _) in updates.items():
+                    if uid in failed:
+                        continue
+                    entry = entries[uid]
+                    entry.vec, entry.version, entry.history, entry.dirty = rec.vec, rec.version, rec.history, True
+                    if uid not in self._entries:  # evicted while the caller held it
+                        self._entries[uid] = entry
+                return failed
+
+        ok = {uid: upd for uid, upd in updates.items() if uid not in failed}
+        stale = set(self.inner.compare_and_set_many(ok))
+        with self._lock:
+            for uid, (rec, _) in ok.items():
+                entry = entries[uid]
+                if uid in stale:
+                    # Another worker got there first; re-read on the next access
+                    if self._entries.get(uid) is entry:
+                        del self._entries[uid]
+                else:
+                    entry.vec, entry.version, entry.history = rec.vec, rec.version, rec.history
+                    entry.synced_version = rec.version
+        return failed + sorted(stale)
+
+    def upsert_many(self, updates):
+        self.inner.upsert_many(updates)
+        with self._lock:
+            for uid, vec in updates.items():
+                entry = self._entries.get(uid)
+                if entry is not None:
+                    entry.vec = vec
+
+    def load_all(self):
+        self.flush()
+        return self.inner.load_all()
+
+    def write_all(self, state):
+        with self._lock:
+            self._entries.clear()
+        self.inner.write_all(state)
+
+    def count(self):
+        self.flush()
+        return self.inner.count()
+
+    def user_ids(self):
+        self.flush()
+        return self.inner.user_ids()
+
+    # ---------- lifecycle / stats ----------
+
+    def start(self) -> "CachedUserStore":
+        """Start the store and, in write-back mode, the flush thread (per process)."""
+        self.inner.start()
+        if self.write_back and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._flush_loop, name="user-cache-flush", daemon=True)
+            self._thread.start()
+        return self
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[user_cache] Warning: write-back failed: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        self.flush()
+        self.inner.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+            dirty = sum(e.dirty for e in self._entries.values())
+        lookups = self.hits + self.misses
+        return {
+            **self.inner.stats(),
+            "cache": {
+                "capacity": self.capacity,
+                "size": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "write_back": self.write_back,
+                "dirty": dirty,
+                "written_back": self.written_back,
+                "conflicts": self.conflicts,
+            },
+        }
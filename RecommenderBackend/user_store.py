@@ -111,48 +111,1059 @@
 #     df.to_parquet(RUNTIME_USERS_PATH, index=False)
 #     print(f"[user_store] Saved {len(state)} runtime users to {RUNTIME_USERS_PATH}")
 
+"""
+Runtime user taste vectors (REAL users only, not offline dataset users).
+
+Two persistent backends behind one interface (BaseUserStore), selected
+with USER_STORE_BACKEND:
+
+"sqlite" (default) -- SQLiteUserStore
+    One row per user in runtime_users.sqlite (WAL mode), the vector as a
+    float32, float16 or int8 + scale blob (USER_VECTOR_CODEC) tagged with
+    the embedding model that produced it, next to the user's version
+    (message count) and last USER_HISTORY_LEN messages (JSON). Vectors of
+    another model read as missing (the user starts a fresh vector) until
+    migrate_user_vectors.py rebuilds them from the histories.
+    Point get/upsert and batch get, so the server reads users on demand
+    instead of holding all of them, and every worker process sees the
+    same, current state.
+
+"wal" -- WalUserStore
+    A parquet snapshot plus an append-only write-ahead log of
+    (user_id, vector) upserts, replayed into an in-process dict at startup:
+    - each interaction appends one small binary record; records are
+      fsynced in groups by a background thread (every USER_WAL_FSYNC_MS)
+    - a background compactor seals the WAL, folds it into a new snapshot
+      (temp file + os.replace, so a crash never leaves a half-written
+      parquet) and deletes the sealed segment
+    - load = snapshot + sealed segment (interrupted compaction) + WAL tail;
+      a torn last record is detected by its CRC and truncated
+    Several workers may append to the same WAL (one O_APPEND write per
+    batch under a shared flock; rotation/truncation take it exclusively),
+    but each reads its own in-memory copy. Versions and histories written
+    through compare_and_set_many() go into the WAL record and the snapshot
+    with the vector; the compare-and-set itself is per process.
+
+    WAL record layout (little endian):
+        crc32 (u32) | len(user_id) (u16) | dim (u32) | user_id utf-8 | float32 * dim
+        [| len(meta) (u32) | meta utf-8]    if the high bit of dim is set;
+                                            meta = {"version": int, "history": [str]}
+
+load_user_state() / save_user_state() keep their original signatures as
+shims over the configured store.
+"""
+
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Mapping
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 import numpy as np
-import pandas as pd
+
+from config import (
+    EMBED_MODEL_NAME,
+    USER_HISTORY_LEN,
+    USER_STORE_BACKEND,
+    USER_STORE_PATH,
+    USER_VECTOR_CODEC,
+    USER_WAL_COMPACT_INTERVAL_S,
+    USER_WAL_COMPACT_MB,
+    USER_WAL_FSYNC_MS,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only
+    fcntl = None
 
 RUNTIME_USERS_PATH = Path(__file__).parent / "runtime_users.parquet"
 
+_HEADER = struct.Struct("<IHI")  # crc32, len(user_id), dim
+_META_LEN = struct.Struct("<I")
+_HAS_META = 1 << 31  # flag in the dim field: a (version, history) trailer follows
 
-def load_user_state() -> Dict[str, np.ndarray]:
-    if not RUNTIME_USERS_PATH.exists():
+# user_id -> (version, history)
+UserMeta = Dict[str, Tuple[int, Tuple[str, ...]]]
+
+
+def _encode_record(user_id: str, vec: np.ndarray, meta: Optional[Tuple[int, Tuple[str, ...]]] = None) -> bytes:
+    uid = str(user_id).encode("utf-8")
+    body = np.ascontiguousarray(vec, dtype="<f4").tobytes()
+    dim = len(body) // 4
+    if meta is not None:
+        version, history = meta
+        trailer = json.dumps({"version": version, "history": list(history)}).encode("utf-8")
+        body += _META_LEN.pack(len(trailer)) + trailer
+        dim |= _HAS_META
+    head = struct.pack("<HI", len(uid), dim)
+    crc = zlib.crc32(body, zlib.crc32(uid, zlib.crc32(head)))
+    return _HEADER.pack(crc, len(uid), dim) + uid + body
+
+
+def read_wal(path: Path) -> Tuple[Dict[str, np.ndarray], UserMeta, int]:
+    """
+    Replay a WAL file. Returns (upserts, meta, valid_bytes), meta holding
+    the (version, history) of the users whose last record carried one;
+    reading stops at the first torn or corrupt record, which is where the
+    valid prefix ends.
+    """
+    state: Dict[str, np.ndarray] = {}
+    meta: UserMeta = {}
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        return state, meta, 0
+
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        crc, uid_len, dim_field = _HEADER.unpack_from(data, pos)
+        dim = dim_field & ~_HAS_META
+        start = pos + _HEADER.size + uid_len
+        end = start + 4 * dim
+        trailer = None
+        if dim_field & _HAS_META:
+            if end + _META_LEN.size > len(data):
+                break
+            (trailer_len,) = _META_LEN.unpack_from(data, end)
+            trailer = data[end + _META_LEN.size : end + _META_LEN.size + trailer_len]
+            end += _META_LEN.size + trailer_len
+        if end > len(data):
+            break
+        uid = data[pos + _HEADER.size : start]
+        body = data[start:end]
+        head = struct.pack("<HI", uid_len, dim_field)
+        if zlib.crc32(body, zlib.crc32(uid, zlib.crc32(head))) != crc:
+            break
+        user_id = uid.decode("utf-8")
+        state[user_id] = np.frombuffer(body, dtype="<f4", count=dim).astype(np.float32)
+        if trailer is not None:
+            rec = json.loads(trailer)
+            meta[user_id] = (rec["version"], tuple(rec["history"]))
+        pos = end
+    return state, meta, pos
+
+
+def read_snapshot(path: Path) -> Tuple[Dict[str, np.ndarray], UserMeta]:
+    """(vectors, meta); snapshots written before versioning have no meta."""
+    if not Path(path).exists():
+        return {}, {}
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    user_ids = table.column("user_id").to_pylist()
+    emb = table.column("embedding").combine_chunks()
+    flat = np.asarray(emb.flatten().to_numpy(zero_copy_only=False), dtype=np.float32)
+    offsets = np.asarray(emb.offsets) if hasattr(emb, "offsets") else None
+    if offsets is None:  # fixed-size list
+        dim = emb.type.list_size
+        offsets = np.arange(len(user_ids) + 1) * dim
+    state = {
+        str(uid): flat[offsets[i] : offsets[i + 1]] for i, uid in enumerate(user_ids)
+    }
+    meta: UserMeta = {}
+    if "version" in table.column_names:
+        versions = table.column("version").to_pylist()
+        histories = table.column("history").to_pylist()
+        meta = {
+            str(uid): (version, tuple(json.loads(history)))
+            for uid, version, history in zip(user_ids, versions, histories)
+            if version
+        }
+    return state, meta
+
+
+def write_snapshot(path: Path, state: Dict[str, np.ndarray], meta: Optional[UserMeta] = None) -> None:
+    """Atomically replace the parquet snapshot (temp file + fsync + os.replace)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    user_ids = list(state.keys())
+    dims = {len(v) for v in state.values()}
+    if len(dims) == 1:
+        dim = dims.pop()
+        mat = np.stack([state[u] for u in user_ids]).astype(np.float32)
+        emb = pa.FixedSizeListArray.from_arrays(pa.array(mat.ravel()), dim)
+    else:
+        emb = pa.array([np.asarray(state[u], dtype=np.float32) for u in user_ids],
+                       type=pa.list_(pa.float32()))
+    meta = meta or {}
+    no_meta = (0, ())
+    table = pa.table({
+        "user_id": pa.array(user_ids, type=pa.string()),
+        "embedding": emb,
+        "version": pa.array([meta.get(u, no_meta)[0] for u in user_ids], type=pa.int64()),
+        "history": pa.array([json.dumps(list(meta.get(u, no_meta)[1])) for u in user_ids], type=pa.string()),
+    })
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _FileLock:
+    """flock on a side file; shared for appends, exclusive for rotation."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def _ensure(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def acquire(self, exclusive: bool, blocking: bool = True) -> bool:
+        if fcntl is None:
+            return True
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._ensure(), flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    def release(self) -> None:
+        if fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# ---------------------------------------------------------
+# Store interface
+# ---------------------------------------------------------
+
+
+class UserRecord(NamedTuple):
+    vec: Optional[np.ndarray]  # None: user not stored yet
+    version: int  # bumped by every message; also the user's message count
+    history: Tuple[str, ...]  # last USER_HISTORY_LEN messages, oldest first
+
+
+def append_history(history: Tuple[str, ...], message: str, maxlen: int = USER_HISTORY_LEN) -> Tuple[str, ...]:
+    """Fixed-capacity ring buffer append: the oldest message falls off."""
+    ring = deque(history, maxlen=maxlen)
+    ring.append(message)
+    return tuple(ring)
+
+
+class BaseUserStore(ABC):
+    def __init__(self):
+        # Per-user (version, history) for the versioned methods; SQLite
+        # overrides both, WAL persists them through _upsert_versioned().
+        self._meta: UserMeta = {}
+        self._meta_lock = threading.Lock()
+
+    @abstractmethod
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Vectors of the given users; unknown users are left out."""
+
+    @abstractmethod
+    def upsert_many(self, updates: Dict[str, np.ndarray]) -> None:
+        """Insert or replace several users at once."""
+
+    @abstractmethod
+    def load_all(self) -> Dict[str, np.ndarray]:
+        ...
+
+    @abstractmethod
+    def write_all(self, state: Dict[str, np.ndarray]) -> None:
+        """Replace the whole store with `state`."""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def user_ids(self) -> List[str]:
+        ...
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        return self.get_many([user_id]).get(user_id)
+
+    # ---------- versioned read-modify-write ----------
+
+    def get_many_versioned(self, user_ids: Iterable[str]) -> Dict[str, UserRecord]:
+        """A record for every requested user (version 0, no history if never written)."""
+        ids = list(user_ids)
+        vecs = self.get_many(ids)
+        with self._meta_lock:
+            return {u: UserRecord(vecs.get(u), *self._meta.get(u, (0, ()))) for u in ids}
+
+    def compare_and_set_many(self, updates: Dict[str, Tuple[UserRecord, int]]) -> List[str]:
+        """
+        updates: user_id -> (new record, expected_version). Writes each user
+        whose version is still `expected_version`; returns the ids that
+        changed in between (to be re-read and retried by the caller).
+        """
+        with self._meta_lock:
+            failed = [u for u, (_, expected) in updates.items() if self._meta.get(u, (0,))[0] != expected]
+            ok = {u: rec for u, (rec, _) in updates.items() if u not in failed}
+            self._upsert_versioned(ok)
+            self._meta.update((u, (rec.version, rec.history)) for u, rec in ok.items())
+        return failed
+
+    def _upsert_versioned(self, records: Dict[str, UserRecord]) -> None:
+        """Write the records' vectors; backends that persist versions write those too."""
+        self.upsert_many({u: rec.vec for u, rec in records.items()})
+
+    def start(self) -> "BaseUserStore":
+        """Start background work (per process, after any fork)."""
+        return self
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
         return {}
 
+
+class MemoryUserStore(BaseUserStore):
+    """Process-local and not persisted (tests, ephemeral sessions)."""
+
+    def __init__(self, state: Optional[Dict[str, np.ndarray]] = None):
+        super().__init__()
+        self._state: Dict[str, np.ndarray] = dict(state or {})
+
+    def get_many(self, user_ids):
+        return {u: self._state[u] for u in user_ids if u in self._state}
+
+    def upsert_many(self, updates):
+        self._state.update(updates)
+
+    def load_all(self):
+        return dict(self._state)
+
+    def write_all(self, state):
+        self._state = dict(state)
+
+    def count(self):
+        return len(self._state)
+
+    def user_ids(self):
+        return list(self._state)
+
+
+# ---------------------------------------------------------
+# WAL + parquet snapshot backend
+# ---------------------------------------------------------
+
+
+class WalUserStore(BaseUserStore):
+    def __init__(
+        self,
+        snapshot_path: Path = RUNTIME_USERS_PATH,
+        wal_path: Optional[Path] = None,
+        fsync_interval_s: float = USER_WAL_FSYNC_MS / 1000,
+        compact_bytes: int = int(USER_WAL_COMPACT_MB * 1024 * 1024),
+        compact_interval_s: float = USER_WAL_COMPACT_INTERVAL_S,
+    ):
+        super().__init__()
+        self.snapshot_path = Path(snapshot_path)
+        self.wal_path = Path(wal_path) if wal_path else self.snapshot_path.with_suffix(".wal")
+        self.sealed_path = self.wal_path.with_name(self.wal_path.name + ".sealed")
+        self.fsync_interval_s = fsync_interval_s
+        self.compact_bytes = compact_bytes
+        self.compact_interval_s = compact_interval_s
+
+        # append lock: shared for writers, exclusive to rotate/truncate the WAL;
+        # compact lock: one compactor (and no loader) at a time across processes.
+        # flock doesn't exclude threads sharing an fd, hence the thread locks.
+        self._append_lock = _FileLock(self.wal_path.with_name(self.wal_path.name + ".lock"))
+        self._compact_lock = _FileLock(self.wal_path.with_name(self.wal_path.name + ".compact.lock"))
+
+        self._lock = threading.Lock()  # the WAL fd
+        self._compact_mutex = threading.Lock()
+        self._fd: Optional[int] = None
+        self._dirty = False
+        self._since_compact = 0
+        self._last_compact = time.monotonic()
+        self._stop = threading.Event()
+        self._threads = []
+
+        # In-process copy for point reads; filled by load_all()
+        self._state: Optional[Dict[str, np.ndarray]] = None
+
+        self.appends = 0
+        self.fsyncs = 0
+        self.compactions = 0
+
+    # ---------- file plumbing ----------
+
+    def _open(self) -> int:
+        if self._fd is None:
+            self.wal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.wal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _reopen_if_rotated(self) -> None:
+        """Another process sealed the WAL: switch to the new file."""
+        if self._fd is None:
+            return
+        try:
+            current = os.stat(self.wal_path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self._fd).st_ino:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    # ---------- public API ----------
+
+    def load_all(self) -> Dict[str, np.ndarray]:
+        """Snapshot + sealed segment + WAL tail; truncates a torn last record."""
+        with self._compact_mutex:
+            self._compact_lock.acquire(exclusive=True)
+            try:
+                state, meta = read_snapshot(self.snapshot_path)
+                sealed, sealed_meta, _ = read_wal(self.sealed_path)
+                state.update(sealed)
+                meta.update(sealed_meta)
+
+                with self._lock:
+                    self._append_lock.acquire(exclusive=True)
+                    try:
+                        tail, tail_meta, valid = read_wal(self.wal_path)
+                        if self.wal_path.exists() and self.wal_path.stat().st_size > valid:
+                            print(f"[user_store] Warning: truncating torn WAL tail at byte {valid}")
+                            os.truncate(self.wal_path, valid)
+                    finally:
+                        self._append_lock.release()
+                state.update(tail)
+                meta.update(tail_meta)
+                self._since_compact = valid
+            finally:
+                self._compact_lock.release()
+        with self._meta_lock:
+            self._meta = meta
+        self._state = state
+        return dict(state)
+
+    def _loaded(self) -> Dict[str, np.ndarray]:
+        if self._state is None:
+            self.load_all()
+        return self._state
+
+    def get_many(self, user_ids):
+        state = self._loaded()
+        return {u: state[u] for u in user_ids if u in state}
+
+    def count(self):
+        return len(self._loaded())
+
+    def user_ids(self):
+        return list(self._loaded())
+
+    def upsert_many(self, updates: Dict[str, np.ndarray]) -> None:
+        """Append one record per user in a single write; fsynced by the group flusher."""
+        self._append(updates, {})
+
+    def compare_and_set_many(self, updates):
+        self._loaded()  # the versions to compare against
+        return super().compare_and_set_many(updates)
+
+    def _upsert_versioned(self, records: Dict[str, UserRecord]) -> None:
+        self._append(
+            {u: rec.vec for u, rec in records.items()},
+            {u: (rec.version, rec.history) for u, rec in records.items()},
+        )
+
+    def _append(self, updates: Dict[str, np.ndarray], meta: UserMeta) -> None:
+        if not updates:
+            return
+        payload = b"".join(_encode_record(uid, vec, meta.get(uid)) for uid, vec in updates.items())
+        with self._lock:
+            self._append_lock.acquire(exclusive=False)
+            try:
+                self._reopen_if_rotated()
+                os.write(self._open(), payload)
+            finally:
+                self._append_lock.release()
+            self._dirty = True
+            self._since_compact += len(payload)
+            self.appends += len(updates)
+            if self._state is not None:
+                self._state.update(updates)
+        if self.fsync_interval_s <= 0:
+            self.sync()
+
+    def sync(self) -> None:
+        """fsync everything appended so far (one fsync covers many appends)."""
+        with self._lock:
+            if not self._dirty or self._fd is None:
+                return
+            # fsync a dup outside the lock so appends don't wait on the disk
+            fd = os.dup(self._fd)
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.fsyncs += 1
+
+    def compact(self) -> bool:
+        """
+        Fold the WAL into a new snapshot. Appends continue into a fresh WAL
+        while the snapshot is written. Returns False if another process is
+        already compacting.
+        """
+        if not self._compact_mutex.acquire(blocking=False):
+            return False
+        if not self._compact_lock.acquire(exclusive=True, blocking=False):
+            self._compact_mutex.release()
+            return False
+        try:
+            # 1) Seal the current WAL (unless an interrupted run left one)
+            if not self.sealed_path.exists():
+                with self._lock:
+                    self._append_lock.acquire(exclusive=True)
+                    try:
+                        if not self.wal_path.exists() or self.wal_path.stat().st_size == 0:
+                            return True
+                        if self._fd is not None:
+                            os.fsync(self._fd)
+                            os.close(self._fd)
+                            self._fd = None
+                            self._dirty = False
+                        os.replace(self.wal_path, self.sealed_path)
+                        _fsync_dir(self.wal_path.parent)
+                        self._since_compact = 0
+                    finally:
+                        self._append_lock.release()
+
+            # 2) snapshot + sealed -> new snapshot, then drop the sealed segment
+            t0 = time.perf_counter()
+            state, meta = read_snapshot(self.snapshot_path)
+            sealed, sealed_meta, _ = read_wal(self.sealed_path)
+            state.update(sealed)
+            meta.update(sealed_meta)
+            write_snapshot(self.snapshot_path, state, meta)
+            self.sealed_path.unlink()
+            _fsync_dir(self.wal_path.parent)
+            self.compactions += 1
+            print(
+                f"[user_store] Compacted {len(sealed)} WAL upserts into "
+                f"{self.snapshot_path.name} ({len(state)} users, {time.perf_counter() - t0:.2f}s)"
+            )
+        finally:
+            self._last_compact = time.monotonic()
+            self._compact_lock.release()
+            self._compact_mutex.release()
+        return True
+
+    def write_all(self, state: Dict[str, np.ndarray]) -> None:
+        """Replace everything with `state` (new snapshot, empty WAL)."""
+        with self._compact_mutex:
+            self._write_all(state)
+
+    def _write_all(self, state: Dict[str, np.ndarray]) -> None:
+        with self._meta_lock:  # before self._lock: compare_and_set_many takes them in this order
+            self._meta = {u: m for u, m in self._meta.items() if u in state}
+            meta = dict(self._meta)
+        self._compact_lock.acquire(exclusive=True)
+        try:
+            with self._lock:
+                self._append_lock.acquire(exclusive=True)
+                try:
+                    if state:
+                        write_snapshot(self.snapshot_path, state, meta)
+                    elif self.snapshot_path.exists():
+                        self.snapshot_path.unlink()
+                    if self.sealed_path.exists():
+                        self.sealed_path.unlink()
+                    if self.wal_path.exists():
+                        os.truncate(self.wal_path, 0)
+                    self._state = dict(state)
+                    self._dirty = False
+                    self._since_compact = 0
+                finally:
+                    self._append_lock.release()
+        finally:
+            self._compact_lock.release()
+
+    # ---------- background threads ----------
+
+    def start(self) -> "WalUserStore":
+        """Start the group-fsync and compaction threads (per process, after fork)."""
+        if self._threads:
+            return self
+        self._stop.clear()
+        for name, target in (("user-wal-sync", self._sync_loop), ("user-wal-compact", self._compact_loop)):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def _sync_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval_s or 0.05):
+            try:
+                self.sync()
+            except OSError as e:
+                print(f"[user_store] Warning: WAL fsync failed: {e}")
+
+    def _compact_loop(self) -> None:
+        while not self._stop.wait(1.0):
+            due = time.monotonic() - self._last_compact >= self.compact_interval_s
+            if self._since_compact >= self.compact_bytes or (due and self._since_compact > 0):
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"[user_store] Warning: WAL compaction failed: {e}")
+                    self._last_compact = time.monotonic()
+
+    def close(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self.sync()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        self._append_lock.close()
+        self._compact_lock.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "wal",
+            "appends": self.appends,
+            "fsyncs": self.fsyncs,
+            "compactions": self.compactions,
+            "wal_bytes": self._since_compact,
+        }
+
+
+# ---------------------------------------------------------
+# Vector codecs (SQLite blobs)
+# ---------------------------------------------------------
+
+VECTOR_CODECS = ("float32", "float16", "int8")
+_SCALE = struct.Struct("<f")
+
+
+def encode_vector(vec: np.ndarray, codec: str = USER_VECTOR_CODEC) -> bytes:
+    """
+    float32 / float16: the little-endian values. int8: a float32 scale
+    (max |x| / 127) followed by round(x / scale) per component.
+    """
+    vec = np.asarray(vec, dtype=np.float32)
+    if codec == "float32":
+        return vec.astype("<f4").tobytes()
+    if codec == "float16":
+        return vec.astype("<f2").tobytes()
+    if codec == "int8":
+        peak = float(np.abs(vec).max()) if vec.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        codes = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return _SCALE.pack(scale) + codes.tobytes()
+    raise ValueError(f"Unknown USER_VECTOR_CODEC: {codec}")
+
+
+def decode_vector(blob: bytes, codec: str = "float32") -> np.ndarray:
+    if codec == "float32":
+        return np.frombuffer(blob, dtype="<f4").astype(np.float32)
+    if codec == "float16":
+        return np.frombuffer(blob, dtype="<f2").astype(np.float32)
+    if codec == "int8":
+        (scale,) = _SCALE.unpack_from(blob)
+        return np.frombuffer(blob, dtype=np.int8, offset=_SCALE.size).astype(np.float32) * scale
+    raise ValueError(f"Unknown vector codec: {codec}")
+
+
+# ---------------------------------------------------------
+# SQLite backend
+# ---------------------------------------------------------
+
+
+class SQLiteUserStore(BaseUserStore):
+    # SQLite's default limit on bound parameters is 999 on older builds
+    BATCH = 500
+
+    def __init__(
+        self,
+        path: Path = USER_STORE_PATH,
+        import_legacy: bool = True,
+        codec: str = USER_VECTOR_CODEC,
+        model: str = EMBED_MODEL_NAME,
+    ):
+        super().__init__()
+        if codec not in VECTOR_CODECS:
+            raise ValueError(f"Unknown USER_VECTOR_CODEC: {codec}")
+        self.path = Path(path)
+        self.codec = codec  # for writes; every row records its own
+        self.model = model  # embedding space of the vectors read and written
+        self._local = threading.local()
+        self.reads = 0
+        self.writes = 0
+        self._init_db()
+        if import_legacy:
+            self._import_legacy()
+
+    # ---------- sqlite plumbing ----------
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread; reuse one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_vectors (
+                    user_id    TEXT PRIMARY KEY,
+                    dim        INTEGER NOT NULL,
+                    vec        BLOB NOT NULL,
+                    updated_at REAL NOT NULL,
+                    version    INTEGER NOT NULL DEFAULT 0,
+                    history    TEXT NOT NULL DEFAULT '[]',
+                    codec      TEXT NOT NULL DEFAULT 'float32',
+                    model      TEXT NOT NULL DEFAULT ''
+                )
+                """
+            )
+            # Databases created before versioning / persisted histories / codecs / model tags
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(user_vectors)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE user_vectors ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            if "history" not in columns:
+                conn.execute("ALTER TABLE user_vectors ADD COLUMN history TEXT NOT NULL DEFAULT '[]'")
+            if "codec" not in columns:
+                conn.execute("ALTER TABLE user_vectors ADD COLUMN codec TEXT NOT NULL DEFAULT 'float32'")
+            if "model" not in columns:
+                # Untagged vectors were written by the model configured now
+                conn.execute("ALTER TABLE user_vectors ADD COLUMN model TEXT NOT NULL DEFAULT ''")
+                conn.execute("UPDATE user_vectors SET model = ?", (self.model,))
+
+    def _import_legacy(self) -> None:
+        """One-time import of runtime_users.parquet (+ WAL) into an empty db."""
+        legacy = WalUserStore(RUNTIME_USERS_PATH)
+        if self.count() or not (legacy.snapshot_path.exists() or legacy.wal_path.exists()):
+            return
+        state = legacy.load_all()
+        records = legacy.get_many_versioned(state)
+        legacy.close()
+        if state:
+            self.compare_and_set_many({u: (rec, 0) for u, rec in records.items()})
+            print(f"[user_store] Imported {len(state)} users from {RUNTIME_USERS_PATH} into {self.path}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """IMMEDIATE transaction: takes the write lock up front (no upgrade deadlocks)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _write(self, statements) -> None:
+        """Run (sql, rows) pairs in one transaction."""
+        with self._transaction() as conn:
+            for sql, rows in statements:
+                conn.executemany(sql, rows)
+
+    def _select(self, user_ids: Iterable[str], columns: str) -> list:
+        ids = list(dict.fromkeys(user_ids))
+        conn = self._conn()
+        rows = []
+        for i in range(0, len(ids), self.BATCH):
+            chunk = ids[i : i + self.BATCH]
+            rows += conn.execute(
+                f"SELECT user_id, {columns} FROM user_vectors "
+                f"WHERE user_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+        self.reads += len(ids)
+        return rows
+
+    # ---------- public API ----------
+
+    def _vector(self, blob: bytes, codec: str, model: str) -> Optional[np.ndarray]:
+        # A vector from another embedding model would mix spaces: treat it as
+        # missing; so is an empty one (reset_vectors)
+        return decode_vector(blob, codec) if model == self.model and blob else None
+
+    def get_many(self, user_ids):
+        rows = self._select(user_ids, "vec, codec, model")
+        return {uid: vec for uid, *row in rows if (vec := self._vector(*row)) is not None}
+
+    def get_many_versioned(self, user_ids):
+        ids = list(user_ids)
+        columns = "vec, codec, model, version, history"
+        found = {
+            uid: UserRecord(self._vector(blob, codec, model), version, tuple(json.loads(history)))
+            for uid, blob, codec, model, version, history in self._select(ids, columns)
+        }
+        return {u: found.get(u) or UserRecord(None, 0, ()) for u in ids}
+
+    def compare_and_set_many(self, updates):
+        """One transaction; the version check and the write are a single statement per user."""
+        now = time.time()
+        failed: List[str] = []
+        with self._transaction() as conn:
+            for uid, (rec, expected) in updates.items():
+                cur = conn.execute(
+                    """
+                    INSERT INTO user_vectors (user_id, dim, vec, codec, model, updated_at, version, history)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        dim = excluded.dim, vec = excluded.vec, codec = excluded.codec,
+                        model = excluded.model, updated_at = excluded.updated_at,
+                        version = excluded.version, history = excluded.history
+                    WHERE user_vectors.version = ?
+                    """,
+                    (
+                        str(uid),
+                        len(rec.vec),
+                        encode_vector(rec.vec, self.codec),
+                        self.codec,
+                        self.model,
+                        now,
+                        rec.version,
+                        json.dumps(list(rec.history)),
+                        expected,
+                    ),
+                )
+                if cur.rowcount == 0:
+                    failed.append(uid)
+        self.writes += len(updates) - len(failed)
+        return failed
+
+    def _upsert_rows(self, updates: Dict[str, np.ndarray]):
+        now = time.time()
+        rows = [
+            (str(uid), len(vec), encode_vector(vec, self.codec), self.codec, self.model, now)
+            for uid, vec in updates.items()
+        ]
+        sql = """
+            INSERT INTO user_vectors (user_id, dim, vec, codec, model, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                dim = excluded.dim, vec = excluded.vec, codec = excluded.codec,
+                model = excluded.model, updated_at = excluded.updated_at
+        """
+        return sql, rows
+
+    def upsert_many(self, updates):
+        if not updates:
+            return
+        self._write([self._upsert_rows(updates)])
+        self.writes += len(updates)
+
+    def load_all(self):
+        rows = self._conn().execute(
+            "SELECT user_id, vec, codec FROM user_vectors WHERE model = ? AND dim > 0", (self.model,)
+        ).fetchall()
+        return {uid: decode_vector(blob, codec) for uid, blob, codec in rows}
+
+    def write_all(self, state):
+        self._write([("DELETE FROM user_vectors", [()]), self._upsert_rows(state)])
+        self.writes += len(state)
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM user_vectors").fetchone()[0]
+
+    def user_ids(self):
+        return [r[0] for r in self._conn().execute("SELECT user_id FROM user_vectors")]
+
+    # ---------- embedding-model migration ----------
+
+    def stale_count(self) -> int:
+        """Users whose stored vector comes from another embedding model."""
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM user_vectors WHERE model != ?", (self.model,)
+        ).fetchone()[0]
+
+    def iter_stale(self, chunk_size: int = 500, after: str = "") -> Iterator[Dict[str, UserRecord]]:
+        """
+        Chunks of users (by user_id, after `after`) whose vector is from
+        another model, as records without a vector. Keyset pagination, so
+        memory stays at one chunk however many users there are.
+        """
+        while True:
+            rows = self._conn().execute(
+                "SELECT user_id, version, history FROM user_vectors "
+                "WHERE model != ? AND user_id > ? ORDER BY user_id LIMIT ?",
+                (self.model, after, chunk_size),
+            ).fetchall()
+            if not rows:
+                return
+            self.reads += len(rows)
+            after = rows[-1][0]
+            yield {uid: UserRecord(None, version, tuple(json.loads(history))) for uid, version, history in rows}
+
+    def reset_vectors(self, expected: Dict[str, int]) -> List[str]:
+        """
+        expected: user_id -> version. Drops each user's vector and tags the
+        row with this model, so the user counts as migrated and starts a
+        fresh vector; version and history are kept. Returns the ids whose
+        version changed in between (left alone).
+        """
+        failed: List[str] = []
+        with self._transaction() as conn:
+            for uid, version in expected.items():
+                cur = conn.execute(
+                    "UPDATE user_vectors SET dim = 0, vec = x'', codec = ?, model = ?, updated_at = ? "
+                    "WHERE user_id = ? AND version = ?",
+                    (self.codec, self.model, time.time(), str(uid), version),
+                )
+                if cur.rowcount == 0:
+                    failed.append(uid)
+        self.writes += len(expected) - len(failed)
+        return failed
+
+    def start(self) -> "SQLiteUserStore":
+        stale = self.stale_count()
+        if stale:
+            print(
+                f"[user_store] Warning: {stale} users have vectors from another embedding model "
+                f"than {self.model}; they start fresh until migrate_user_vectors.py rebuilds them"
+            )
+        return self
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "codec": self.codec,
+            "model": self.model,
+            "reads": self.reads,
+            "writes": self.writes,
+        }
+
+
+# ---------------------------------------------------------
+# Dict-like view used by RecommenderService
+# ---------------------------------------------------------
+
+
+class UserVectors(Mapping):
+    """
+    user_id -> vector over a BaseUserStore. Reads go to the store; item
+    assignment and update() write through immediately.
+    """
+
+    def __init__(self, store: BaseUserStore):
+        self.store = store
+
+    def __getitem__(self, user_id: str) -> np.ndarray:
+        vec = self.store.get(user_id)
+        if vec is None:
+            raise KeyError(user_id)
+        return vec
+
+    def get(self, user_id, default=None):
+        vec = self.store.get(user_id)
+        return default if vec is None else vec
+
+    def __setitem__(self, user_id: str, vec: np.ndarray) -> None:
+        self.store.upsert_many({user_id: vec})
+
+    def update(self, updates: Dict[str, np.ndarray]) -> None:
+        self.store.upsert_many(dict(updates))
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, np.ndarray]:
+        return self.store.get_many(user_ids)
+
+    def __contains__(self, user_id) -> bool:
+        return self.store.get(user_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.user_ids())
+
+    def __len__(self) -> int:
+        return self.store.count()
+
+
+# ---------------------------------------------------------
+# Process-wide store and the original function API
+# ---------------------------------------------------------
+
+_store: Optional[BaseUserStore] = None
+_store_lock = threading.Lock()
+
+
+def get_user_store() -> BaseUserStore:
+    """The configured persistent store (created on first use, i.e. per worker)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if USER_STORE_BACKEND == "wal":
+                _store = WalUserStore()
+            elif USER_STORE_BACKEND == "sqlite":
+                _store = SQLiteUserStore()
+            else:
+                raise ValueError(f"Unknown USER_STORE_BACKEND: {USER_STORE_BACKEND}")
+        return _store
+
+
+def load_user_state() -> Dict[str, np.ndarray]:
+    """Every stored user (compatibility shim; the server reads users on demand)."""
     try:
-        df = pd.read_parquet(RUNTIME_USERS_PATH)
+        state = get_user_store().load_all()
     except Exception as e:
-        print(f"[user_store] Warning: could not read {RUNTIME_USERS_PATH}: {e}")
+        print(f"[user_store] Warning: could not read user store: {e}")
         return {}
 
-    state: Dict[str, np.ndarray] = {}
-    for row in df.itertuples(index=False):
-        state[str(row.user_id)] = np.array(row.embedding, dtype=np.float32)
-
-    print(f"[user_store] Loaded {len(state)} runtime users from {RUNTIME_USERS_PATH}")
+    print(f"[user_store] Loaded {len(state)} runtime users ({USER_STORE_BACKEND})")
     return state
 
 
 def save_user_state(state: Dict[str, np.ndarray]) -> None:
-    if not state:
-        if RUNTIME_USERS_PATH.exists():
-            RUNTIME_USERS_PATH.unlink()
-            print(f"[user_store] No users, removed {RUNTIME_USERS_PATH}")
-        return
+    """Replace the stored users with `state` (compatibility shim for bulk tools)."""
+    get_user_store().write_all(state)
+    print(f"[user_store] Saved {len(state)} runtime users ({USER_STORE_BACKEND})")
 
-    data = {"user_id": [], "embedding": []}
-    for user_id, vec in state.items():
-        data["user_id"].append(str(user_id))
-        data["embedding"].append(vec.tolist())
 
-    df = pd.DataFrame(data)
-    df.to_parquet(RUNTIME_USERS_PATH, index=False)
-    print(f"[user_store] Saved {len(state)} runtime users to {RUNTIME_USERS_PATH}")
+def upsert_user_vectors(updates: Dict[str, np.ndarray]) -> None:
+    """Insert or replace the given users in the configured store."""
+    get_user_store().upsert_many(updates)
 
 
 # ---------------------------------------------------------
@@ -161,7 +1172,7 @@ def save_user_state(state: Dict[str, np.ndarray]) -> None:
 
 def debug_inspect_users(max_users: int = 20) -> None:
     """
-    Print a summary of runtime users stored in runtime_users.parquet.
+    Print a summary of runtime users in the configured store.
 
     Shows:
     - total count
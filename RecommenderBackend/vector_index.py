@@ -1,8 +1,9 @@
-import faiss
 import numpy as np
 
 class MovieIndex:
     def __init__(self, embeddings: np.ndarray):
+        import faiss  # only when an index is actually built
+
         dim = embeddings.shape[1]
         self.index = faiss.IndexFlatIP(dim)
         self.index.add(embeddings)
@@ -12,3 +13,10 @@ class MovieIndex:
             query_vec.reshape(1, -1).astype("float32"), k
         )
         return idxs[0], scores[0]
+
+    def search_batch(self, query_mat: np.ndarray, k=10):
+        """One FAISS call for an (N, D) matrix of queries -> (N, k) idxs, scores."""
+        scores, idxs = self.index.search(
+            np.ascontiguousarray(query_mat, dtype="float32"), k
+        )
+        return idxs, scores
@@ -1,31 +1,28 @@
 # visualizations/__init__.py
-# from .utils import load_log_records, pick_record_for_visualization
-# from .plots import (
-#     plot_embedding_map,
-#     plot_local_neighborhood_with_genres,
-#     plot_genre_histogram,
-# )
+# Public names are resolved on first access (PEP 562), so importing one
+# helper doesn't pull matplotlib/sklearn in via the plotting modules.
+_EXPORTS = {
+    "load_log_records": ".utils",
+    "pick_record_for_visualization": ".utils",
+    "plot_embedding_map": ".plots",
+    "plot_local_neighborhood_with_genres": ".plots",
+    "plot_genre_histogram": ".plots",
+    "plot_local_neighborhood_with_cluster_genres": ".plots",
+    "majority_primary_genre": ".clusters",
+    "compute_per_movie_cluster_genre": ".clusters",
+}
 
-# __all__ = [
-#     "load_log_records",
-#     "pick_record_for_visualization",
-#     "plot_embedding_map",
-#     "plot_local_neighborhood_with_genres",
-#     "plot_genre_histogram",
-# ]
-from .utils import load_log_records, pick_record_for_visualization
 
-from .plots import (
-    plot_embedding_map,
-    plot_local_neighborhood_with_genres,
-    plot_genre_histogram,
-    plot_local_neighborhood_with_cluster_genres,
-)
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
 
-from .clusters import (
-    majority_primary_genre,
-    compute_per_movie_cluster_genre
-)
 
 __all__ = [
     "load_log_records",
@@ -4,17 +4,12 @@ from __future__ import annotations
 from pathlib import Path
 from typing import List, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.patches import Patch
-from sklearn.cluster import MiniBatchKMeans
-from sklearn.decomposition import PCA
 
 from .genres import primary_genre_from_meta, majority_primary_genre, build_genre_color_map
 
-from sklearn.cluster import KMeans
-
-from .genres import majority_primary_genre
+# matplotlib and sklearn are imported inside the functions that use them,
+# so `import visualizations.clusters` stays cheap.
 
 def compute_cluster_majority_genres(
     movie_embeddings: np.ndarray,
@@ -31,6 +26,8 @@ def compute_cluster_majority_genres(
         centers: np.ndarray[float] shape (K,D) - cluster centroids
         cluster_genres: list[str] length K    - majority genre per cluster
     """
+    from sklearn.cluster import KMeans
+
     kmeans = KMeans(
         n_clusters=n_clusters,
         random_state=random_state,
@@ -66,6 +63,8 @@ def _cluster_movies(
       cluster_genre: list[str] length C, majority primary genre per cluster
       cluster_sizes: (C,) int array, #movies per cluster
     """
+    from sklearn.cluster import MiniBatchKMeans
+
     N, _ = movie_embeddings.shape
 
     kmeans = MiniBatchKMeans(
@@ -112,6 +111,10 @@ def plot_cluster_overview_with_user(
       • Top-K recommendations as green points with labels
         (each labelled with its cluster's majority genre)
     """
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    from sklearn.decomposition import PCA
+
     user_vec = np.asarray(user_vec, dtype=np.float32)
 
     # 1) cluster movies
@@ -248,6 +251,8 @@ def compute_per_movie_cluster_genre(
         cluster_genres:  list[str]   length K, majority genre per cluster
         movie_cluster_genre: list[str] length N, genre for each movie
     """
+    from sklearn.cluster import KMeans
+
     kmeans = KMeans(
         n_clusters=n_clusters,
         random_state=random_state,
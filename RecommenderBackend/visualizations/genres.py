@@ -71,8 +71,6 @@ from __future__ import annotations
 from collections import Counter
 from typing import Dict, List
 
-import matplotlib.pyplot as plt
-
 # Broad genres we "prefer" when multiple are present
 GENRE_PRIORITY = [
     "Drama", "Comedy", "Romance", "Crime", "Thriller",
@@ -186,6 +184,8 @@ def build_genre_color_map(genres: List[str]) -> Dict[str, str]:
     """
     Map each genre name to a matplotlib color using tab20.
     """
+    import matplotlib.pyplot as plt
+
     unique = sorted(set(genres))
     cmap = plt.get_cmap("tab20")
     return {g: cmap(i % 20) for i, g in enumerate(unique)}
@@ -1,13 +1,11 @@
 # visualizations/utils.py
 from __future__ import annotations
 
-import json
-from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import numpy as np
 
-RECOMMENDER_LOG_PATH = Path(__file__).resolve().parent.parent / "rec_log.jsonl"
+from event_log import has_events, read_events
 
 
 def pca_2d(X: np.ndarray) -> np.ndarray:
@@ -24,34 +22,25 @@ def pca_2d(X: np.ndarray) -> np.ndarray:
 
 def load_log_records(user_id: str) -> List[Dict[str, Any]]:
     """
-    Load all records from rec_log.jsonl for a specific user_id,
-    sorted by msg_index ascending.
+    Load all records from the event log (event_log.py) for a specific
+    user_id, sorted by msg_index ascending. Compacted events are read from
+    the user's partitions of the parquet store only.
     """
-    if not RECOMMENDER_LOG_PATH.exists():
+    if not has_events():
         raise FileNotFoundError(
-            f"{RECOMMENDER_LOG_PATH} does not exist. "
-            "Run the recommender first so it writes rec_log.jsonl."
+            "No recommendation event log found. "
+            "Run the recommender first so it writes one."
         )
 
     records: List[Dict[str, Any]] = []
-    with open(RECOMMENDER_LOG_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rec = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            if rec.get("user_id") != user_id:
-                continue
-            if "msg_index" not in rec or "user_vec" not in rec:
-                continue
-            records.append(rec)
+    for rec in read_events(user_id=user_id):
+        if "msg_index" not in rec or "user_vec" not in rec:
+            continue
+        records.append(rec)
 
     if not records:
         raise ValueError(
-            f"No log records found for user_id='{user_id}' in {RECOMMENDER_LOG_PATH}"
+            f"No log records found for user_id='{user_id}' in the event log"
         )
 
     records.sort(key=lambda r: int(r.get("msg_index", 0)))
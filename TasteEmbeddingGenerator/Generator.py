@@ -13,7 +13,9 @@ from .embeddings_backend import (
     BaseEmbeddingBackend,
     OpenAIEmbeddingBackend, 
     SentenceTransformerBackend,
+    OnnxEmbeddingBackend,
 )
+from .embedding_cache import CachedEmbeddingBackend, EmbeddingCache
 from .MovieEmbedding import MovieEmbeddingConfig, MovieEmbeddingGenerator
 from .UserEmbedding import UserEmbeddingConfig, UserEmbeddingGenerator
 
@@ -22,19 +24,22 @@ logging.basicConfig(level=logging.INFO)
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
 
-EmbeddingBackendType = Literal["openai", "sentence-transformers"]
+EmbeddingBackendType = Literal["openai", "sentence-transformers", "onnx"]
 
 
 @dataclass
 class TasteEmbeddingConfig:
     project_root: Path
     backend_type: EmbeddingBackendType = "sentence-transformers"
-    model_name: str = "BAAI/bge-base-en-v1.5"  # sentence-transformers
+    model_name: str = "BAAI/bge-base-en-v1.5"  # sentence-transformers / onnx
     openai_model: str = "text-embedding-3-large"
     movie_sources: list[str] = None
     batch_size: int = 64
     rating_threshold: float = 4.0
     min_movies: int = 3
+    # Optional float16 on-disk embedding cache (re-runs skip already-seen texts)
+    embedding_cache_dir: Optional[Path] = None
+    embedding_cache_mb: int = 256
 
     def __post_init__(self):
         if self.movie_sources is None:
@@ -56,12 +61,22 @@ class TasteEmbeddingGenerator:
 
     def _init_backend(self) -> BaseEmbeddingBackend:
         if self.config.backend_type == "openai":
-            return OpenAIEmbeddingBackend(model=self.config.openai_model)
+            backend = OpenAIEmbeddingBackend(model=self.config.openai_model)
         elif self.config.backend_type == "sentence-transformers":
-            return SentenceTransformerBackend(model_name=self.config.model_name)
+            backend = SentenceTransformerBackend(model_name=self.config.model_name)
+        elif self.config.backend_type == "onnx":
+            backend = OnnxEmbeddingBackend(model_name=self.config.model_name)
         else:
             raise ValueError(f"Unknown backend_type: {self.config.backend_type}")
 
+        if self.config.embedding_cache_dir is not None:
+            cache = EmbeddingCache(
+                max_bytes=self.config.embedding_cache_mb * 1024 * 1024,
+                disk_dir=self.config.embedding_cache_dir,
+            )
+            backend = CachedEmbeddingBackend(backend, cache=cache)
+        return backend
+
     # ---------- End-to-end steps ----------
 
     def build_movie_embeddings(self, limit: Optional[int] = None) -> Path:
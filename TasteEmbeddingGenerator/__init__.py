@@ -2,7 +2,7 @@
 TasteEmbeddingGenerator package
 
 Provides:
-    - Embedding backend interfaces (OpenAI, SentenceTransformer)
+    - Embedding backend interfaces (OpenAI, SentenceTransformer, ONNX Runtime)
     - MovieEmbedding and UserEmbedding generators
     - High-level TasteEmbeddingGenerator pipeline
 """
@@ -11,28 +11,46 @@ from .embeddings_backend import (
     BaseEmbeddingBackend,
     OpenAIEmbeddingBackend,
     SentenceTransformerBackend,
+    OnnxEmbeddingBackend,
 )
 
-from .MovieEmbedding import (
-    MovieEmbeddingConfig,
-    MovieEmbeddingGenerator,
+from .embedding_cache import (
+    EmbeddingCache,
+    CachedEmbeddingBackend,
 )
 
-from .UserEmbedding import (
-    UserEmbeddingConfig,
-    UserEmbeddingGenerator,
-)
+# The offline generators pull in pandas (and dotenv); they are imported on
+# first access so the API can use the backends without that cost.
+_LAZY = {
+    "MovieEmbeddingConfig": ".MovieEmbedding",
+    "MovieEmbeddingGenerator": ".MovieEmbedding",
+    "UserEmbeddingConfig": ".UserEmbedding",
+    "UserEmbeddingGenerator": ".UserEmbedding",
+    "TasteEmbeddingConfig": ".Generator",
+    "TasteEmbeddingGenerator": ".Generator",
+}
 
-from .Generator import (
-    TasteEmbeddingConfig,
-    TasteEmbeddingGenerator,
-)
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
 
 __all__ = [
     # backends
     "BaseEmbeddingBackend",
     "OpenAIEmbeddingBackend",
     "SentenceTransformerBackend",
+    "OnnxEmbeddingBackend",
+
+    # embedding cache
+    "EmbeddingCache",
+    "CachedEmbeddingBackend",
 
     # movie embedding
     "MovieEmbeddingConfig",
@@ -0,0 +1,193 @@
+# TasteEmbeddingGenerator/embedding_cache.py
+
+"""
+Two-level cache for text embeddings.
+
+Key: sha256(model name + normalized text), where normalization collapses
+whitespace and case-folds, so "Feel-good  comedy" and "feel-good comedy"
+share one entry.
+
+  - L1: in-memory LRU, evicted by total vector bytes (`max_bytes`)
+  - L2: optional on-disk store of float16 `.npy` files (`disk_dir`)
+
+`CachedEmbeddingBackend` wraps any `BaseEmbeddingBackend` and only sends
+cache misses to the wrapped backend.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .embeddings_backend import BaseEmbeddingBackend
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split()).casefold()
+
+
+def cache_key(model_name: str, text: str) -> str:
+    payload = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class EmbeddingCache:
+    """Thread-safe LRU (by bytes) + optional float16 disk store."""
+
+    max_bytes: int = 64 * 1024 * 1024
+    disk_dir: Optional[Path] = None
+
+    hits: int = field(init=False, default=0)
+    disk_hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+
+    _entries: "OrderedDict[str, np.ndarray]" = field(init=False, repr=False, default=None)
+    _bytes: int = field(init=False, repr=False, default=0)
+    _lock: Any = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.disk_dir is not None:
+            self.disk_dir = Path(self.disk_dir)
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---------- public API ----------
+
+    def get(self, key: str, record_miss: bool = True) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vec
+
+        vec = self._disk_read(key)
+        if vec is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._insert(key, vec)
+            return vec
+
+        if record_miss:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def put(self, key: str, vec) -> None:
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._insert(key, vec)
+        self._disk_write(key, vec)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    # ---------- internals ----------
+
+    def _insert(self, key: str, vec: np.ndarray) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = vec
+        self._bytes += vec.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.npy"
+
+    def _disk_read(self, key: str) -> Optional[np.ndarray]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        if not path.exists():
+            return None
+        try:
+            return np.load(path).astype(np.float32)
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] Could not read {path}: {e}")
+            return None
+
+    def _disk_write(self, key: str, vec: np.ndarray) -> None:
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, vec.astype(np.float16))
+            os.replace(tmp, path)  # atomic: readers never see a partial file
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] Could not write {path}: {e}")
+
+
+@dataclass
+class CachedEmbeddingBackend(BaseEmbeddingBackend):
+    """Wraps another backend; only cache misses reach it."""
+
+    backend: BaseEmbeddingBackend
+    cache: EmbeddingCache = field(default_factory=EmbeddingCache)
+    model_name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.model_name is None:
+            self.model_name = (
+                getattr(self.backend, "cache_name", None)
+                or getattr(self.backend, "model_name", None)
+                or getattr(self.backend, "model", None)
+                or type(self.backend).__name__
+            )
+
+    def lookup(self, text: str) -> Optional[List[float]]:
+        """Cache-only read; a miss is not counted (embed_texts will count it)."""
+        vec = self.cache.get(cache_key(self.model_name, text), record_miss=False)
+        return None if vec is None else vec.tolist()
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        keys = [cache_key(self.model_name, t) for t in texts]
+        results: List[Optional[np.ndarray]] = [self.cache.get(k) for k in keys]
+
+        # Encode each distinct missing key once
+        missing: Dict[str, str] = {}
+        for key, text, vec in zip(keys, texts, results):
+            if vec is None and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vecs = self.backend.embed_texts(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vecs))
+            for key, vec in fresh.items():
+                self.cache.put(key, vec)
+            results = [
+                r if r is not None else np.asarray(fresh[k], dtype=np.float32)
+                for k, r in zip(keys, results)
+            ]
+
+        return [np.asarray(r, dtype=np.float32).tolist() for r in results]